@@ -7,12 +7,21 @@
 from flask import Flask
 from flask_cors import CORS
 from .database.db import init_app as init_db_app
+from .json_provider import init_app as init_json_provider
 from .api.contractors import contractors_bp
 from .api.stock import stock_bp
 from .api.orders import orders_bp
 from .api.payments import payments_bp
 # ADDED: Import the new stock transactions blueprint
 from .api.stock_transactions import stock_transactions_bp
+from .api.export import export_bp
+from .api.stock_reports import stock_reports_bp
+from .services.export_worker import init_app as init_export_worker
+from .services.read_cache import init_app as init_read_cache
+from .api.cache import cache_bp
+from .database.writer import init_app as init_write_executor
+from .api.writer import writer_bp
+from .services.stock_import_service import import_stock_command
 from config import Config
 
 def create_app(test_config=None):
@@ -21,8 +30,14 @@ def create_app(test_config=None):
 
     # app.config.from_object('config')
     app.config.from_object(Config)
+    if test_config:
+        app.config.update(test_config)
     # Initialize extensions
+    init_json_provider(app)
     init_db_app(app)
+    init_export_worker(app)
+    init_read_cache(app)
+    init_write_executor(app)
 
     # Register blueprints
     app.register_blueprint(contractors_bp, url_prefix='/api')
@@ -31,6 +46,12 @@ def create_app(test_config=None):
     app.register_blueprint(payments_bp, url_prefix='/api')
     # ADDED: Register the new blueprint
     app.register_blueprint(stock_transactions_bp, url_prefix='/api')
+    app.register_blueprint(export_bp, url_prefix='/api')
+    app.register_blueprint(stock_reports_bp, url_prefix='/api')
+    app.register_blueprint(cache_bp, url_prefix='/api')
+    app.register_blueprint(writer_bp, url_prefix='/api')
+
+    app.cli.add_command(import_stock_command)
 
 
     return app
\ No newline at end of file
@@ -0,0 +1,10 @@
+# /app/api/cache.py
+from flask import Blueprint, jsonify
+from app.services.read_cache import get_cache_stats
+
+cache_bp = Blueprint('cache_api', __name__)
+
+@cache_bp.route('/cache/status', methods=['GET'])
+def handle_cache_status():
+    """Hit/miss counters of the read cache, for tuning its size and TTL."""
+    return jsonify(get_cache_stats())
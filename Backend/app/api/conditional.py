@@ -0,0 +1,71 @@
+# /app/api/conditional.py
+# Conditional GET for read endpoints, driven by the per-table change counters
+# in TableVersions (kept by triggers on every insert, update and delete).
+
+import datetime
+import hashlib
+from functools import wraps
+from flask import make_response, request
+from app.database.db import get_db
+from app.database.versions import table_versions
+
+# Tables behind an order's financials (the OrderBalances ledger follows these)
+FINANCIAL_TABLES = ('Orders', 'Payments', 'StockTransactions', 'Deductions')
+
+
+def _last_modified(versions):
+    stamps = [modified for _, modified in versions.values() if modified]
+    if not stamps:
+        return None
+    return datetime.datetime.strptime(max(stamps), '%Y-%m-%d %H:%M:%S.%f').replace(tzinfo=datetime.timezone.utc)
+
+
+def _etag(versions):
+    # Same URL + same table versions = same body. The date is part of it because
+    # order fines grow by the day without any table changing.
+    parts = [request.full_path, datetime.date.today().isoformat()]
+    parts += [f"{table}={version}@{modified}" for table, (version, modified) in sorted(versions.items())]
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+
+def conditional_get(*tables):
+    """
+    Decorator for read views whose response depends only on the URL and the
+    given tables. Each entry is a table name or a callable taking request.args
+    and returning more table names (for options like ?include=financials).
+
+    GET responses carry a strong ETag and Last-Modified. A request whose
+    If-None-Match matches the current ETag is answered 304 straight from
+    TableVersions, without calling the view. If-Modified-Since alone is not
+    honoured: its one-second resolution can hide a write made in the same second.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            names = []
+            for entry in tables:
+                names.extend(entry(request.args) if callable(entry) else (entry,))
+            versions = table_versions(get_db(), names)
+            etag = _etag(versions)
+
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = _last_modified(versions)
+            # Clients may keep the body but must revalidate before using it
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def with_financials(args):
+    """Extra tables for endpoints that accept ?include=financials."""
+    return FINANCIAL_TABLES if 'financials' in args.get('include', '').split(',') else ()
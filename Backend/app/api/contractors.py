@@ -3,11 +3,13 @@
 # /app/api/contractors.py
 
 from flask import Blueprint, jsonify, request
-from app.services import contractor_service
+from app.services import contractor_service, pagination
+from app.api.conditional import conditional_get
 
 contractors_bp = Blueprint('contractors_api', __name__)
 
 @contractors_bp.route('/contractors', methods=['GET', 'POST'])
+@conditional_get('Contractors')
 def handle_contractors():
     if request.method == 'POST':
         data = request.get_json()
@@ -17,10 +19,14 @@ def handle_contractors():
         new_id = contractor_service.add_contractor(data['Name'], data.get('ContactInfo'))
         return jsonify({"message": "Contractor added", "id": new_id}), 201
 
-    contractors = contractor_service.get_all_contractors()
+    try:
+        contractors = contractor_service.get_all_contractors(pagination.page_from_args(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(contractors)
 
 @contractors_bp.route('/contractors/<int:contractor_id>', methods=['GET'])
+@conditional_get('Contractors', 'Orders', 'StockTransactions', 'StockItems', 'Payments', 'Deductions')
 def get_contractor_details(contractor_id):
     """Endpoint for the individual contractor book."""
     details = contractor_service.get_contractor_details(contractor_id)
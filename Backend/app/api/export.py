@@ -0,0 +1,10 @@
+# /app/api/export.py
+from flask import Blueprint, jsonify
+from app.services.export_worker import get_export_status
+
+export_bp = Blueprint('export_api', __name__)
+
+@export_bp.route('/export/status', methods=['GET'])
+def handle_export_status():
+    """Reports the state of the background Excel export and its last successful run."""
+    return jsonify(get_export_status())
@@ -1,10 +1,12 @@
 # /app/api/orders.py
-from flask import Blueprint, jsonify, request
-from app.services import order_service
+from flask import Blueprint, current_app, jsonify, request
+from app.services import order_service, pagination
+from app.api.conditional import conditional_get, with_financials, FINANCIAL_TABLES
 
 orders_bp = Blueprint('orders_api', __name__)
 
 @orders_bp.route('/orders', methods=['GET', 'POST'])
+@conditional_get('Orders', 'Contractors', with_financials)
 def handle_orders():
     if request.method == 'POST':
         data = request.get_json()
@@ -23,16 +25,40 @@ def handle_orders():
     design_number = request.args.get('design_number')
     shade_card = request.args.get('shade_card')
     quality = request.args.get('quality')
+    # NEW: Ranked free-text search across order fields, contractor name and notes
+    q = request.args.get('q')
     
-    orders = order_service.get_all_orders(
-        status=status,
-        design_number=design_number,
-        shade_card=shade_card,
-        quality=quality
-    )
+    # NEW: ?limit=&cursor= return {"items", "next_cursor"} pages; ?fields= picks the columns
+    try:
+        page = pagination.page_from_args(request.args)
+        orders = order_service.get_all_orders(
+            status=status,
+            design_number=design_number,
+            shade_card=shade_card,
+            quality=quality,
+            q=q,
+            limit=page.limit,
+            page=page,
+            # NEW: ?include=financials adds each order's balances, computed for the whole list at once
+            include_financials='financials' in request.args.get('include', '').split(',')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(orders)
 
+# NEW: Creates many orders in one transaction, e.g. {"orders": [...], "all_or_nothing": true}
+@orders_bp.route('/orders/bulk', methods=['POST'])
+def handle_bulk_orders():
+    data = request.get_json(silent=True) or {}
+    result = order_service.create_orders_bulk(data.get('orders'), bool(data.get('all_or_nothing', True)))
+    if not result.get('success'):
+        return jsonify({k: v for k, v in result.items() if k != 'success'}), 400
+    body = {"message": f"{len(result['created'])} order(s) created", "created": result['created'], "errors": result['errors']}
+    # 207: some orders were created, others were rejected
+    return jsonify(body), 207 if result['errors'] else 201
+
 @orders_bp.route('/orders/<int:order_id>', methods=['GET'])
+@conditional_get('Orders', 'Contractors')
 def handle_get_order(order_id):
     order = order_service.get_order_by_id(order_id)
     if not order:
@@ -40,22 +66,47 @@ def handle_get_order(order_id):
     return jsonify(order)
 
 @orders_bp.route('/orders/<int:order_id>/transactions', methods=['GET'])
+@conditional_get('StockTransactions', 'StockItems')
 def handle_order_transactions(order_id):
-    transactions = order_service.get_transactions_by_order_id(order_id)
+    try:
+        transactions = order_service.get_transactions_by_order_id(order_id, pagination.page_from_args(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(transactions)
 
 @orders_bp.route('/orders/<int:order_id>/payments', methods=['GET'])
+@conditional_get('Payments')
 def handle_order_payments(order_id):
-    payments = order_service.get_payments_by_order_id(order_id)
+    try:
+        payments = order_service.get_payments_by_order_id(order_id, pagination.page_from_args(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(payments)
 
 @orders_bp.route('/orders/<int:order_id>/financials', methods=['GET'])
+@conditional_get(*FINANCIAL_TABLES)
 def handle_get_financials(order_id):
     financials = order_service.get_order_financials(order_id)
     if not financials:
         return jsonify({"error": "Order not found"}), 404
     return jsonify(financials)
 
+# NEW: Financials for many orders in one call, e.g. {"order_ids": [1, 2, 3]}
+@orders_bp.route('/orders/financials', methods=['POST'])
+def handle_batch_financials():
+    data = request.get_json(silent=True) or {}
+    order_ids = data.get('order_ids')
+    if not isinstance(order_ids, list):
+        return jsonify({"error": "'order_ids' must be a list"}), 400
+    max_ids = current_app.config.get('PAGE_SIZE_MAX', 1000)
+    if len(order_ids) > max_ids:
+        return jsonify({"error": f"At most {max_ids} order IDs per request"}), 400
+    try:
+        financials = order_service.get_financials_for_orders(order_ids)
+    except (TypeError, ValueError):
+        return jsonify({"error": "'order_ids' must contain order IDs"}), 400
+    return jsonify({str(order_id): f for order_id, f in financials.items()})
+
 # This endpoint is now handled by the dedicated payments blueprint
 # @orders_bp.route('/orders/<int:order_id>/payment', ...)
 
@@ -106,17 +157,21 @@ def handle_reassign_order(order_id):
 @orders_bp.route('/orders/<int:order_id>/issue-stock', methods=['POST'])
 def handle_issue_stock_to_order(order_id):
     data = request.get_json()
-    if not all(k in data for k in ['stock_id', 'weight']):
-        return jsonify({"error": "Missing 'stock_id' or 'weight'"}), 400
-    
-    # ADDED: Handle optional transaction date
-    transaction_date = data.get('transaction_date')
-    
-    result = order_service.issue_stock_to_order(
-        order_id, data['stock_id'], data['weight'], transaction_date
-    )
+    # NEW: Several lines at once as {"lines": [{"stock_id", "weight", "transaction_date"}, ...]}
+    if 'lines' in data:
+        result = order_service.issue_stock_lines_to_order(order_id, data['lines'])
+    else:
+        if not all(k in data for k in ['stock_id', 'weight']):
+            return jsonify({"error": "Missing 'stock_id' or 'weight'"}), 400
+        
+        # ADDED: Handle optional transaction date
+        transaction_date = data.get('transaction_date')
+        
+        result = order_service.issue_stock_to_order(
+            order_id, data['stock_id'], data['weight'], transaction_date
+        )
     
     if result.get('success'):
-        return jsonify({"message": "Stock issued successfully"}), 200
+        return jsonify({"message": "Stock issued successfully", "issued": result['issued']}), 200
     else:
         return jsonify({"error": result.get('error', 'Unknown error')}), 400
\ No newline at end of file
@@ -5,6 +5,7 @@
 from flask import Blueprint, jsonify, request
 # MODIFIED: Import more services
 from app.services.payment_service import add_payment, update_payment, delete_payment
+from app.services import payroll_service, sheet_import
 
 payments_bp = Blueprint('payments_api', __name__)
 
@@ -42,4 +43,66 @@ def handle_payment_by_id(payment_id):
         if result.get('success'):
             return jsonify({"message": "Payment deleted successfully"}), 204
         else:
-            return jsonify({"error": result.get('error', 'Unknown error')}), 400
\ No newline at end of file
+            return jsonify({"error": result.get('error', 'Unknown error')}), 400
+
+def _payroll_options(data):
+    contractor_ids = data.get('contractor_ids') or None
+    if contractor_ids is not None and (
+        not isinstance(contractor_ids, list)
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in contractor_ids)
+    ):
+        raise ValueError("'contractor_ids' must be a list of contractor IDs")
+    try:
+        min_amount = float(data.get('min_amount', 0.01))
+    except (TypeError, ValueError):
+        raise ValueError("'min_amount' must be a number")
+    return {
+        "basis": data.get('basis', 'order'),
+        "contractor_ids": contractor_ids,
+        "status": data.get('status') or None,
+        "min_amount": min_amount,
+    }
+
+# NEW: Wage-day payroll. The preview lists what every contractor/order is owed;
+# the run pays exactly that in one transaction. Body (all optional):
+# { basis: 'order'|'contractor', contractor_ids, status, min_amount } and, for the run,
+# { payment_date, notes, expected_total } where expected_total is the previewed total.
+@payments_bp.route('/payroll/preview', methods=['POST'])
+def preview_payroll():
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(payroll_service.compute_payroll(**_payroll_options(data))), 200
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+@payments_bp.route('/payroll/run', methods=['POST'])
+def run_payroll():
+    data = request.get_json(silent=True) or {}
+    try:
+        options = _payroll_options(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    result = payroll_service.run_payroll(
+        **options,
+        payment_date=data.get('payment_date'),
+        notes=data.get('notes', 'Payroll'),
+        expected_total=data.get('expected_total'),
+    )
+    if result.get('success'):
+        return jsonify(result), 201
+    return jsonify(result), 409 if result.get('conflict') else 400
+
+# NEW: Bulk payment import from a .csv/.xlsx sheet (multipart field 'file');
+# ?dry_run=1 validates and reports without saving.
+@payments_bp.route('/payments/import', methods=['POST'])
+def import_payments():
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({"error": "No file uploaded (expected multipart field 'file')"}), 400
+    fmt = request.form.get('format') or sheet_import.format_from_filename(upload.filename)
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+
+    result = payroll_service.import_payments(upload.stream, fmt, dry_run=dry_run)
+    if not result.get('success'):
+        return jsonify(result), 400
+    return jsonify(result), 200
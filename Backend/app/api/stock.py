@@ -1,11 +1,13 @@
 # /app/api/stock.py
 
 from flask import Blueprint, jsonify, request
-from app.services import stock_service
+from app.services import stock_service, stock_import_service, sheet_import, pagination
+from app.api.conditional import conditional_get
 
 stock_bp = Blueprint('stock_api', __name__)
 
 @stock_bp.route('/stock_items', methods=['GET', 'POST'])
+@conditional_get('StockItems')
 def handle_stock_items():
     if request.method == 'POST':
         data = request.get_json()
@@ -23,13 +25,32 @@ def handle_stock_items():
     search_quality = request.args.get('search_quality')
     search_color = request.args.get('search_color')
 
-    items = stock_service.get_all_stock_items(
-        search_type=search_type,
-        search_quality=search_quality,
-        search_color=search_color
-    )
+    try:
+        items = stock_service.get_all_stock_items(
+            search_type=search_type,
+            search_quality=search_quality,
+            search_color=search_color,
+            page=pagination.page_from_args(request.args)
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(items)
 
+# NEW: Upload a supplier sheet (multipart field 'file', .csv or .xlsx) to add/top up stock items.
+# ?dry_run=1 returns the summary without saving anything.
+@stock_bp.route('/stock_items/import', methods=['POST'])
+def import_stock_items():
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({"error": "No file uploaded (expected multipart field 'file')"}), 400
+    fmt = request.form.get('format') or sheet_import.format_from_filename(upload.filename)
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+
+    result = stock_import_service.import_stock_file(upload.stream, fmt, dry_run=dry_run)
+    if not result.get('success'):
+        return jsonify(result), 400
+    return jsonify(result), 200
+
 @stock_bp.route('/stock_items/<int:stock_id>', methods=['PUT'])
 def update_stock_item(stock_id):
     data = request.get_json()
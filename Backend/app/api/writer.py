@@ -0,0 +1,10 @@
+# /app/api/writer.py
+from flask import Blueprint, jsonify
+from app.database.writer import get_writer_stats
+
+writer_bp = Blueprint('writer_api', __name__)
+
+@writer_bp.route('/writer/status', methods=['GET'])
+def handle_writer_status():
+    """Batch counters of the write executor (group commit), when it is enabled."""
+    return jsonify(get_writer_stats())
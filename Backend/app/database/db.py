@@ -1,118 +1,52 @@
 # /app/database/db.py
 
+import random
 import sqlite3
+import time
 import click
 from flask import current_app, g
 from flask.cli import with_appcontext
+from .pool import ConnectionPool, pragmas_from_config
+from . import instrumentation
+from .migrations import migrate, migrate_db_command
+from .rollups import check_rollups_command
 
 def get_db():
     if 'db' not in g:
-        g.db = sqlite3.connect(
-            current_app.config['DB_PATH'],
-            detect_types=sqlite3.PARSE_DECLTYPES
-        )
-        g.db.row_factory = sqlite3.Row
+        g.db = current_app.extensions['db_pool'].acquire()
+        instrumentation.start_request(g.db)
     return g.db
 
+def begin_immediate(db):
+    """
+    Starts a write transaction right away (BEGIN IMMEDIATE), so everything a
+    service reads before writing is read under the write lock. If the lock is
+    still taken once busy_timeout has run out, retries a bounded number of
+    times with jittered exponential backoff before giving up.
+    On the write executor's connection the batch transaction is already open.
+    """
+    if getattr(db, 'in_group', False):
+        return
+    retries = current_app.config.get('DB_WRITE_RETRIES', 5)
+    backoff = current_app.config.get('DB_WRITE_BACKOFF_MS', 20) / 1000.0
+    for attempt in range(retries + 1):
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            message = str(e).lower()
+            if attempt == retries or ('locked' not in message and 'busy' not in message):
+                raise
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
 def close_db(e=None):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        current_app.extensions['db_pool'].release(db)
 
 def init_db():
-    db = get_db()
-    
-    db.executescript('''
-        -- Contractors table
-        CREATE TABLE IF NOT EXISTS Contractors (
-            ContractorID INTEGER PRIMARY KEY AUTOINCREMENT, 
-            Name TEXT NOT NULL, 
-            ContactInfo TEXT
-        );
-
-        -- StockItems table
-        CREATE TABLE IF NOT EXISTS StockItems (
-            StockID INTEGER PRIMARY KEY AUTOINCREMENT, 
-            Type TEXT NOT NULL, 
-            Quality TEXT NOT NULL,
-            ColorShadeNumber TEXT,
-            CurrentPricePerKg REAL NOT NULL, 
-            QuantityInStockKg REAL NOT NULL,
-            CONSTRAINT uq_stock_item UNIQUE (Type, Quality, ColorShadeNumber)
-        );
-
-        -- Orders table is the central table for all work
-        CREATE TABLE IF NOT EXISTS Orders (
-            OrderID INTEGER PRIMARY KEY AUTOINCREMENT,
-            ContractorID INTEGER NOT NULL,
-            DesignNumber TEXT NOT NULL,
-            ShadeCard TEXT,
-            Quality TEXT, -- Carpet Quality e.g., "60x60"
-            Size TEXT, -- Carpet Size e.g., "8x10 ft"
-            DateIssued TEXT NOT NULL,
-            DateDue TEXT,
-            DateCompleted TEXT,
-            PenaltyPerDay REAL NOT NULL DEFAULT 0,
-            Notes TEXT,
-            Status TEXT NOT NULL DEFAULT 'Open', -- 'Open' or 'Closed'
-            
-            -- NEW: Fields for area-based wage calculation
-            Length REAL,
-            Width REAL,
-            PricePerSqFt REAL,
-            Wage REAL, -- This will store the final, possibly overridden, wage.
-
-            FOREIGN KEY (ContractorID) REFERENCES Contractors(ContractorID)
-        );
-
-        -- StockTransactions links directly to Orders
-        CREATE TABLE IF NOT EXISTS StockTransactions (
-            TransactionID INTEGER PRIMARY KEY AUTOINCREMENT, 
-            OrderID INTEGER NOT NULL, 
-            StockID INTEGER NOT NULL,
-            TransactionType TEXT NOT NULL CHECK(TransactionType IN ('Issued', 'Returned')),
-            WeightKg REAL NOT NULL, 
-            PricePerKgAtTimeOfTransaction REAL NOT NULL,
-            TransactionDate TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            Notes TEXT,
-            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID),
-            FOREIGN KEY (StockID) REFERENCES StockItems(StockID)
-        );
-
-        -- Payments links to Orders or can be general
-        CREATE TABLE IF NOT EXISTS Payments (
-            PaymentID INTEGER PRIMARY KEY AUTOINCREMENT,
-            OrderID INTEGER, -- Can be null for general payments
-            ContractorID INTEGER NOT NULL,
-            PaymentDate TEXT NOT NULL,
-            Amount REAL NOT NULL,
-            Notes TEXT,
-            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID),
-            FOREIGN KEY (ContractorID) REFERENCES Contractors(ContractorID)
-        );
-        
-        -- Deductions table to track financial cuts during order completion
-        CREATE TABLE IF NOT EXISTS Deductions (
-            DeductionID INTEGER PRIMARY KEY AUTOINCREMENT,
-            OrderID INTEGER NOT NULL,
-            Amount REAL NOT NULL,
-            Reason TEXT NOT NULL,
-            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID)
-        );
-
-        -- NEW: Table to log contractor reassignments
-        CREATE TABLE IF NOT EXISTS OrderReassignmentLog (
-            LogID INTEGER PRIMARY KEY AUTOINCREMENT,
-            OrderID INTEGER NOT NULL,
-            OldContractorID INTEGER NOT NULL,
-            NewContractorID INTEGER NOT NULL,
-            ReassignmentDate TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            Reason TEXT,
-            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID),
-            FOREIGN KEY (OldContractorID) REFERENCES Contractors(ContractorID),
-            FOREIGN KEY (NewContractorID) REFERENCES Contractors(ContractorID)
-        );
-    ''')
+    """Creates the schema on a new database, or brings an existing one up to date."""
+    migrate(get_db())
     print("Database schema initialized.")
 
 @click.command('init-db')
@@ -122,5 +56,19 @@ def init_db_command():
     click.echo('Initialized the database.')
 
 def init_app(app):
+    app.extensions['db_pool'] = ConnectionPool(
+        app.config['DB_PATH'],
+        pragmas_from_config(app.config),
+        max_idle=app.config.get('DB_POOL_SIZE', 8),
+        factory=instrumentation.connection_factory(app.config)
+    )
+    instrumentation.init_app(app)
     app.teardown_appcontext(close_db)
-    app.cli.add_command(init_db_command)
\ No newline at end of file
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_db_command)
+    app.cli.add_command(check_rollups_command)
+
+    # Existing databases pick up new tables, indexes and triggers on startup
+    if app.config.get('DB_MIGRATE_ON_STARTUP', True):
+        with app.app_context():
+            migrate(get_db())
\ No newline at end of file
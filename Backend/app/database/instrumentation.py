@@ -0,0 +1,120 @@
+# /app/database/instrumentation.py
+
+import logging
+import sqlite3
+import time
+from flask import g
+
+logger = logging.getLogger('app.sql')
+
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class QueryStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total_ms = 0.0
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times every statement and reports slow ones."""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection._record(sql, parameters, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection._record(sql, None, started)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self.connection._record(sql_script, None, started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connection used when SQL_INSTRUMENTATION is on. Counts statements and
+    their execution time for the current request and logs any statement
+    slower than slow_query_ms together with its query plan.
+    """
+
+    slow_query_ms = 100.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = QueryStats()
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def _record(self, sql, parameters, started):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats.count += 1
+        self.stats.total_ms += elapsed_ms
+        if elapsed_ms >= self.slow_query_ms:
+            self._log_slow_query(sql, parameters, elapsed_ms)
+
+    def _log_slow_query(self, sql, parameters, elapsed_ms):
+        plan = ''
+        if parameters is not None and sql.lstrip().upper().startswith(_EXPLAINABLE):
+            try:
+                rows = sqlite3.Connection.execute(self, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+                plan = "\n".join(f"    {row[3]}" for row in rows)
+            except sqlite3.Error as e:
+                plan = f"    (no plan: {e})"
+        logger.warning(
+            "Slow query (%.1f ms): %s\n  params: %r%s",
+            elapsed_ms, " ".join(sql.split()), parameters, f"\n  plan:\n{plan}" if plan else ''
+        )
+
+
+def connection_factory(config):
+    """The connection class for the pool, or None for plain (zero-overhead) connections."""
+    if not config.get('SQL_INSTRUMENTATION', True):
+        return None
+    return type('InstrumentedConnection', (InstrumentedConnection,), {
+        'slow_query_ms': float(config.get('SLOW_QUERY_MS', 100.0)),
+    })
+
+
+def start_request(conn):
+    stats = getattr(conn, 'stats', None)
+    if stats is not None:
+        stats.reset()
+
+
+def add_query_headers(response):
+    """after_request hook: reports the request's query count and database time."""
+    conn = g.get('db')
+    stats = getattr(conn, 'stats', None)
+    if stats is not None:
+        response.headers['X-DB-Query-Count'] = str(stats.count)
+        response.headers['X-DB-Time-Ms'] = f"{stats.total_ms:.2f}"
+    return response
+
+
+def init_app(app):
+    if app.config.get('SQL_INSTRUMENTATION', True):
+        app.after_request(add_query_headers)
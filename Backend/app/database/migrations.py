@@ -0,0 +1,190 @@
+# /app/database/migrations.py
+
+import datetime
+import sqlite3
+import click
+from flask.cli import with_appcontext
+from . import schema
+from .rollups import get_rollup
+
+
+class Migration:
+    """
+    One schema step. `sql` is run as a script; `apply` is a callable taking the
+    connection for steps that need Python (e.g. backfills). `touches` lists the
+    tables whose rows the step has to read or write, for the dry-run estimate.
+    """
+
+    def __init__(self, version, name, sql=None, apply=None, touches=()):
+        self.version = version
+        self.name = name
+        self.sql = sql
+        self.apply = apply
+        self.touches = touches
+
+    def run(self, db):
+        if self.sql:
+            for statement in _split_statements(self.sql() if callable(self.sql) else self.sql):
+                db.execute(statement)
+        if self.apply:
+            self.apply(db)
+
+
+def fts5_available(db):
+    return bool(db.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+
+
+def _create_order_search(db):
+    # Order search falls back to LIKE when this SQLite build has no FTS5
+    if not fts5_available(db):
+        print("FTS5 is not available in this SQLite build; order search will use LIKE.")
+        return
+    for statement in _split_statements(schema.ORDER_SEARCH_SCHEMA):
+        db.execute(statement)
+
+
+def _create_rollup(db, script, *names):
+    for statement in _split_statements(script):
+        db.execute(statement)
+    for name in names:
+        for statement in get_rollup(name).rebuild:
+            db.execute(statement)
+
+
+def _track_modified_at(db):
+    # Databases from before ModifiedAt existed get the column and the newer triggers
+    columns = {row['name'] for row in db.execute("PRAGMA table_info(TableVersions)")}
+    if 'ModifiedAt' not in columns:
+        db.execute("ALTER TABLE TableVersions ADD COLUMN ModifiedAt TEXT")
+    for table in schema.TRACKED_TABLES:
+        for event in ('insert', 'update', 'delete'):
+            db.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version_{event}")
+    for statement in _split_statements(schema.change_tracking_triggers()):
+        db.execute(statement)
+    db.execute(f"UPDATE TableVersions SET ModifiedAt = {schema.NOW_MS} WHERE ModifiedAt IS NULL")
+
+
+MIGRATIONS = [
+    Migration(1, 'Base schema', sql=schema.BASE_SCHEMA),
+    Migration(2, 'Table change tracking for incremental export',
+              sql=lambda: schema.CHANGE_TRACKING_SCHEMA + schema.change_tracking_triggers()),
+    Migration(3, 'Secondary indexes for service lookups', sql=schema.index_script(schema.SERVICE_INDEXES),
+              touches=('StockTransactions', 'Payments', 'Deductions', 'Orders', 'OrderReassignmentLog')),
+    Migration(4, 'Full-text search index over orders', apply=_create_order_search,
+              touches=('Orders', 'Contractors')),
+    Migration(5, 'Per-order stock holdings rollup', apply=lambda db: _create_rollup(db, schema.STOCK_HOLDINGS_SCHEMA, 'holdings'),
+              touches=('StockTransactions',)),
+    Migration(6, 'Per-order balance rollup', apply=lambda db: _create_rollup(db, schema.ORDER_BALANCES_SCHEMA, 'balances'),
+              touches=('Orders', 'Payments', 'StockTransactions', 'Deductions')),
+    Migration(7, 'Contractor balance rollups by carpet quality',
+              apply=lambda db: _create_rollup(db, schema.CONTRACTOR_BALANCES_SCHEMA, 'contractor-quality', 'general-payments'),
+              touches=('Orders', 'Payments', 'StockTransactions', 'Deductions')),
+    Migration(8, 'Indexes for keyset pagination', sql=schema.index_script(schema.PAGINATION_INDEXES),
+              touches=('Contractors', 'Payments')),
+    Migration(9, 'Table change times for conditional GET', apply=_track_modified_at),
+]
+
+
+def _split_statements(script):
+    """Splits a script into complete statements (trigger bodies contain ';')."""
+    statements, current = [], ''
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            if current.strip():
+                statements.append(current.strip())
+            current = ''
+    if current.strip() and not current.strip().startswith('--'):
+        statements.append(current.strip())
+    return statements
+
+
+def _ensure_migrations_table(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaMigrations (
+            Version INTEGER PRIMARY KEY,
+            Name TEXT NOT NULL,
+            AppliedAt TEXT NOT NULL
+        )
+    """)
+    db.commit()
+
+
+def applied_versions(db, create=True):
+    """Versions recorded in SchemaMigrations. With create=False (dry runs) nothing is written."""
+    if create:
+        _ensure_migrations_table(db)
+    elif not db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'SchemaMigrations'").fetchone():
+        return set()
+    return {row['Version'] for row in db.execute("SELECT Version FROM SchemaMigrations")}
+
+
+def pending_migrations(db, create=True):
+    done = applied_versions(db, create)
+    return [m for m in sorted(MIGRATIONS, key=lambda m: m.version) if m.version not in done]
+
+
+def estimate_cost(db, migration):
+    """Row counts of the tables a pending step will touch."""
+    existing = {row['name'] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return {
+        table: db.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] if table in existing else 0
+        for table in migration.touches
+    }
+
+
+def migrate(db, dry_run=False, echo=print):
+    """
+    Applies pending migrations in order, each in its own transaction, then
+    refreshes the planner statistics. Returns the list of applied versions
+    (or, for a dry run, the versions that would be applied).
+    """
+    pending = pending_migrations(db, create=not dry_run)
+    if dry_run:
+        for m in pending:
+            cost = estimate_cost(db, m)
+            detail = ", ".join(f"{t}: {n} rows" for t, n in cost.items()) or "schema only"
+            echo(f"  {m.version:>3}  {m.name}  ({detail}; ~{sum(cost.values())} rows touched)")
+        if not pending:
+            echo("  Database is up to date.")
+        return [m.version for m in pending]
+
+    applied = []
+    for m in pending:
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            # Another process starting up at the same time may have applied it meanwhile
+            if db.execute("SELECT 1 FROM SchemaMigrations WHERE Version = ?", (m.version,)).fetchone():
+                db.rollback()
+                continue
+            m.run(db)
+            db.execute(
+                "INSERT INTO SchemaMigrations (Version, Name, AppliedAt) VALUES (?, ?, ?)",
+                (m.version, m.name, datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        applied.append(m.version)
+        echo(f"Applied migration {m.version}: {m.name}")
+
+    if applied:
+        # Fresh statistics so the planner knows about new tables and indexes
+        db.execute("ANALYZE")
+    db.execute("PRAGMA optimize")
+    db.commit()
+    return applied
+
+
+@click.command('migrate-db')
+@click.option('--dry-run', is_flag=True, help='List pending migrations and their estimated cost without applying them.')
+@with_appcontext
+def migrate_db_command(dry_run):
+    from .db import get_db
+    db = get_db()
+    if dry_run:
+        click.echo('Pending migrations:')
+    applied = migrate(db, dry_run=dry_run, echo=click.echo)
+    if not dry_run:
+        click.echo(f'Applied {len(applied)} migration(s).' if applied else 'Database is up to date.')
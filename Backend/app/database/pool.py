@@ -0,0 +1,76 @@
+# /app/database/pool.py
+
+import sqlite3
+import threading
+
+
+def pragmas_from_config(config):
+    """Builds the ordered list of PRAGMAs applied to every new connection."""
+    pragmas = [
+        ('journal_mode', config.get('DB_JOURNAL_MODE')),
+        ('synchronous', config.get('DB_SYNCHRONOUS')),
+        ('busy_timeout', config.get('DB_BUSY_TIMEOUT_MS')),
+        ('cache_size', config.get('DB_CACHE_SIZE')),
+        ('mmap_size', config.get('DB_MMAP_SIZE')),
+        ('temp_store', config.get('DB_TEMP_STORE')),
+    ]
+    foreign_keys = config.get('DB_FOREIGN_KEYS')
+    if foreign_keys is not None:
+        pragmas.append(('foreign_keys', 'ON' if foreign_keys else 'OFF'))
+    return [(name, value) for name, value in pragmas if value is not None]
+
+
+class ConnectionPool:
+    """
+    Keeps open SQLite connections between requests so the connect and PRAGMA
+    setup cost is paid once per connection instead of once per request.
+    A connection is only ever used by one thread at a time.
+    """
+
+    def __init__(self, db_path, pragmas=(), max_idle=8, factory=None):
+        self.db_path = db_path
+        self.pragmas = list(pragmas)
+        self.max_idle = max_idle
+        self.factory = factory or sqlite3.Connection
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def connect(self):
+        busy_timeout_ms = dict(self.pragmas).get('busy_timeout', 5000)
+        conn = sqlite3.connect(
+            self.db_path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            timeout=int(busy_timeout_ms) / 1000.0,
+            check_same_thread=False,
+            factory=self.factory
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self.connect()
+
+    def release(self, conn):
+        try:
+            # Never hand out a connection with a transaction left open
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
@@ -0,0 +1,217 @@
+# /app/database/rollups.py
+# Rollup tables maintained incrementally by triggers, and the tools to check
+# them against the source tables or rebuild them from scratch.
+
+import click
+from flask.cli import with_appcontext
+
+# Differences below this are floating point noise from summing in another order
+TOLERANCE = 1e-6
+
+
+# The from-scratch calculation that OrderBalances keeps incrementally
+# (the same subqueries get_order_financials used to run on every call)
+ORDER_BALANCE_COLUMNS = """
+    (SELECT IFNULL(SUM(Amount), 0) FROM Payments WHERE OrderID = o.OrderID) AS AmountPaid,
+    (SELECT IFNULL(SUM(WeightKg * PricePerKgAtTimeOfTransaction), 0) FROM StockTransactions WHERE OrderID = o.OrderID AND TransactionType = 'Issued') AS IssuedValue,
+    (SELECT IFNULL(SUM(WeightKg * PricePerKgAtTimeOfTransaction), 0) FROM StockTransactions WHERE OrderID = o.OrderID AND TransactionType = 'Returned') AS ReturnedValue,
+    (SELECT IFNULL(SUM(Amount), 0) FROM Deductions WHERE OrderID = o.OrderID) AS TotalDeductions
+"""
+
+
+# Per (contractor, carpet quality) totals over the orders the contractor currently holds
+CONTRACTOR_QUALITY_EXPECTED = """
+    SELECT o.ContractorID, o.Quality, COUNT(*) AS OrderCount,
+           TOTAL(o.Wage) AS TotalWages,
+           TOTAL((SELECT SUM(WeightKg * PricePerKgAtTimeOfTransaction) FROM StockTransactions WHERE OrderID = o.OrderID AND TransactionType = 'Issued')) AS IssuedValue,
+           TOTAL((SELECT SUM(WeightKg * PricePerKgAtTimeOfTransaction) FROM StockTransactions WHERE OrderID = o.OrderID AND TransactionType = 'Returned')) AS ReturnedValue,
+           TOTAL((SELECT SUM(Amount) FROM Deductions WHERE OrderID = o.OrderID)) AS Deductions,
+           TOTAL((SELECT SUM(Amount) FROM Payments WHERE OrderID = o.OrderID AND ContractorID = o.ContractorID)) AS OrderPayments
+    FROM Orders o GROUP BY o.ContractorID, o.Quality
+"""
+
+# Payments not made against an order the paying contractor currently holds
+GENERAL_PAYMENTS_EXPECTED = """
+    SELECT p.ContractorID, TOTAL(p.Amount) AS GeneralPayments
+    FROM Payments p
+    WHERE NOT EXISTS (SELECT 1 FROM Orders o WHERE o.OrderID = p.OrderID AND o.ContractorID = p.ContractorID)
+    GROUP BY p.ContractorID
+"""
+
+
+class Rollup:
+    """
+    `rebuild` is a list of statements that recompute the rollup from scratch.
+    `verify` is a query returning one row per drifted key with the stored and
+    the expected values.
+    """
+
+    def __init__(self, name, table, rebuild, verify):
+        self.name = name
+        self.table = table
+        self.rebuild = rebuild
+        self.verify = verify
+
+
+ROLLUPS = [
+    Rollup(
+        'holdings', 'StockHoldings',
+        rebuild=[
+            "DELETE FROM StockHoldings",
+            """INSERT INTO StockHoldings (OrderID, StockID, IssuedKg, ReturnedKg)
+               SELECT OrderID, StockID,
+                      SUM(CASE WHEN TransactionType = 'Issued' THEN WeightKg ELSE 0 END),
+                      SUM(CASE WHEN TransactionType = 'Issued' THEN 0 ELSE WeightKg END)
+               FROM StockTransactions GROUP BY OrderID, StockID""",
+        ],
+        verify=f"""
+            WITH expected AS (
+                SELECT OrderID, StockID,
+                       SUM(CASE WHEN TransactionType = 'Issued' THEN WeightKg ELSE 0 END) AS IssuedKg,
+                       SUM(CASE WHEN TransactionType = 'Issued' THEN 0 ELSE WeightKg END) AS ReturnedKg
+                FROM StockTransactions GROUP BY OrderID, StockID
+            ),
+            stored AS (
+                SELECT OrderID, StockID, IssuedKg, ReturnedKg FROM StockHoldings
+            ),
+            keys AS (
+                SELECT OrderID, StockID FROM expected UNION SELECT OrderID, StockID FROM stored
+            )
+            SELECT k.OrderID, k.StockID,
+                   IFNULL(s.IssuedKg, 0) AS StoredIssuedKg, IFNULL(e.IssuedKg, 0) AS ExpectedIssuedKg,
+                   IFNULL(s.ReturnedKg, 0) AS StoredReturnedKg, IFNULL(e.ReturnedKg, 0) AS ExpectedReturnedKg
+            FROM keys k
+            LEFT JOIN expected e ON e.OrderID = k.OrderID AND e.StockID = k.StockID
+            LEFT JOIN stored s ON s.OrderID = k.OrderID AND s.StockID = k.StockID
+            WHERE ABS(IFNULL(s.IssuedKg, 0) - IFNULL(e.IssuedKg, 0)) > {TOLERANCE}
+               OR ABS(IFNULL(s.ReturnedKg, 0) - IFNULL(e.ReturnedKg, 0)) > {TOLERANCE}
+        """,
+    ),
+    Rollup(
+        'balances', 'OrderBalances',
+        rebuild=[
+            "DELETE FROM OrderBalances",
+            f"""INSERT INTO OrderBalances (OrderID, AmountPaid, IssuedValue, ReturnedValue, TotalDeductions)
+                SELECT o.OrderID, {ORDER_BALANCE_COLUMNS} FROM Orders o""",
+        ],
+        verify=f"""
+            WITH expected AS (
+                SELECT o.OrderID, {ORDER_BALANCE_COLUMNS} FROM Orders o
+            )
+            SELECT e.OrderID,
+                   b.AmountPaid AS StoredAmountPaid, e.AmountPaid AS ExpectedAmountPaid,
+                   b.IssuedValue AS StoredIssuedValue, e.IssuedValue AS ExpectedIssuedValue,
+                   b.ReturnedValue AS StoredReturnedValue, e.ReturnedValue AS ExpectedReturnedValue,
+                   b.TotalDeductions AS StoredTotalDeductions, e.TotalDeductions AS ExpectedTotalDeductions
+            FROM expected e LEFT JOIN OrderBalances b ON b.OrderID = e.OrderID
+            WHERE b.OrderID IS NULL
+               OR ABS(b.AmountPaid - e.AmountPaid) > {TOLERANCE}
+               OR ABS(b.IssuedValue - e.IssuedValue) > {TOLERANCE}
+               OR ABS(b.ReturnedValue - e.ReturnedValue) > {TOLERANCE}
+               OR ABS(b.TotalDeductions - e.TotalDeductions) > {TOLERANCE}
+        """,
+    ),
+    Rollup(
+        'contractor-quality', 'ContractorQualityBalances',
+        rebuild=[
+            "DELETE FROM ContractorQualityBalances",
+            f"""INSERT INTO ContractorQualityBalances
+                    (ContractorID, Quality, OrderCount, TotalWages, IssuedValue, ReturnedValue, Deductions, OrderPayments)
+                {CONTRACTOR_QUALITY_EXPECTED}""",
+        ],
+        verify=f"""
+            WITH expected AS ({CONTRACTOR_QUALITY_EXPECTED}),
+            stored AS (
+                SELECT ContractorID, Quality, OrderCount, TotalWages, IssuedValue, ReturnedValue, Deductions, OrderPayments
+                FROM ContractorQualityBalances
+            ),
+            keys AS (
+                SELECT ContractorID, Quality FROM expected UNION SELECT ContractorID, Quality FROM stored
+            )
+            SELECT k.ContractorID, k.Quality,
+                   s.OrderCount AS StoredOrderCount, e.OrderCount AS ExpectedOrderCount,
+                   s.TotalWages AS StoredTotalWages, e.TotalWages AS ExpectedTotalWages,
+                   s.IssuedValue AS StoredIssuedValue, e.IssuedValue AS ExpectedIssuedValue,
+                   s.ReturnedValue AS StoredReturnedValue, e.ReturnedValue AS ExpectedReturnedValue,
+                   s.Deductions AS StoredDeductions, e.Deductions AS ExpectedDeductions,
+                   s.OrderPayments AS StoredOrderPayments, e.OrderPayments AS ExpectedOrderPayments
+            FROM keys k
+            LEFT JOIN expected e ON e.ContractorID = k.ContractorID AND e.Quality IS k.Quality
+            LEFT JOIN stored s ON s.ContractorID = k.ContractorID AND s.Quality IS k.Quality
+            WHERE e.ContractorID IS NULL OR s.ContractorID IS NULL
+               OR s.OrderCount <> e.OrderCount
+               OR ABS(s.TotalWages - e.TotalWages) > {TOLERANCE}
+               OR ABS(s.IssuedValue - e.IssuedValue) > {TOLERANCE}
+               OR ABS(s.ReturnedValue - e.ReturnedValue) > {TOLERANCE}
+               OR ABS(s.Deductions - e.Deductions) > {TOLERANCE}
+               OR ABS(s.OrderPayments - e.OrderPayments) > {TOLERANCE}
+        """,
+    ),
+    Rollup(
+        'general-payments', 'ContractorBalances',
+        rebuild=[
+            "DELETE FROM ContractorBalances",
+            f"INSERT INTO ContractorBalances (ContractorID, GeneralPayments) {GENERAL_PAYMENTS_EXPECTED}",
+        ],
+        verify=f"""
+            WITH expected AS ({GENERAL_PAYMENTS_EXPECTED}),
+            keys AS (
+                SELECT ContractorID FROM expected UNION SELECT ContractorID FROM ContractorBalances
+            )
+            SELECT k.ContractorID,
+                   IFNULL(s.GeneralPayments, 0) AS StoredGeneralPayments,
+                   IFNULL(e.GeneralPayments, 0) AS ExpectedGeneralPayments
+            FROM keys k
+            LEFT JOIN expected e ON e.ContractorID = k.ContractorID
+            LEFT JOIN ContractorBalances s ON s.ContractorID = k.ContractorID
+            WHERE ABS(IFNULL(s.GeneralPayments, 0) - IFNULL(e.GeneralPayments, 0)) > {TOLERANCE}
+        """,
+    ),
+]
+
+
+def get_rollup(name):
+    for rollup in ROLLUPS:
+        if rollup.name == name:
+            return rollup
+    raise KeyError(name)
+
+
+def verify_rollup(db, rollup):
+    """Recomputes the rollup from the source tables and returns the drifted rows."""
+    return [dict(row) for row in db.execute(rollup.verify)]
+
+
+def rebuild_rollup(db, rollup):
+    from .db import begin_immediate
+    begin_immediate(db)
+    try:
+        for statement in rollup.rebuild:
+            db.execute(statement)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+@click.command('check-rollups')
+@click.argument('names', nargs=-1)
+@click.option('--rebuild', is_flag=True, help='Recompute the rollups from scratch instead of only checking them.')
+@with_appcontext
+def check_rollups_command(names, rebuild):
+    """Verifies (or rebuilds) the incrementally maintained rollup tables."""
+    from .db import get_db
+    db = get_db()
+    selected = [get_rollup(n) for n in names] if names else ROLLUPS
+    for rollup in selected:
+        if rebuild:
+            rebuild_rollup(db, rollup)
+            click.echo(f"{rollup.name}: rebuilt {rollup.table}")
+            continue
+        drift = verify_rollup(db, rollup)
+        if not drift:
+            click.echo(f"{rollup.name}: OK")
+            continue
+        click.echo(f"{rollup.name}: {len(drift)} row(s) drifted")
+        for row in drift[:20]:
+            click.echo(f"  {row}")
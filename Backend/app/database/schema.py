@@ -0,0 +1,574 @@
+# /app/database/schema.py
+# Table definitions and schema objects used by the migrations.
+
+# Tables whose changes are counted in TableVersions. Version is bumped on every
+# insert/update/delete; RewriteVersion only on update/delete, so a consumer can
+# tell when a table has only been appended to since it last looked.
+# ModifiedAt is the time of the last change (UTC, milliseconds).
+TRACKED_TABLES = (
+    'Contractors', 'StockItems', 'Orders', 'StockTransactions',
+    'Payments', 'Deductions', 'OrderReassignmentLog',
+)
+
+# Secondary indexes for the hot lookups in the services. Most are covering
+# (they include the summed columns) so the aggregates never touch the table.
+# Each dict is created by its own migration and must not change once shipped;
+# new indexes go in a new dict with a new migration.
+SERVICE_INDEXES = {
+    # Per-order stock sums, outstanding stock per (order, stock) and price lookups
+    'idx_StockTransactions_order': 'StockTransactions (OrderID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction)',
+    'idx_StockTransactions_stock': 'StockTransactions (StockID, TransactionType)',
+    'idx_Payments_order': 'Payments (OrderID, Amount)',
+    'idx_Payments_contractor': 'Payments (ContractorID, OrderID)',
+    'idx_Deductions_order': 'Deductions (OrderID, Amount)',
+    # Contractor book (orders by contractor, newest first) and held stock on open orders
+    'idx_Orders_contractor': 'Orders (ContractorID, Status, DateIssued)',
+    # Order lists, filtered by status or not, newest first
+    'idx_Orders_status_issued': 'Orders (Status, DateIssued)',
+    'idx_Orders_issued': 'Orders (DateIssued)',
+    'idx_OrderReassignmentLog_order': 'OrderReassignmentLog (OrderID)',
+}
+
+PAGINATION_INDEXES = {
+    # Contractor list pages, by name
+    'idx_Contractors_name': 'Contractors (Name, ContractorID)',
+    # Per-order payment pages, newest first
+    'idx_Payments_order_date': 'Payments (OrderID, PaymentDate, PaymentID)',
+}
+
+INDEXES = {**SERVICE_INDEXES, **PAGINATION_INDEXES}
+
+# Bookkeeping and derived tables that are not business data (skipped by exports).
+# FTS5 shadow tables are named "<Table>_<suffix>" and are skipped with their table.
+INTERNAL_TABLES = ('SchemaMigrations', 'TableVersions', 'ExcelExportState', 'OrdersSearch', 'StockHoldings', 'OrderBalances',
+                   'ContractorQualityBalances', 'ContractorBalances')
+
+BASE_SCHEMA = '''
+
+        -- Contractors table
+        CREATE TABLE IF NOT EXISTS Contractors (
+            ContractorID INTEGER PRIMARY KEY AUTOINCREMENT, 
+            Name TEXT NOT NULL, 
+            ContactInfo TEXT
+        );
+
+        -- StockItems table
+        CREATE TABLE IF NOT EXISTS StockItems (
+            StockID INTEGER PRIMARY KEY AUTOINCREMENT, 
+            Type TEXT NOT NULL, 
+            Quality TEXT NOT NULL,
+            ColorShadeNumber TEXT,
+            CurrentPricePerKg REAL NOT NULL, 
+            QuantityInStockKg REAL NOT NULL,
+            CONSTRAINT uq_stock_item UNIQUE (Type, Quality, ColorShadeNumber)
+        );
+
+        -- Orders table is the central table for all work
+        CREATE TABLE IF NOT EXISTS Orders (
+            OrderID INTEGER PRIMARY KEY AUTOINCREMENT,
+            ContractorID INTEGER NOT NULL,
+            DesignNumber TEXT NOT NULL,
+            ShadeCard TEXT,
+            Quality TEXT, -- Carpet Quality e.g., "60x60"
+            Size TEXT, -- Carpet Size e.g., "8x10 ft"
+            DateIssued TEXT NOT NULL,
+            DateDue TEXT,
+            DateCompleted TEXT,
+            PenaltyPerDay REAL NOT NULL DEFAULT 0,
+            Notes TEXT,
+            Status TEXT NOT NULL DEFAULT 'Open', -- 'Open' or 'Closed'
+            
+            -- NEW: Fields for area-based wage calculation
+            Length REAL,
+            Width REAL,
+            PricePerSqFt REAL,
+            Wage REAL, -- This will store the final, possibly overridden, wage.
+
+            FOREIGN KEY (ContractorID) REFERENCES Contractors(ContractorID)
+        );
+
+        -- StockTransactions links directly to Orders
+        CREATE TABLE IF NOT EXISTS StockTransactions (
+            TransactionID INTEGER PRIMARY KEY AUTOINCREMENT, 
+            OrderID INTEGER NOT NULL, 
+            StockID INTEGER NOT NULL,
+            TransactionType TEXT NOT NULL CHECK(TransactionType IN ('Issued', 'Returned')),
+            WeightKg REAL NOT NULL, 
+            PricePerKgAtTimeOfTransaction REAL NOT NULL,
+            TransactionDate TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            Notes TEXT,
+            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID),
+            FOREIGN KEY (StockID) REFERENCES StockItems(StockID)
+        );
+
+        -- Payments links to Orders or can be general
+        CREATE TABLE IF NOT EXISTS Payments (
+            PaymentID INTEGER PRIMARY KEY AUTOINCREMENT,
+            OrderID INTEGER, -- Can be null for general payments
+            ContractorID INTEGER NOT NULL,
+            PaymentDate TEXT NOT NULL,
+            Amount REAL NOT NULL,
+            Notes TEXT,
+            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID),
+            FOREIGN KEY (ContractorID) REFERENCES Contractors(ContractorID)
+        );
+        
+        -- Deductions table to track financial cuts during order completion
+        CREATE TABLE IF NOT EXISTS Deductions (
+            DeductionID INTEGER PRIMARY KEY AUTOINCREMENT,
+            OrderID INTEGER NOT NULL,
+            Amount REAL NOT NULL,
+            Reason TEXT NOT NULL,
+            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID)
+        );
+
+        -- NEW: Table to log contractor reassignments
+        CREATE TABLE IF NOT EXISTS OrderReassignmentLog (
+            LogID INTEGER PRIMARY KEY AUTOINCREMENT,
+            OrderID INTEGER NOT NULL,
+            OldContractorID INTEGER NOT NULL,
+            NewContractorID INTEGER NOT NULL,
+            ReassignmentDate TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            Reason TEXT,
+            FOREIGN KEY (OrderID) REFERENCES Orders(OrderID),
+            FOREIGN KEY (OldContractorID) REFERENCES Contractors(ContractorID),
+            FOREIGN KEY (NewContractorID) REFERENCES Contractors(ContractorID)
+        );
+'''
+
+CHANGE_TRACKING_SCHEMA = '''
+        -- Per-table change counters maintained by triggers
+        CREATE TABLE IF NOT EXISTS TableVersions (
+            TableName TEXT PRIMARY KEY,
+            Version INTEGER NOT NULL DEFAULT 0,
+            RewriteVersion INTEGER NOT NULL DEFAULT 0,
+            ModifiedAt TEXT
+        );
+
+        -- What the Excel workbook contained at the last export
+        CREATE TABLE IF NOT EXISTS ExcelExportState (
+            TableName TEXT PRIMARY KEY,
+            Version INTEGER NOT NULL,
+            RewriteVersion INTEGER NOT NULL,
+            LastRowID INTEGER NOT NULL
+        );
+'''
+
+NOW_MS = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+def change_tracking_triggers():
+    statements = []
+    for table in TRACKED_TABLES:
+        statements.append(f"""
+        INSERT OR IGNORE INTO TableVersions (TableName, ModifiedAt) VALUES ('{table}', {NOW_MS});
+
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_version_insert AFTER INSERT ON {table}
+        BEGIN
+            UPDATE TableVersions SET Version = Version + 1, ModifiedAt = {NOW_MS}
+            WHERE TableName = '{table}';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_version_update AFTER UPDATE ON {table}
+        BEGIN
+            UPDATE TableVersions SET Version = Version + 1, RewriteVersion = RewriteVersion + 1, ModifiedAt = {NOW_MS}
+            WHERE TableName = '{table}';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_version_delete AFTER DELETE ON {table}
+        BEGIN
+            UPDATE TableVersions SET Version = Version + 1, RewriteVersion = RewriteVersion + 1, ModifiedAt = {NOW_MS}
+            WHERE TableName = '{table}';
+        END;
+        """)
+    return "\n".join(statements)
+
+def index_script(indexes):
+    return "".join(f"CREATE INDEX IF NOT EXISTS {name} ON {definition};\n" for name, definition in indexes.items())
+
+# Full-text index over the fields the order searches look at. The trigram
+# tokenizer matches any substring of 3+ characters, like LIKE '%term%' does.
+ORDER_SEARCH_SCHEMA = '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS OrdersSearch USING fts5(
+            DesignNumber, ShadeCard, Quality, ContractorName, Notes,
+            tokenize = 'trigram'
+        );
+
+        DELETE FROM OrdersSearch;
+        INSERT INTO OrdersSearch (rowid, DesignNumber, ShadeCard, Quality, ContractorName, Notes)
+            SELECT o.OrderID, o.DesignNumber, o.ShadeCard, o.Quality, c.Name, o.Notes
+            FROM Orders o LEFT JOIN Contractors c ON o.ContractorID = c.ContractorID;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Orders_search_insert AFTER INSERT ON Orders
+        BEGIN
+            INSERT INTO OrdersSearch (rowid, DesignNumber, ShadeCard, Quality, ContractorName, Notes)
+            VALUES (NEW.OrderID, NEW.DesignNumber, NEW.ShadeCard, NEW.Quality,
+                    (SELECT Name FROM Contractors WHERE ContractorID = NEW.ContractorID), NEW.Notes);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Orders_search_update
+        AFTER UPDATE OF DesignNumber, ShadeCard, Quality, Notes, ContractorID ON Orders
+        BEGIN
+            DELETE FROM OrdersSearch WHERE rowid = OLD.OrderID;
+            INSERT INTO OrdersSearch (rowid, DesignNumber, ShadeCard, Quality, ContractorName, Notes)
+            VALUES (NEW.OrderID, NEW.DesignNumber, NEW.ShadeCard, NEW.Quality,
+                    (SELECT Name FROM Contractors WHERE ContractorID = NEW.ContractorID), NEW.Notes);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Orders_search_delete AFTER DELETE ON Orders
+        BEGIN
+            DELETE FROM OrdersSearch WHERE rowid = OLD.OrderID;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Contractors_search_rename AFTER UPDATE OF Name ON Contractors
+        BEGIN
+            UPDATE OrdersSearch SET ContractorName = NEW.Name
+            WHERE rowid IN (SELECT OrderID FROM Orders WHERE ContractorID = NEW.ContractorID);
+        END;
+'''
+
+# Issued/returned weight per (order, stock), kept up to date by triggers in the
+# same transaction as the StockTransactions write. Replaces aggregating the
+# whole transaction history for held-stock lookups.
+STOCK_HOLDINGS_SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS StockHoldings (
+            OrderID INTEGER NOT NULL,
+            StockID INTEGER NOT NULL,
+            IssuedKg REAL NOT NULL DEFAULT 0,
+            ReturnedKg REAL NOT NULL DEFAULT 0,
+            NetWeightKg REAL GENERATED ALWAYS AS (IssuedKg - ReturnedKg) VIRTUAL,
+            PRIMARY KEY (OrderID, StockID)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_StockHoldings_stock ON StockHoldings (StockID);
+
+        CREATE TRIGGER IF NOT EXISTS trg_StockTransactions_holdings_insert AFTER INSERT ON StockTransactions
+        BEGIN
+            INSERT INTO StockHoldings (OrderID, StockID, IssuedKg, ReturnedKg)
+            VALUES (NEW.OrderID, NEW.StockID,
+                    CASE WHEN NEW.TransactionType = 'Issued' THEN NEW.WeightKg ELSE 0 END,
+                    CASE WHEN NEW.TransactionType = 'Issued' THEN 0 ELSE NEW.WeightKg END)
+            ON CONFLICT (OrderID, StockID) DO UPDATE SET
+                IssuedKg = IssuedKg + excluded.IssuedKg,
+                ReturnedKg = ReturnedKg + excluded.ReturnedKg;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_StockTransactions_holdings_delete AFTER DELETE ON StockTransactions
+        BEGIN
+            UPDATE StockHoldings SET
+                IssuedKg = IssuedKg - CASE WHEN OLD.TransactionType = 'Issued' THEN OLD.WeightKg ELSE 0 END,
+                ReturnedKg = ReturnedKg - CASE WHEN OLD.TransactionType = 'Issued' THEN 0 ELSE OLD.WeightKg END
+            WHERE OrderID = OLD.OrderID AND StockID = OLD.StockID;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_StockTransactions_holdings_update
+        AFTER UPDATE OF OrderID, StockID, TransactionType, WeightKg ON StockTransactions
+        BEGIN
+            UPDATE StockHoldings SET
+                IssuedKg = IssuedKg - CASE WHEN OLD.TransactionType = 'Issued' THEN OLD.WeightKg ELSE 0 END,
+                ReturnedKg = ReturnedKg - CASE WHEN OLD.TransactionType = 'Issued' THEN 0 ELSE OLD.WeightKg END
+            WHERE OrderID = OLD.OrderID AND StockID = OLD.StockID;
+
+            INSERT INTO StockHoldings (OrderID, StockID, IssuedKg, ReturnedKg)
+            VALUES (NEW.OrderID, NEW.StockID,
+                    CASE WHEN NEW.TransactionType = 'Issued' THEN NEW.WeightKg ELSE 0 END,
+                    CASE WHEN NEW.TransactionType = 'Issued' THEN 0 ELSE NEW.WeightKg END)
+            ON CONFLICT (OrderID, StockID) DO UPDATE SET
+                IssuedKg = IssuedKg + excluded.IssuedKg,
+                ReturnedKg = ReturnedKg + excluded.ReturnedKg;
+        END;
+'''
+
+# Running money totals per order, kept up to date by triggers on Payments,
+# StockTransactions and Deductions so order financials are a single row read.
+ORDER_BALANCES_SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS OrderBalances (
+            OrderID INTEGER PRIMARY KEY,
+            AmountPaid REAL NOT NULL DEFAULT 0,
+            IssuedValue REAL NOT NULL DEFAULT 0,
+            ReturnedValue REAL NOT NULL DEFAULT 0,
+            TotalDeductions REAL NOT NULL DEFAULT 0
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_Orders_balances_insert AFTER INSERT ON Orders
+        BEGIN
+            INSERT OR IGNORE INTO OrderBalances (OrderID) VALUES (NEW.OrderID);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Orders_balances_delete AFTER DELETE ON Orders
+        BEGIN
+            DELETE FROM OrderBalances WHERE OrderID = OLD.OrderID;
+        END;
+
+        -- Payments (general payments have no OrderID and are not part of any order balance)
+        CREATE TRIGGER IF NOT EXISTS trg_Payments_balances_insert AFTER INSERT ON Payments
+        WHEN NEW.OrderID IS NOT NULL
+        BEGIN
+            INSERT INTO OrderBalances (OrderID, AmountPaid) VALUES (NEW.OrderID, NEW.Amount)
+            ON CONFLICT (OrderID) DO UPDATE SET AmountPaid = AmountPaid + excluded.AmountPaid;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Payments_balances_delete AFTER DELETE ON Payments
+        WHEN OLD.OrderID IS NOT NULL
+        BEGIN
+            UPDATE OrderBalances SET AmountPaid = AmountPaid - OLD.Amount WHERE OrderID = OLD.OrderID;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Payments_balances_update AFTER UPDATE OF OrderID, Amount ON Payments
+        BEGIN
+            UPDATE OrderBalances SET AmountPaid = AmountPaid - OLD.Amount WHERE OrderID = OLD.OrderID;
+            INSERT INTO OrderBalances (OrderID, AmountPaid)
+            SELECT NEW.OrderID, NEW.Amount WHERE NEW.OrderID IS NOT NULL
+            ON CONFLICT (OrderID) DO UPDATE SET AmountPaid = AmountPaid + excluded.AmountPaid;
+        END;
+
+        -- Stock issued to / returned from the order, valued at the transaction price
+        CREATE TRIGGER IF NOT EXISTS trg_StockTransactions_balances_insert AFTER INSERT ON StockTransactions
+        BEGIN
+            INSERT INTO OrderBalances (OrderID, IssuedValue, ReturnedValue)
+            VALUES (NEW.OrderID,
+                    CASE WHEN NEW.TransactionType = 'Issued' THEN NEW.WeightKg * NEW.PricePerKgAtTimeOfTransaction ELSE 0 END,
+                    CASE WHEN NEW.TransactionType = 'Issued' THEN 0 ELSE NEW.WeightKg * NEW.PricePerKgAtTimeOfTransaction END)
+            ON CONFLICT (OrderID) DO UPDATE SET
+                IssuedValue = IssuedValue + excluded.IssuedValue,
+                ReturnedValue = ReturnedValue + excluded.ReturnedValue;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_StockTransactions_balances_delete AFTER DELETE ON StockTransactions
+        BEGIN
+            UPDATE OrderBalances SET
+                IssuedValue = IssuedValue - CASE WHEN OLD.TransactionType = 'Issued' THEN OLD.WeightKg * OLD.PricePerKgAtTimeOfTransaction ELSE 0 END,
+                ReturnedValue = ReturnedValue - CASE WHEN OLD.TransactionType = 'Issued' THEN 0 ELSE OLD.WeightKg * OLD.PricePerKgAtTimeOfTransaction END
+            WHERE OrderID = OLD.OrderID;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_StockTransactions_balances_update
+        AFTER UPDATE OF OrderID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction ON StockTransactions
+        BEGIN
+            UPDATE OrderBalances SET
+                IssuedValue = IssuedValue - CASE WHEN OLD.TransactionType = 'Issued' THEN OLD.WeightKg * OLD.PricePerKgAtTimeOfTransaction ELSE 0 END,
+                ReturnedValue = ReturnedValue - CASE WHEN OLD.TransactionType = 'Issued' THEN 0 ELSE OLD.WeightKg * OLD.PricePerKgAtTimeOfTransaction END
+            WHERE OrderID = OLD.OrderID;
+
+            INSERT INTO OrderBalances (OrderID, IssuedValue, ReturnedValue)
+            VALUES (NEW.OrderID,
+                    CASE WHEN NEW.TransactionType = 'Issued' THEN NEW.WeightKg * NEW.PricePerKgAtTimeOfTransaction ELSE 0 END,
+                    CASE WHEN NEW.TransactionType = 'Issued' THEN 0 ELSE NEW.WeightKg * NEW.PricePerKgAtTimeOfTransaction END)
+            ON CONFLICT (OrderID) DO UPDATE SET
+                IssuedValue = IssuedValue + excluded.IssuedValue,
+                ReturnedValue = ReturnedValue + excluded.ReturnedValue;
+        END;
+
+        -- Deductions taken when an order is completed
+        CREATE TRIGGER IF NOT EXISTS trg_Deductions_balances_insert AFTER INSERT ON Deductions
+        BEGIN
+            INSERT INTO OrderBalances (OrderID, TotalDeductions) VALUES (NEW.OrderID, NEW.Amount)
+            ON CONFLICT (OrderID) DO UPDATE SET TotalDeductions = TotalDeductions + excluded.TotalDeductions;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Deductions_balances_delete AFTER DELETE ON Deductions
+        BEGIN
+            UPDATE OrderBalances SET TotalDeductions = TotalDeductions - OLD.Amount WHERE OrderID = OLD.OrderID;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Deductions_balances_update AFTER UPDATE OF OrderID, Amount ON Deductions
+        BEGIN
+            UPDATE OrderBalances SET TotalDeductions = TotalDeductions - OLD.Amount WHERE OrderID = OLD.OrderID;
+            INSERT INTO OrderBalances (OrderID, TotalDeductions) VALUES (NEW.OrderID, NEW.Amount)
+            ON CONFLICT (OrderID) DO UPDATE SET TotalDeductions = TotalDeductions + excluded.TotalDeductions;
+        END;
+'''
+
+# Contractor book totals per carpet quality, kept up to date by triggers so the
+# contractor summary does not have to walk the contractor's whole history.
+# A payment counts towards a quality bucket only while the order it was made
+# for belongs to the paying contractor; all other payments of a contractor
+# (no order, or an order since reassigned) are its general payments.
+# Quality may be NULL, so buckets are always matched with IS.
+CONTRACTOR_BALANCES_SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS ContractorQualityBalances (
+            ContractorID INTEGER NOT NULL,
+            Quality TEXT,
+            OrderCount INTEGER NOT NULL DEFAULT 0,
+            TotalWages REAL NOT NULL DEFAULT 0,
+            IssuedValue REAL NOT NULL DEFAULT 0,
+            ReturnedValue REAL NOT NULL DEFAULT 0,
+            Deductions REAL NOT NULL DEFAULT 0,
+            OrderPayments REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (ContractorID, Quality)
+        );
+
+        CREATE TABLE IF NOT EXISTS ContractorBalances (
+            ContractorID INTEGER PRIMARY KEY,
+            GeneralPayments REAL NOT NULL DEFAULT 0
+        );
+
+        -- Orders: an order brings its wage and all its running totals into its bucket
+        CREATE TRIGGER IF NOT EXISTS trg_Orders_contractor_balances_insert AFTER INSERT ON Orders
+        BEGIN
+            INSERT INTO ContractorQualityBalances (ContractorID, Quality)
+            SELECT NEW.ContractorID, NEW.Quality
+            WHERE NOT EXISTS (SELECT 1 FROM ContractorQualityBalances WHERE ContractorID = NEW.ContractorID AND Quality IS NEW.Quality);
+
+            UPDATE ContractorQualityBalances SET
+                OrderCount = OrderCount + 1,
+                TotalWages = TotalWages + IFNULL(NEW.Wage, 0)
+            WHERE ContractorID = NEW.ContractorID AND Quality IS NEW.Quality;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Orders_contractor_balances_update AFTER UPDATE OF ContractorID, Quality, Wage ON Orders
+        BEGIN
+            -- Take the order out of its old bucket; the old contractor's payments on it become general
+            UPDATE ContractorQualityBalances SET
+                OrderCount = OrderCount - 1,
+                TotalWages = TotalWages - IFNULL(OLD.Wage, 0),
+                IssuedValue = IssuedValue - IFNULL((SELECT IssuedValue FROM OrderBalances WHERE OrderID = OLD.OrderID), 0),
+                ReturnedValue = ReturnedValue - IFNULL((SELECT ReturnedValue FROM OrderBalances WHERE OrderID = OLD.OrderID), 0),
+                Deductions = Deductions - IFNULL((SELECT TotalDeductions FROM OrderBalances WHERE OrderID = OLD.OrderID), 0),
+                OrderPayments = OrderPayments - (SELECT TOTAL(Amount) FROM Payments WHERE OrderID = OLD.OrderID AND ContractorID = OLD.ContractorID)
+            WHERE ContractorID = OLD.ContractorID AND Quality IS OLD.Quality;
+
+            DELETE FROM ContractorQualityBalances
+            WHERE ContractorID = OLD.ContractorID AND Quality IS OLD.Quality AND OrderCount <= 0;
+
+            INSERT INTO ContractorBalances (ContractorID, GeneralPayments)
+            SELECT OLD.ContractorID, TOTAL(Amount) FROM Payments WHERE OrderID = OLD.OrderID AND ContractorID = OLD.ContractorID
+            ON CONFLICT (ContractorID) DO UPDATE SET GeneralPayments = GeneralPayments + excluded.GeneralPayments;
+
+            -- Put it into its new bucket; the new contractor's payments on it stop being general
+            INSERT INTO ContractorQualityBalances (ContractorID, Quality)
+            SELECT NEW.ContractorID, NEW.Quality
+            WHERE NOT EXISTS (SELECT 1 FROM ContractorQualityBalances WHERE ContractorID = NEW.ContractorID AND Quality IS NEW.Quality);
+
+            UPDATE ContractorQualityBalances SET
+                OrderCount = OrderCount + 1,
+                TotalWages = TotalWages + IFNULL(NEW.Wage, 0),
+                IssuedValue = IssuedValue + IFNULL((SELECT IssuedValue FROM OrderBalances WHERE OrderID = NEW.OrderID), 0),
+                ReturnedValue = ReturnedValue + IFNULL((SELECT ReturnedValue FROM OrderBalances WHERE OrderID = NEW.OrderID), 0),
+                Deductions = Deductions + IFNULL((SELECT TotalDeductions FROM OrderBalances WHERE OrderID = NEW.OrderID), 0),
+                OrderPayments = OrderPayments + (SELECT TOTAL(Amount) FROM Payments WHERE OrderID = NEW.OrderID AND ContractorID = NEW.ContractorID)
+            WHERE ContractorID = NEW.ContractorID AND Quality IS NEW.Quality;
+
+            INSERT INTO ContractorBalances (ContractorID, GeneralPayments)
+            SELECT NEW.ContractorID, -TOTAL(Amount) FROM Payments WHERE OrderID = NEW.OrderID AND ContractorID = NEW.ContractorID
+            ON CONFLICT (ContractorID) DO UPDATE SET GeneralPayments = GeneralPayments + excluded.GeneralPayments;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Orders_contractor_balances_delete AFTER DELETE ON Orders
+        BEGIN
+            UPDATE ContractorQualityBalances SET
+                OrderCount = OrderCount - 1,
+                TotalWages = TotalWages - IFNULL(OLD.Wage, 0)
+            WHERE ContractorID = OLD.ContractorID AND Quality IS OLD.Quality;
+
+            DELETE FROM ContractorQualityBalances
+            WHERE ContractorID = OLD.ContractorID AND Quality IS OLD.Quality AND OrderCount <= 0;
+        END;
+
+        -- Stock transactions and deductions go to the bucket of the order's current contractor
+        CREATE TRIGGER IF NOT EXISTS trg_StockTransactions_contractor_balances_insert AFTER INSERT ON StockTransactions
+        BEGIN
+            UPDATE ContractorQualityBalances SET
+                IssuedValue = IssuedValue + CASE WHEN NEW.TransactionType = 'Issued' THEN NEW.WeightKg * NEW.PricePerKgAtTimeOfTransaction ELSE 0 END,
+                ReturnedValue = ReturnedValue + CASE WHEN NEW.TransactionType = 'Issued' THEN 0 ELSE NEW.WeightKg * NEW.PricePerKgAtTimeOfTransaction END
+            WHERE ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = NEW.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = NEW.OrderID);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_StockTransactions_contractor_balances_delete AFTER DELETE ON StockTransactions
+        BEGIN
+            UPDATE ContractorQualityBalances SET
+                IssuedValue = IssuedValue - CASE WHEN OLD.TransactionType = 'Issued' THEN OLD.WeightKg * OLD.PricePerKgAtTimeOfTransaction ELSE 0 END,
+                ReturnedValue = ReturnedValue - CASE WHEN OLD.TransactionType = 'Issued' THEN 0 ELSE OLD.WeightKg * OLD.PricePerKgAtTimeOfTransaction END
+            WHERE ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = OLD.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = OLD.OrderID);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_StockTransactions_contractor_balances_update
+        AFTER UPDATE OF OrderID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction ON StockTransactions
+        BEGIN
+            UPDATE ContractorQualityBalances SET
+                IssuedValue = IssuedValue - CASE WHEN OLD.TransactionType = 'Issued' THEN OLD.WeightKg * OLD.PricePerKgAtTimeOfTransaction ELSE 0 END,
+                ReturnedValue = ReturnedValue - CASE WHEN OLD.TransactionType = 'Issued' THEN 0 ELSE OLD.WeightKg * OLD.PricePerKgAtTimeOfTransaction END
+            WHERE ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = OLD.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = OLD.OrderID);
+
+            UPDATE ContractorQualityBalances SET
+                IssuedValue = IssuedValue + CASE WHEN NEW.TransactionType = 'Issued' THEN NEW.WeightKg * NEW.PricePerKgAtTimeOfTransaction ELSE 0 END,
+                ReturnedValue = ReturnedValue + CASE WHEN NEW.TransactionType = 'Issued' THEN 0 ELSE NEW.WeightKg * NEW.PricePerKgAtTimeOfTransaction END
+            WHERE ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = NEW.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = NEW.OrderID);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Deductions_contractor_balances_insert AFTER INSERT ON Deductions
+        BEGIN
+            UPDATE ContractorQualityBalances SET Deductions = Deductions + NEW.Amount
+            WHERE ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = NEW.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = NEW.OrderID);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Deductions_contractor_balances_delete AFTER DELETE ON Deductions
+        BEGIN
+            UPDATE ContractorQualityBalances SET Deductions = Deductions - OLD.Amount
+            WHERE ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = OLD.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = OLD.OrderID);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Deductions_contractor_balances_update AFTER UPDATE OF OrderID, Amount ON Deductions
+        BEGIN
+            UPDATE ContractorQualityBalances SET Deductions = Deductions - OLD.Amount
+            WHERE ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = OLD.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = OLD.OrderID);
+
+            UPDATE ContractorQualityBalances SET Deductions = Deductions + NEW.Amount
+            WHERE ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = NEW.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = NEW.OrderID);
+        END;
+
+        -- Payments: the order's bucket when paid by the order's contractor, otherwise general
+        CREATE TRIGGER IF NOT EXISTS trg_Payments_contractor_balances_insert AFTER INSERT ON Payments
+        BEGIN
+            UPDATE ContractorQualityBalances SET OrderPayments = OrderPayments + NEW.Amount
+            WHERE ContractorID = NEW.ContractorID
+              AND ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = NEW.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = NEW.OrderID);
+
+            INSERT INTO ContractorBalances (ContractorID, GeneralPayments)
+            SELECT NEW.ContractorID, NEW.Amount
+            WHERE NEW.ContractorID IS NOT (SELECT ContractorID FROM Orders WHERE OrderID = NEW.OrderID)
+            ON CONFLICT (ContractorID) DO UPDATE SET GeneralPayments = GeneralPayments + excluded.GeneralPayments;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Payments_contractor_balances_delete AFTER DELETE ON Payments
+        BEGIN
+            UPDATE ContractorQualityBalances SET OrderPayments = OrderPayments - OLD.Amount
+            WHERE ContractorID = OLD.ContractorID
+              AND ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = OLD.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = OLD.OrderID);
+
+            UPDATE ContractorBalances SET GeneralPayments = GeneralPayments - OLD.Amount
+            WHERE ContractorID = OLD.ContractorID
+              AND OLD.ContractorID IS NOT (SELECT ContractorID FROM Orders WHERE OrderID = OLD.OrderID);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_Payments_contractor_balances_update AFTER UPDATE OF OrderID, ContractorID, Amount ON Payments
+        BEGIN
+            UPDATE ContractorQualityBalances SET OrderPayments = OrderPayments - OLD.Amount
+            WHERE ContractorID = OLD.ContractorID
+              AND ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = OLD.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = OLD.OrderID);
+
+            UPDATE ContractorBalances SET GeneralPayments = GeneralPayments - OLD.Amount
+            WHERE ContractorID = OLD.ContractorID
+              AND OLD.ContractorID IS NOT (SELECT ContractorID FROM Orders WHERE OrderID = OLD.OrderID);
+
+            UPDATE ContractorQualityBalances SET OrderPayments = OrderPayments + NEW.Amount
+            WHERE ContractorID = NEW.ContractorID
+              AND ContractorID = (SELECT ContractorID FROM Orders WHERE OrderID = NEW.OrderID)
+              AND Quality IS (SELECT Quality FROM Orders WHERE OrderID = NEW.OrderID);
+
+            INSERT INTO ContractorBalances (ContractorID, GeneralPayments)
+            SELECT NEW.ContractorID, NEW.Amount
+            WHERE NEW.ContractorID IS NOT (SELECT ContractorID FROM Orders WHERE OrderID = NEW.OrderID)
+            ON CONFLICT (ContractorID) DO UPDATE SET GeneralPayments = GeneralPayments + excluded.GeneralPayments;
+        END;
+'''
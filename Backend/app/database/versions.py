@@ -0,0 +1,13 @@
+# /app/database/versions.py
+# Reads the per-table change counters that the change-tracking triggers keep
+# in TableVersions. A table's Version changes whenever any row of it changes.
+
+
+def table_versions(db, tables):
+    """{table: (Version, ModifiedAt)} for the given tracked tables, in one query."""
+    tables = sorted(set(tables))
+    rows = db.execute(
+        f"SELECT TableName, Version, ModifiedAt FROM TableVersions WHERE TableName IN ({', '.join('?' * len(tables))})",
+        tables
+    ).fetchall()
+    return {row['TableName']: (row['Version'], row['ModifiedAt']) for row in rows}
@@ -0,0 +1,215 @@
+# /app/database/writer.py
+# Optional single-writer executor with group commit (WRITE_EXECUTOR_ENABLED).
+# Service mutations marked with @write_operation are handed to one writer
+# thread, which runs whatever has queued up as a batch inside one transaction:
+# each operation gets its own savepoint (its commit/rollback act on that), and
+# the batch pays for a single COMMIT.
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import current_app, g
+from .pool import ConnectionPool, pragmas_from_config
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+_SAVEPOINT = "write_op"
+
+
+class GroupCommitConnection:
+    """
+    Connection mixin for the writer thread. While `in_group` is set, the
+    services' commit() only closes their savepoint and rollback() undoes back
+    to it; the real COMMIT is issued once for the whole batch.
+    """
+
+    in_group = False
+
+    def commit(self):
+        if self.in_group:
+            self.execute(f"RELEASE {_SAVEPOINT}")
+            self.execute(f"SAVEPOINT {_SAVEPOINT}")
+            return
+        super().commit()
+
+    def rollback(self):
+        if self.in_group:
+            self.execute(f"ROLLBACK TO {_SAVEPOINT}")
+            return
+        super().rollback()
+
+
+class _Operation:
+    __slots__ = ('func', 'args', 'kwargs', 'replayable', 'started', 'done', 'result', 'error')
+
+    def __init__(self, func, args, kwargs, replayable=True):
+        self.func, self.args, self.kwargs = func, args, kwargs
+        self.replayable = replayable
+        self.started = False
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def run(self):
+        self.started = True
+        try:
+            self.result = self.func(*self.args, **self.kwargs)
+            self.error = None
+        except Exception as e:
+            self.error = e
+
+
+class WriteExecutor:
+    """Runs queued write operations on one thread, committing them in groups."""
+
+    def __init__(self, app):
+        self.app = app
+        self.max_batch = int(app.config.get('WRITE_BATCH_MAX', 64))
+        self.linger = float(app.config.get('WRITE_BATCH_WAIT_MS', 0)) / 1000.0
+        base = instrumentation.connection_factory(app.config) or sqlite3.Connection
+        self._pool = ConnectionPool(
+            app.config['DB_PATH'], pragmas_from_config(app.config), max_idle=0,
+            factory=type('GroupCommitConnection', (GroupCommitConnection, base), {})
+        )
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self.operations = 0
+        self.batches = 0
+        self.fallbacks = 0
+        self.largest_batch = 0
+
+    def is_writer_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, func, args, kwargs, replayable=True):
+        """Queues one operation and waits for its own result (or exception)."""
+        self._ensure_started()
+        op = _Operation(func, args, kwargs, replayable)
+        self._queue.put(op)
+        op.done.wait()
+        if op.error is not None:
+            raise op.error
+        return op.result
+
+    def stats(self):
+        return {
+            "operations": self.operations,
+            "batches": self.batches,
+            "average_batch": round(self.operations / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest_batch,
+            "fallbacks": self.fallbacks,
+            "queued": self._queue.qsize(),
+        }
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            conn = self._pool.connect()
+            g.db = conn
+            try:
+                while True:
+                    batch = self._take_batch()
+                    g.exports_deferred = False
+                    try:
+                        self._run_batch(conn, batch)
+                    finally:
+                        for op in batch:
+                            op.done.set()
+                    if g.pop('exports_deferred', False):
+                        from app.services.export_worker import schedule_export
+                        schedule_export()
+            finally:
+                g.pop('db', None)
+                conn.close()
+
+    def _run_batch(self, conn, batch):
+        from .db import begin_immediate
+        self.operations += len(batch)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            begin_immediate(conn)
+            conn.in_group = True
+            for op in batch:
+                conn.execute(f"SAVEPOINT {_SAVEPOINT}")
+                op.run()
+                if op.error is not None:
+                    conn.execute(f"ROLLBACK TO {_SAVEPOINT}")
+                conn.execute(f"RELEASE {_SAVEPOINT}")
+            conn.in_group = False
+            conn.commit()
+            return
+        except sqlite3.Error as e:
+            conn.in_group = False
+            if conn.in_transaction:
+                conn.rollback()
+            error = e
+            logger.warning("Group commit of %d write(s) failed (%s); running them one by one.", len(batch), e)
+        # The batch was rolled back as a whole: run each operation on its own,
+        # exactly as it would run without the executor. Operations that already
+        # consumed a single-use input (an upload stream, a generator) can't run
+        # again and report the failure instead.
+        self.fallbacks += 1
+        for op in batch:
+            if op.started and not op.replayable:
+                op.result = {"success": False, "error": f"The changes could not be saved ({error}). Nothing was written; please try again."}
+                op.error = None
+                continue
+            op.run()
+            if conn.in_transaction:
+                conn.rollback()
+
+
+def write_operation(func=None, *, replayable=True):
+    """
+    Marks a service function that writes to the database. With the write
+    executor enabled, calls are run on the writer thread (and grouped with
+    other pending writes); otherwise the function runs directly.
+    Use @write_operation(replayable=False) for functions that consume their
+    input as they go, so a failed group commit doesn't run them a second time.
+    """
+    if func is None:
+        return lambda f: write_operation(f, replayable=replayable)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        executor = current_app.extensions.get('write_executor')
+        if executor is None or executor.is_writer_thread():
+            return func(*args, **kwargs)
+        return executor.submit(func, args, kwargs, replayable)
+    return wrapper
+
+
+def get_writer_stats():
+    executor = current_app.extensions.get('write_executor')
+    if executor is None:
+        return {"enabled": False}
+    return {"enabled": True, **executor.stats()}
+
+
+def init_app(app):
+    if not app.config.get('WRITE_EXECUTOR_ENABLED', False):
+        return
+    app.extensions['write_executor'] = WriteExecutor(app)
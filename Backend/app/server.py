@@ -0,0 +1,114 @@
+# /app/server.py
+# Serving the app: the Flask development server, or waitress (a pure-Python
+# multi-threaded WSGI server) for production use such as the shipped binary.
+# Production mode can also run several processes that accept connections
+# from one shared listening socket.
+
+import _thread
+import multiprocessing
+import signal
+import socket
+import sys
+import threading
+import time
+
+SERVER_MODES = ('dev', 'production')
+
+
+def serve(app, mode='dev', host='0.0.0.0', port=55000, threads=8, backlog=1024, keep_alive=120, sock=None):
+    """Blocks serving `app` on host:port (or on an already listening `sock`) with the chosen server."""
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Unknown server mode '{mode}', expected one of: {', '.join(SERVER_MODES)}")
+
+    if mode == 'production':
+        try:
+            from waitress import serve as waitress_serve
+        except ImportError:
+            print("waitress is not installed, falling back to the development server.")
+        else:
+            print(f"Serving with waitress ({threads} threads, backlog {backlog}, keep-alive {keep_alive}s)")
+            address = {'sockets': [sock]} if sock is not None else {'host': host, 'port': port}
+            waitress_serve(
+                app, **address,
+                threads=threads,
+                backlog=backlog,
+                # Idle keep-alive connections are closed after this many seconds
+                channel_timeout=keep_alive,
+                connection_limit=max(100, threads * 16),
+                ident='CarpetManagement',
+            )
+            return
+
+    if sock is not None:
+        sock.close()
+    app.run(host=host, port=port)
+
+
+def listening_socket(host, port, backlog=1024):
+    """A bound, listening TCP socket that several server processes can accept from."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def exit_on_sigterm():
+    """Turns SIGTERM into a normal exit, so `finally` blocks and atexit handlers (the export flush) run."""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+
+class ServerProcesses:
+    """
+    Extra server processes running target(*args). They are spawned (not
+    forked), so each builds its own app, connection pool and worker threads.
+    stop() asks them to shut down the way SIGTERM does: waitress finishes the
+    requests in flight and the process exits normally, running its atexit
+    handlers, before it is joined.
+    """
+
+    def __init__(self, target, count, args):
+        context = multiprocessing.get_context('spawn')
+        self._stop = context.Event()
+        self.processes = [
+            context.Process(target=_run_child, args=(self._stop, target, args), name=f'server-{n + 2}')
+            for n in range(count)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def stop(self, timeout=30.0):
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in self.processes:
+            if process.is_alive():
+                print(f"{process.name} did not stop within {timeout:.0f}s; terminating it.")
+                process.terminate()
+                process.join(5)
+
+
+def start_processes(target, count, *args):
+    """Starts `count` extra server processes running target(*args); stop them with .stop()."""
+    return ServerProcesses(target, count, args)
+
+
+def _run_child(stop, target, args):
+    exit_on_sigterm()
+    parent = multiprocessing.parent_process()
+
+    def watch():
+        # Stop when asked to, or when the parent went away without asking
+        while not stop.wait(1.0):
+            if parent is not None and not parent.is_alive():
+                break
+        # Runs the SIGTERM handler in the main thread (SIGINT may be ignored there);
+        # simulated, so it works on Windows too
+        _thread.interrupt_main(signal.SIGTERM)
+
+    threading.Thread(target=watch, name='stop-watch', daemon=True).start()
+    try:
+        target(*args)
+    except KeyboardInterrupt:
+        pass
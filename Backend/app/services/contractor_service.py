@@ -1,19 +1,25 @@
 from app.database.db import get_db
-from app.services.excel_service import export_all_tables_to_excel
-from collections import defaultdict
+from app.database.writer import write_operation
+from app.services.export_worker import schedule_export
+from app.services import pagination
+from app.services.read_cache import cached_read
 
-def get_all_contractors():
+def get_all_contractors(page=None):
     db = get_db()
-    contractors = db.execute("SELECT * FROM Contractors ORDER BY Name").fetchall()
-    return [dict(row) for row in contractors]
+    return pagination.fetch(
+        db, "SELECT * FROM Contractors", [], [],
+        order_by=[('Name', 'Name'), ('ContractorID', 'ContractorID')], page=page
+    )
 
+@write_operation
 def add_contractor(name, contact_info):
     db = get_db()
     cursor = db.execute("INSERT INTO Contractors (Name, ContactInfo) VALUES (?, ?)", (name, contact_info))
     db.commit()
-    export_all_tables_to_excel()
+    schedule_export()
     return cursor.lastrowid
 
+@cached_read('Contractors', 'Orders', 'StockTransactions', 'StockItems', 'Payments', 'Deductions')
 def get_contractor_details(contractor_id):
     """
     Gets all financial and transaction details for a single contractor.
@@ -30,11 +36,6 @@ def get_contractor_details(contractor_id):
         FROM Orders o WHERE o.ContractorID = ? ORDER BY o.DateIssued DESC
     """, (contractor_id,)).fetchall()
     
-    order_ids = [o['OrderID'] for o in orders_raw]
-
-    # Create a mapping from OrderID to Order Quality for easy lookup
-    order_id_to_quality_map = {o['OrderID']: o['Quality'] for o in orders_raw}
-
     # Fetch all relevant financial data at once
     transactions_raw = db.execute(f"""
         SELECT st.*, si.Type, si.Quality as StockQuality, o.Quality as OrderQuality
@@ -46,63 +47,39 @@ def get_contractor_details(contractor_id):
 
     payments_raw = db.execute("SELECT * FROM Payments WHERE ContractorID = ?", (contractor_id,)).fetchall()
     
-    deductions_raw = db.execute(f"""
-        SELECT d.*, o.Quality as OrderQuality FROM Deductions d 
-        JOIN Orders o ON d.OrderID = o.OrderID WHERE o.ContractorID = ?
+    # MODIFIED: The per-quality totals are kept by triggers in ContractorQualityBalances
+    # (and general payments in ContractorBalances), so the summary no longer walks
+    # every order, transaction, payment and deduction of the contractor.
+    balances_raw = db.execute("""
+        SELECT Quality, TotalWages, IssuedValue, ReturnedValue, Deductions, OrderPayments
+        FROM ContractorQualityBalances WHERE ContractorID = ? AND OrderCount > 0
     """, (contractor_id,)).fetchall()
+    general = db.execute(
+        "SELECT GeneralPayments FROM ContractorBalances WHERE ContractorID = ?", (contractor_id,)
+    ).fetchone()
+    general_payments = general['GeneralPayments'] if general else 0
 
-    # --- NEW LOGIC: Process financial data based on CARPET (Order) Quality ---
-    summary_by_carpet_quality = defaultdict(lambda: {
-        'total_wages': 0,
-        'issued_value': 0,
-        'returned_value': 0,
-        'deductions': 0,
-        'payments': 0,
-    })
-
-    # 1. Sum wages by carpet quality
+    # Qualities are listed in the order they first appear in the order list (newest first)
+    quality_rank = {}
     for order in orders_raw:
-        quality = order['Quality']
-        summary_by_carpet_quality[quality]['total_wages'] += order['Wage'] or 0
-
-    # 2. Sum transaction values by carpet quality
-    for trans in transactions_raw:
-        quality = trans['OrderQuality']
-        value = trans['WeightKg'] * trans['PricePerKgAtTimeOfTransaction']
-        if trans['TransactionType'] == 'Issued':
-            summary_by_carpet_quality[quality]['issued_value'] += value
-        else: # Returned
-            summary_by_carpet_quality[quality]['returned_value'] += value
-
-    # 3. Sum deductions by carpet quality
-    for ded in deductions_raw:
-        quality = ded['OrderQuality']
-        summary_by_carpet_quality[quality]['deductions'] += ded['Amount']
+        quality_rank.setdefault(order['Quality'], len(quality_rank))
+    balances_raw = sorted(balances_raw, key=lambda row: quality_rank.get(row['Quality'], len(quality_rank)))
 
-    # 4. Sum order-specific payments by carpet quality
-    general_payments = 0
-    for pay in payments_raw:
-        if pay['OrderID'] and pay['OrderID'] in order_id_to_quality_map:
-            quality = order_id_to_quality_map[pay['OrderID']]
-            summary_by_carpet_quality[quality]['payments'] += pay['Amount']
-        else:
-            general_payments += pay['Amount']
-
-    # 5. Calculate net values and final balances for each quality
+    # Calculate net values and final balances for each quality
     processed_summary_list = []
-    for quality, data in summary_by_carpet_quality.items():
-        net_stock_value = data['issued_value'] - data['returned_value']
-        balance = (data['total_wages'] - net_stock_value - data['deductions']) - data['payments']
+    for data in balances_raw:
+        net_stock_value = data['IssuedValue'] - data['ReturnedValue']
+        balance = (data['TotalWages'] - net_stock_value - data['Deductions']) - data['OrderPayments']
         processed_summary_list.append({
-            'quality': quality,
-            'total_wages': round(data['total_wages'], 2),
+            'quality': data['Quality'],
+            'total_wages': round(data['TotalWages'], 2),
             'net_stock_value': round(net_stock_value, 2),
-            'deductions': round(data['deductions'], 2),
-            'payments': round(data['payments'], 2),
+            'deductions': round(data['Deductions'], 2),
+            'payments': round(data['OrderPayments'], 2),
             'balance_owed': round(balance, 2)
         })
 
-    # 6. Calculate the true overall summary
+    # Calculate the true overall summary
     total_wages_all = sum(s['total_wages'] for s in processed_summary_list)
     total_net_stock_all = sum(s['net_stock_value'] for s in processed_summary_list)
     total_deductions_all = sum(s['deductions'] for s in processed_summary_list)
@@ -119,17 +96,17 @@ def get_contractor_details(contractor_id):
         "final_balance_owed": round(final_balance_owed, 2)
     }
 
-    # ... (currently_held_stock query is unchanged)
+    # MODIFIED: Read net holdings per (order, stock) instead of summing the transaction history
     currently_held_stock = db.execute("""
         SELECT 
             si.Type, si.Quality, si.ColorShadeNumber,
-            SUM(CASE WHEN st.TransactionType = 'Issued' THEN st.WeightKg ELSE -st.WeightKg END) as NetWeightKg
-        FROM StockTransactions st
-        JOIN Orders o ON st.OrderID = o.OrderID
-        JOIN StockItems si ON st.StockID = si.StockID
+            SUM(h.NetWeightKg) as NetWeightKg
+        FROM Orders o
+        JOIN StockHoldings h ON h.OrderID = o.OrderID
+        JOIN StockItems si ON h.StockID = si.StockID
         WHERE o.ContractorID = ? AND o.Status = 'Open'
-        GROUP BY st.StockID
-        HAVING NetWeightKg > 0.001
+        GROUP BY h.StockID
+        HAVING SUM(h.NetWeightKg) > 0.001
     """, (contractor_id,)).fetchall()
 
     return {
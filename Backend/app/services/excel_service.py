@@ -1,19 +1,262 @@
 # /app/services/excel_service.py
 
-import pandas as pd
+import csv
+import json
+import os
 from flask import current_app
 from app.database.db import get_db
+from app.database.schema import TRACKED_TABLES, INTERNAL_TABLES
+
+EXPORT_FORMATS = ('xlsx', 'csv', 'ndjson')
+
+# Hard limit of rows per worksheet in the xlsx format; longer tables spill
+# over into "<Table>_2", "<Table>_3", ... sheets.
+XLSX_MAX_ROWS = 1048576
 
 def export_all_tables_to_excel():
-    """Exports all database tables to a single Excel file with multiple sheets."""
-    conn = get_db()
-    excel_path = current_app.config['EXCEL_PATH']
+    """
+    Exports the database to the configured EXPORT_FORMAT. In 'incremental'
+    EXPORT_MODE nothing is written when no table changed since the last export.
+    """
+    fmt = current_app.config.get('EXPORT_FORMAT', 'xlsx')
+    if fmt not in EXPORT_FORMATS:
+        print(f"Error exporting: unknown EXPORT_FORMAT '{fmt}'")
+        return False
+    if current_app.config.get('EXPORT_MODE', 'incremental') == 'incremental':
+        return export_changed_tables(fmt)
+    return export_all_tables(fmt)
+
+def discover_tables(db):
+    """Lists the data tables from sqlite_master, known tables first in their usual order."""
+    names = [row['name'] for row in db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+    names = [n for n in names if n not in INTERNAL_TABLES and n.split('_')[0] not in INTERNAL_TABLES]
+    known = [t for t in TRACKED_TABLES if t in names]
+    return known + [n for n in names if n not in known]
+
+def export_all_tables(fmt='xlsx'):
+    """
+    Full export that streams every table from a cursor in EXPORT_CHUNK_SIZE
+    batches. xlsx output uses a write-only workbook, so memory stays flat no
+    matter how many rows a table has.
+    """
+    db = get_db()
+    target = _export_target(fmt)
+    try:
+        db.execute("BEGIN")
+        try:
+            tables = discover_tables(db)
+            if fmt == 'xlsx':
+                _write_workbook(db, tables, target)
+            else:
+                os.makedirs(target, exist_ok=True)
+                for table in tables:
+                    _write_table_file(db, table, target, fmt)
+            new_state = _current_state(db)
+        finally:
+            db.commit()
+
+        _save_state(db, new_state)
+        print(f"Data successfully exported to {target}")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"Error exporting to {fmt}: {e}")
+        return False
+
+def export_changed_tables(fmt='xlsx'):
+    """
+    Brings the export up to date using TableVersions; nothing is written when
+    no table changed since the last export.
+    - csv/ndjson: tables that were only inserted into get the new rows
+      appended, other changed tables are rewritten.
+    - xlsx: a workbook can't be edited without loading all of it, so when
+      anything changed it is streamed out again through the write-only
+      writer, the same as a full export. Memory stays flat.
+    """
+    db = get_db()
+    target = _export_target(fmt)
     try:
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            tables = ['Contractors', 'StockItems', 'LentRecords', 'StockTransactions', 'Payments']
-            for table_name in tables:
-                df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-                df.to_excel(writer, sheet_name=table_name, index=False)
-        print(f"Data successfully exported to {excel_path}")
+        # Read versions and rows from one snapshot so the recorded state matches the output
+        db.execute("BEGIN")
+        try:
+            versions = {row['TableName']: row for row in db.execute("SELECT * FROM TableVersions")}
+            exported = {row['TableName']: row for row in db.execute("SELECT * FROM ExcelExportState")}
+            tables = discover_tables(db)
+
+            changed = []
+            for table in tables:
+                current = versions.get(table)
+                last = exported.get(table)
+                # Untracked tables have no version to compare and are always rewritten
+                unchanged = (
+                    current is not None and last is not None
+                    and last['Version'] == current['Version']
+                    and _has_output(target, table, fmt)
+                )
+                if not unchanged:
+                    changed.append(table)
+
+            new_state = []
+            if fmt == 'xlsx':
+                if changed:
+                    _write_workbook(db, tables, target)
+                    new_state = _current_state(db)
+            else:
+                os.makedirs(target, exist_ok=True)
+                for table in changed:
+                    current = versions.get(table)
+                    last = exported.get(table)
+                    last_row_id = db.execute(f'SELECT IFNULL(MAX(rowid), 0) FROM "{table}"').fetchone()[0]
+                    append_after = None
+                    if current is not None and last is not None and last['RewriteVersion'] == current['RewriteVersion']:
+                        append_after = last['LastRowID']
+                    _write_table_file(db, table, target, fmt, append_after)
+                    if current is not None:
+                        new_state.append((table, current['Version'], current['RewriteVersion'], last_row_id))
+        finally:
+            db.commit()
+
+        if not changed:
+            return True
+        _save_state(db, new_state)
+        print(f"Exported {', '.join(changed)} to {target}")
+        return True
     except Exception as e:
-        print(f"Error exporting to Excel: {e}")
\ No newline at end of file
+        db.rollback()
+        print(f"Error exporting to {fmt}: {e}")
+        return False
+
+def _save_atomically(save, target):
+    """
+    Writes through `save(path)` to a temporary file next to the target and
+    renames it over the target, so a reader (or a crash) never sees a
+    half-written export.
+    """
+    temp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        save(temp_path)
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _export_target(fmt):
+    if fmt == 'xlsx':
+        return current_app.config['EXCEL_PATH']
+    return current_app.config['EXPORT_DIR']
+
+def _stream_rows(db, table, after_row_id=None):
+    """Returns the column names and a generator of row chunks for a table."""
+    chunk_size = int(current_app.config.get('EXPORT_CHUNK_SIZE', 5000))
+    cursor = db.cursor()
+    cursor.row_factory = None  # Plain tuples; no per-row Row objects
+    if after_row_id is None:
+        cursor.execute(f'SELECT * FROM "{table}" ORDER BY rowid')
+    else:
+        cursor.execute(f'SELECT * FROM "{table}" WHERE rowid > ? ORDER BY rowid', (after_row_id,))
+    columns = [d[0] for d in cursor.description]
+
+    def chunks():
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    return columns, chunks()
+
+def _columns(db, table):
+    return [d[0] for d in db.execute(f'SELECT * FROM "{table}" LIMIT 0').description]
+
+def _current_state(db):
+    state = []
+    for row in db.execute("SELECT * FROM TableVersions"):
+        last_row_id = db.execute(f'SELECT IFNULL(MAX(rowid), 0) FROM "{row["TableName"]}"').fetchone()[0]
+        state.append((row['TableName'], row['Version'], row['RewriteVersion'], last_row_id))
+    return state
+
+def _save_state(db, new_state):
+    db.executemany(
+        """INSERT INTO ExcelExportState (TableName, Version, RewriteVersion, LastRowID) VALUES (?, ?, ?, ?)
+           ON CONFLICT(TableName) DO UPDATE SET Version = excluded.Version,
+               RewriteVersion = excluded.RewriteVersion, LastRowID = excluded.LastRowID""",
+        new_state
+    )
+    db.commit()
+
+def _has_output(target, table, fmt):
+    if fmt == 'xlsx':
+        return os.path.exists(target)
+    return os.path.exists(os.path.join(target, f"{table}.{fmt}"))
+
+# --- xlsx ---
+
+def _write_workbook(db, tables, target):
+    """Streams the tables into a new write-only workbook and puts it in place of the target."""
+    # openpyxl is imported only when an export runs, it is the slowest part of start-up
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for table in tables:
+        sheet = _SheetWriter(workbook, table)
+        columns, rows = _stream_rows(db, table)
+        sheet.start(columns)
+        for chunk in rows:
+            sheet.append_rows(chunk)
+    _save_atomically(workbook.save, target)
+
+class _SheetWriter:
+    """Appends rows to a table's sheet, spilling into continuation sheets at XLSX_MAX_ROWS."""
+
+    def __init__(self, workbook, table):
+        self.workbook = workbook
+        self.table = table
+        self.sheets = []
+        self.columns = None
+
+    def start(self, columns):
+        self.columns = columns
+        self._new_sheet()
+
+    def append_rows(self, rows):
+        for row in rows:
+            sheet, count = self.sheets[-1]
+            if count >= XLSX_MAX_ROWS:
+                self._new_sheet()
+                sheet, count = self.sheets[-1]
+            sheet.append(row)
+            self.sheets[-1] = (sheet, count + 1)
+
+    def _new_sheet(self):
+        n = len(self.sheets) + 1
+        sheet = self.workbook.create_sheet(self.table if n == 1 else f"{self.table}_{n}")
+        sheet.append(self.columns)
+        self.sheets.append((sheet, 1))
+
+# --- csv / ndjson ---
+
+def _write_table_file(db, table, directory, fmt, append_after=None):
+    path = os.path.join(directory, f"{table}.{fmt}")
+    append = append_after is not None and os.path.exists(path)
+    if append and fmt == 'csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            append = next(csv.reader(f), None) == _columns(db, table)
+    columns, rows = _stream_rows(db, table, append_after if append else None)
+
+    def write(target, mode):
+        with open(target, mode, newline='', encoding='utf-8') as f:
+            if fmt == 'csv':
+                writer = csv.writer(f)
+                if not append:
+                    writer.writerow(columns)
+                for chunk in rows:
+                    writer.writerows(chunk)
+            else:
+                for chunk in rows:
+                    f.writelines(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in chunk)
+
+    # Appends extend the file in place; rewrites replace it whole
+    if append:
+        write(path, 'a')
+    else:
+        _save_atomically(lambda target: write(target, 'w'), path)
@@ -0,0 +1,271 @@
+# /app/services/export_worker.py
+
+import atexit
+import datetime
+import threading
+import time
+from flask import current_app, g
+from app.database.db import get_db
+from app.services.excel_service import export_all_tables_to_excel
+from app.services.file_lock import FileLock
+
+
+class ExportWorker:
+    """
+    Background thread that keeps the Excel workbook in sync with the database.
+    Writes only mark the workbook as dirty; the worker waits until writes have
+    been quiet for EXPORT_DEBOUNCE_SECONDS (or EXPORT_MAX_DELAY_SECONDS have
+    passed since the first pending change) and then runs a single export.
+
+    When several processes serve the same database (SERVER_PROCESSES > 1, or
+    EXPORT_LEADER_ELECTION), only the process holding the export lock file
+    writes the export. It also polls TableVersions every EXPORT_POLL_SECONDS
+    for changes made by other processes; the others skip their exports and
+    take over the lock if the exporting process goes away.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.debounce = float(app.config.get('EXPORT_DEBOUNCE_SECONDS', 2.0))
+        self.max_delay = float(app.config.get('EXPORT_MAX_DELAY_SECONDS', 30.0))
+        self.poll_interval = float(app.config.get('EXPORT_POLL_SECONDS', 5.0))
+        self.lock = FileLock(_lock_path(app.config)) if _leader_election(app.config) else None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._dirty = False
+        self._running = False
+        self._stopping = False
+        self._first_change = None
+        self._last_change = None
+        self._pending_changes = 0
+
+        self.last_success = None
+        self.last_error = None
+        self.last_duration_ms = None
+        self.exports_completed = 0
+        self.changes_coalesced = 0
+        self.exports_skipped = 0
+        self._last_failure = None
+
+    def mark_dirty(self):
+        with self._cond:
+            now = time.monotonic()
+            if not self._dirty:
+                self._first_change = now
+            self._dirty = True
+            self._last_change = now
+            self._pending_changes += 1
+            self._ensure_started()
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Runs any pending export now and waits for it to finish."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._dirty:
+                self._ensure_started()
+                # Expire the debounce window so the worker exports immediately
+                self._first_change = self._last_change = float('-inf')
+                self._cond.notify_all()
+            while self._dirty or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout=30.0):
+        """Flush-on-shutdown hook: exports pending changes, then stops the thread."""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        if self.lock is not None:
+            self.lock.release()
+
+    def status(self):
+        with self._cond:
+            return {
+                "dirty": self._dirty,
+                "running": self._running,
+                "pending_changes": self._pending_changes,
+                "last_success": self.last_success,
+                "last_error": self.last_error,
+                "last_duration_ms": self.last_duration_ms,
+                "exports_completed": self.exports_completed,
+                "changes_coalesced": self.changes_coalesced,
+                "debounce_seconds": self.debounce,
+                "leader": None if self.lock is None else self.lock.held,
+                "exports_skipped": self.exports_skipped,
+            }
+
+    def use_lock(self):
+        """Switches an already created worker to leader election and starts polling."""
+        with self._cond:
+            if self.lock is None:
+                self.lock = FileLock(_lock_path(self.app.config))
+            self._cond.notify_all()
+        if self.app.config.get('EXPORT_ENABLED', True):
+            self.start()
+
+    def start(self):
+        if self.lock is not None:
+            self.lock.acquire()
+        with self._cond:
+            self._ensure_started()
+
+    def _ensure_started(self):
+        # Caller must hold self._cond
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='excel-export-worker', daemon=True)
+            self._thread.start()
+
+    def _wait_for_quiet_period(self):
+        # Caller must hold self._cond
+        while not self._stopping:
+            now = time.monotonic()
+            ready_at = min(self._last_change + self.debounce, self._first_change + self.max_delay)
+            if now >= ready_at:
+                return
+            self._cond.wait(ready_at - now)
+
+    def _is_exporter(self):
+        return self.lock is None or self.lock.acquire()
+
+    def _has_unexported_changes(self):
+        with self.app.app_context():
+            return get_db().execute("""
+                SELECT 1 FROM TableVersions v LEFT JOIN ExcelExportState e ON e.TableName = v.TableName
+                WHERE e.Version IS NOT v.Version LIMIT 1
+            """).fetchone() is not None
+
+    def _poll(self):
+        # Picks up writes from other processes (and takes over from an exporter that went away).
+        # After a failed export (e.g. the workbook is open in Excel) retries wait for max_delay.
+        if self._last_failure is not None and time.monotonic() - self._last_failure < self.max_delay:
+            return
+        try:
+            if self._is_exporter() and self._has_unexported_changes():
+                self.mark_dirty()
+        except Exception as e:
+            print(f"Export poll failed: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._dirty and not self._stopping:
+                    self._cond.wait(self.poll_interval if self.lock is not None else None)
+                if self._stopping and not self._dirty:
+                    return
+                poll = not self._dirty
+                if not poll:
+                    self._wait_for_quiet_period()
+                    pending = self._pending_changes
+                    self._dirty = False
+                    self._pending_changes = 0
+                    self._running = True
+            if poll:
+                if self.lock is not None:
+                    self._poll()
+                continue
+
+            if not self._is_exporter():
+                # Another process holds the export lock; it finds these changes in TableVersions
+                with self._cond:
+                    self._running = False
+                    self.exports_skipped += 1
+                    self._cond.notify_all()
+                continue
+
+            started = time.perf_counter()
+            try:
+                with self.app.app_context():
+                    ok = export_all_tables_to_excel()
+                error = None if ok else "Export failed, see server log."
+            except Exception as e:
+                ok, error = False, str(e)
+
+            with self._cond:
+                self._running = False
+                self.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                if ok:
+                    self.last_success = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                    self.last_error = None
+                    self.exports_completed += 1
+                    self.changes_coalesced += pending
+                    self._last_failure = None
+                else:
+                    self.last_error = error
+                    self._last_failure = time.monotonic()
+                self._cond.notify_all()
+
+
+def _leader_election(config):
+    return bool(config.get('EXPORT_LEADER_ELECTION')) or int(config.get('SERVER_PROCESSES', 1)) > 1
+
+
+def _lock_path(config):
+    if config.get('EXPORT_LOCK_PATH'):
+        return config['EXPORT_LOCK_PATH']
+    target = config['EXCEL_PATH'] if config.get('EXPORT_FORMAT', 'xlsx') == 'xlsx' else config['EXPORT_DIR']
+    return target.rstrip('/\\') + '.lock'
+
+
+def schedule_export():
+    """
+    Requests an Excel export after a write. Uses the background worker when
+    EXPORT_ASYNC is enabled, otherwise exports synchronously as before.
+    """
+    if not current_app.config.get('EXPORT_ENABLED', True):
+        return
+    # Inside a group commit (write executor) the export waits until the batch is committed
+    if 'exports_deferred' in g:
+        g.exports_deferred = True
+        return
+    worker = current_app.extensions.get('export_worker')
+    if worker is None:
+        if not _leader_election(current_app.config):
+            export_all_tables_to_excel()
+            return
+        # Other processes export synchronously too; take turns on the export lock
+        lock = FileLock(_lock_path(current_app.config))
+        lock.acquire(blocking=True)
+        try:
+            export_all_tables_to_excel()
+        finally:
+            lock.release()
+        return
+    worker.mark_dirty()
+
+
+def get_export_status():
+    worker = current_app.extensions.get('export_worker')
+    if worker is None:
+        return {"enabled": False}
+    return {"enabled": True, **worker.status()}
+
+
+def enable_leader_election(app):
+    """
+    For run.py --processes: the app already exists when the command line is
+    parsed, so leader election is switched on afterwards.
+    """
+    app.config['EXPORT_LEADER_ELECTION'] = True
+    worker = app.extensions.get('export_worker')
+    if worker is not None:
+        worker.use_lock()
+
+
+def init_app(app):
+    if not app.config.get('EXPORT_ASYNC', True):
+        return
+    worker = ExportWorker(app)
+    app.extensions['export_worker'] = worker
+    atexit.register(worker.stop)
+    if worker.lock is not None and app.config.get('EXPORT_ENABLED', True):
+        # Start polling right away, the exporter has to notice other processes' writes
+        worker.start()
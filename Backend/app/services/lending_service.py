@@ -1,8 +1,9 @@
 # Original relative path: app/services/lending_service.py
 
 # /app/services/lending_service.py
-from app.database.db import get_db
-from app.services.excel_service import export_all_tables_to_excel
+from app.database.db import get_db, begin_immediate
+from app.database.writer import write_operation
+from app.services.export_worker import schedule_export
 import datetime
 
 # ... (other functions are unchanged) ...
@@ -40,10 +41,12 @@ def get_payments_by_record_id(record_id):
     payments = db.execute("SELECT * FROM Payments WHERE LentRecordID = ? ORDER BY PaymentDate DESC", (record_id,)).fetchall()
     return [dict(row) for row in payments]
 
+@write_operation
 def create_lending_record(data):
     db = get_db()
     try:
-        db.execute("BEGIN")
+        # MODIFIED: Write lock up front and conditional decrements, like order stock issues
+        begin_immediate(db)
         cursor = db.execute(
             "INSERT INTO LentRecords (ContractorID, DateIssued, Notes, DateDue, PenaltyPerDay) VALUES (?, ?, ?, ?, ?)",
             (data['ContractorID'], data['DateIssued'], data.get('Notes'), data.get('DateDue'), data.get('PenaltyPerDay', 0))
@@ -53,44 +56,50 @@ def create_lending_record(data):
         for trans in data.get('transactions', []):
             stock_id = trans['StockID']
             weight_kg = float(trans['WeightKg'])
-            
-            stock_item = db.execute("SELECT * FROM StockItems WHERE StockID = ?", (stock_id,)).fetchone()
+            if weight_kg <= 0: raise ValueError("Weight must be a positive number.")
+
+            stock_item = db.execute("SELECT CurrentPricePerKg FROM StockItems WHERE StockID = ?", (stock_id,)).fetchone()
             if not stock_item: raise ValueError(f"Stock item ID {stock_id} not found")
 
-            new_quantity = stock_item['QuantityInStockKg'] - weight_kg
-            if new_quantity < 0: raise ValueError(f"Not enough stock for item ID {stock_id}")
-            
-            db.execute("UPDATE StockItems SET QuantityInStockKg = ? WHERE StockID = ?", (new_quantity, stock_id))
+            # Only decrements when enough is left, so stock can never go negative
+            updated = db.execute(
+                "UPDATE StockItems SET QuantityInStockKg = QuantityInStockKg - ? WHERE StockID = ? AND QuantityInStockKg >= ?",
+                (weight_kg, stock_id, weight_kg)
+            )
+            if updated.rowcount == 0: raise ValueError(f"Not enough stock for item ID {stock_id}")
             db.execute(
                 "INSERT INTO StockTransactions (LentRecordID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction) VALUES (?, ?, ?, ?, ?)",
                 (record_id, stock_id, 'Issued', weight_kg, stock_item['CurrentPricePerKg'])
             )
         
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True, "LentRecordID": record_id}
     except (ValueError, db.Error) as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
+def _insert_payment(db, contractor_id, amount, notes, record_id=None):
+    db.execute(
+        "INSERT INTO Payments (ContractorID, LentRecordID, PaymentDate, Amount, Notes) VALUES (?, ?, ?, ?, ?)",
+        (contractor_id, record_id, datetime.date.today().isoformat(), amount, notes)
+    )
+
 def add_payment(contractor_id, amount, notes, record_id=None):
     db = get_db()
     if not isinstance(amount, (int, float)) or amount <= 0:
         return {"success": False, "error": "Invalid payment amount."}
     
-    payment_date = datetime.date.today().isoformat()
-    db.execute(
-        "INSERT INTO Payments (ContractorID, LentRecordID, PaymentDate, Amount, Notes) VALUES (?, ?, ?, ?, ?)",
-        (contractor_id, record_id, payment_date, amount, notes)
-    )
+    _insert_payment(db, contractor_id, amount, notes, record_id)
     db.commit()
-    export_all_tables_to_excel()
+    schedule_export()
     return {"success": True}
 
+@write_operation
 def return_stock_for_record(record_id, returned_stock):
     db = get_db()
     try:
-        db.execute("BEGIN")
+        begin_immediate(db)
         for trans in returned_stock:
             stock_id = trans['StockID']
             weight_kg = float(trans['WeightKg'])
@@ -109,16 +118,17 @@ def return_stock_for_record(record_id, returned_stock):
             )
         
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True}
     except (ValueError, db.Error) as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
+@write_operation
 def close_lending_record(record_id, data):
     db = get_db()
     try:
-        db.execute("BEGIN")
+        begin_immediate(db)
 
         # 1. Update the record status to 'Closed'
         db.execute("UPDATE LentRecords SET Status = 'Closed' WHERE LentRecordID = ?", (record_id,))
@@ -155,10 +165,11 @@ def close_lending_record(record_id, data):
         final_payment = float(data.get('final_payment', 0.0))
         if final_payment > 0:
             contractor_id = db.execute("SELECT ContractorID FROM LentRecords WHERE LentRecordID = ?", (record_id,)).fetchone()['ContractorID']
-            add_payment(contractor_id, final_payment, "Final payment on record closure", record_id)
+            # Inserted directly: add_payment would commit halfway through this transaction
+            _insert_payment(db, contractor_id, final_payment, "Final payment on record closure", record_id)
 
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True}
     except (ValueError, db.Error) as e:
         db.rollback()
@@ -224,7 +235,7 @@ def update_lent_record(record_id, data):
         if cursor.rowcount == 0:
             return {"success": False, "error": "Record not found."}
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True}
     except db.Error as e:
         db.rollback()
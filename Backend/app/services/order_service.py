@@ -1,7 +1,11 @@
 # /app/services/order_service.py
-from app.database.db import get_db
-from app.services.excel_service import export_all_tables_to_excel
+from flask import current_app
+from app.database.db import get_db, begin_immediate
+from app.database.writer import write_operation
+from app.services.export_worker import schedule_export
+from app.services import pagination
 import datetime
+import json
 
 def _parse_dimension(dim_val):
     """MODIFIED: Converts a value like 7.05 (7ft 5in) or 7.5 (also 7ft 5in) to decimal feet."""
@@ -20,11 +24,29 @@ def _parse_dimension(dim_val):
     except (ValueError, TypeError):
         return 0.0
 
-def get_all_orders(status=None, design_number=None, shade_card=None, quality=None):
+# The trigram index only matches terms of 3+ characters; shorter ones use LIKE
+_MIN_SEARCH_TERM = 3
+_SEARCH_COLUMNS = ('o.DesignNumber', 'o.ShadeCard', 'o.Quality', 'c.Name', 'o.Notes')
+MAX_SEARCH_LIMIT = 500
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+def _has_order_search(db):
+    return db.execute("SELECT 1 FROM sqlite_master WHERE name = 'OrdersSearch'").fetchone() is not None
+
+def get_all_orders(status=None, design_number=None, shade_card=None, quality=None, q=None, limit=None, page=None,
+                   include_financials=False):
     """
     Fetches all orders, with optional filtering by status, design number, shade card, and quality.
+    `q` searches design number, shade card, quality, contractor name and notes at once;
+    those results are ranked by relevance and capped at `limit`.
+    Otherwise `page` pages through the orders newest first (DateIssued, OrderID).
+    With `include_financials` every order gets a 'Financials' entry, fetched for
+    the whole list in one query.
     """
     db = get_db()
+    use_fts = _has_order_search(db)
     
     base_query = """
         SELECT o.*, c.Name as ContractorName
@@ -34,30 +56,64 @@ def get_all_orders(status=None, design_number=None, shade_card=None, quality=Non
     
     conditions = []
     params = []
+    match_terms = []
 
     if status:
         conditions.append("o.Status = ?")
         params.append(status.capitalize())
     
-    if design_number:
-        conditions.append("o.DesignNumber LIKE ?")
-        params.append(f"%{design_number}%")
-        
-    if shade_card:
-        conditions.append("o.ShadeCard LIKE ?")
-        params.append(f"%{shade_card}%")
+    # Substring filters go through the full-text index when possible
+    for column, value in (('DesignNumber', design_number), ('ShadeCard', shade_card), ('Quality', quality)):
+        if not value:
+            continue
+        if use_fts and len(value) >= _MIN_SEARCH_TERM:
+            match_terms.append(f"{{{column}}} : {_fts_phrase(value)}")
+        else:
+            conditions.append(f"o.{column} LIKE ?")
+            params.append(f"%{value}%")
 
-    if quality:
-        conditions.append("o.Quality LIKE ?")
-        params.append(f"%{quality}%")
+    # Free-text search: every term must appear in one of the searched fields
+    for term in (q or '').split():
+        if use_fts and len(term) >= _MIN_SEARCH_TERM:
+            match_terms.append(_fts_phrase(term))
+        else:
+            conditions.append("(" + " OR ".join(f"IFNULL({col}, '') LIKE ?" for col in _SEARCH_COLUMNS) + ")")
+            params.extend([f"%{term}%"] * len(_SEARCH_COLUMNS))
+
+    if match_terms:
+        base_query += " JOIN OrdersSearch s ON s.rowid = o.OrderID"
+        conditions.insert(0, "OrdersSearch MATCH ?")
+        params.insert(0, " AND ".join(match_terms))
+
+    fields = page.fields if page else None
+    if include_financials and fields and 'OrderID' not in fields:
+        fields = fields + ['OrderID']
+        page = pagination.Page(page.limit, page.cursor, fields, page.format)
+
+    if not q:
+        # NEW: Keyset pagination on the list order (see app/services/pagination.py)
+        orders = pagination.fetch(
+            db, base_query, conditions, params,
+            order_by=[('o.DateIssued', 'DateIssued'), ('o.OrderID', 'OrderID')],
+            page=page, descending=True
+        )
+        return _attach_financials(orders) if include_financials else orders
 
     if conditions:
         base_query += " WHERE " + " AND ".join(conditions)
         
-    base_query += " ORDER BY o.DateIssued DESC"
+    if match_terms:
+        base_query += " ORDER BY s.rank, o.DateIssued DESC"
+    else:
+        base_query += " ORDER BY o.DateIssued DESC"
+
+    # Ranked search results are a single capped list rather than pages
+    limit = min(int(limit or current_app.config.get('ORDER_SEARCH_LIMIT', 50)), MAX_SEARCH_LIMIT)
+    base_query += " LIMIT ?"
+    params.append(limit)
     
-    orders = db.execute(base_query, tuple(params)).fetchall()
-    return [dict(row) for row in orders]
+    orders = pagination.fetch_all(db, base_query, params, page)
+    return _attach_financials(orders) if include_financials else orders
 
 def get_order_by_id(order_id):
     db = get_db()
@@ -68,68 +124,189 @@ def get_order_by_id(order_id):
     """, (order_id,)).fetchone()
     return dict(order) if order else None
 
-def create_order(data):
+# NEW: Shared pieces of the stock issuing path, used for single and bulk order creation.
+# All referenced stock is read in one query, checked in memory and written with executemany.
+
+def _order_values(data):
+    """Validates one order payload and returns its Orders column values (wage calculated)."""
+    missing = [f for f in ('ContractorID', 'DateIssued', 'DesignNumber') if not data.get(f)]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+    wage = 0
+    length = _parse_dimension(data.get('Length', 0))
+    width = _parse_dimension(data.get('Width', 0))
+    price_per_sq_ft = float(data.get('PricePerSqFt', 0))
+    if length > 0 and width > 0 and price_per_sq_ft > 0:
+        wage = length * width * price_per_sq_ft
+
+    return (int(data['ContractorID']), data['DesignNumber'], data.get('ShadeCard'), data.get('Quality'),
+            data.get('Size'), data['DateIssued'], data.get('DateDue'), data.get('PenaltyPerDay', 0), data.get('Notes'),
+            length, width, price_per_sq_ft, wage)
+
+def _stock_lines(lines):
+    """Normalizes stock lines to (StockID, WeightKg, transaction_date) tuples."""
+    normalized = []
+    for line in lines or []:
+        if 'StockID' not in line or 'WeightKg' not in line:
+            raise ValueError("Each stock line needs 'StockID' and 'WeightKg'")
+        weight_kg = float(line['WeightKg'])
+        if weight_kg <= 0:
+            raise ValueError("Weight must be a positive number.")
+        normalized.append((int(line['StockID']), weight_kg, line.get('transaction_date') or None))
+    return normalized
+
+def _load_stock(db, stock_ids):
+    """{StockID: [QuantityInStockKg, CurrentPricePerKg, Type, Quality]} for all the IDs in one query."""
+    rows = db.execute(
+        "SELECT StockID, QuantityInStockKg, CurrentPricePerKg, Type, Quality FROM StockItems WHERE StockID IN (SELECT value FROM json_each(?))",
+        (json.dumps(sorted(set(stock_ids))),)
+    ).fetchall()
+    return {row['StockID']: [row['QuantityInStockKg'], row['CurrentPricePerKg'], row['Type'], row['Quality']] for row in rows}
+
+def _allocate(stock, lines, detailed=False):
+    """
+    Checks the lines against the in-memory quantities, with duplicate StockIDs
+    added up, and takes them out of `stock` only if every line fits.
+    Returns the total weight per StockID.
+    """
+    needed = {}
+    for stock_id, weight_kg, _ in lines:
+        needed[stock_id] = needed.get(stock_id, 0) + weight_kg
+    for stock_id, weight_kg in needed.items():
+        if stock_id not in stock:
+            raise ValueError(f"Stock item ID {stock_id} not found" + ("." if detailed else ""))
+        available, _, stock_type, quality = stock[stock_id]
+        if available - weight_kg < 0:
+            if detailed:
+                raise ValueError(f"Not enough stock for {stock_type} ({quality}). Available: {available}kg")
+            raise ValueError(f"Not enough stock for item ID {stock_id}")
+    for stock_id, weight_kg in needed.items():
+        stock[stock_id][0] -= weight_kg
+    return needed
+
+def _write_issues(db, needed, issues):
+    """
+    Applies allocated stock: one decrement per StockItem and one 'Issued'
+    transaction per line. `issues` are (OrderID, StockID, WeightKg, Price, Notes, TransactionDate).
+    Decrements are conditional, so stock can never go below zero even if it
+    changed after `_load_stock`; callers then roll back the whole issue.
+    """
+    cursor = db.executemany(
+        "UPDATE StockItems SET QuantityInStockKg = QuantityInStockKg - ? WHERE StockID = ? AND QuantityInStockKg >= ?",
+        [(weight_kg, stock_id, weight_kg) for stock_id, weight_kg in needed.items()]
+    )
+    if cursor.rowcount != len(needed):
+        raise ValueError("Stock changed while it was being issued; nothing was issued.")
+    db.executemany(
+        """INSERT INTO StockTransactions (OrderID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction, Notes, TransactionDate)
+           VALUES (?, ?, 'Issued', ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
+        issues
+    )
+
+_INSERT_ORDER = """INSERT INTO Orders (ContractorID, DesignNumber, ShadeCard, Quality, Size, DateIssued, DateDue, PenaltyPerDay, Notes, Length, Width, PricePerSqFt, Wage)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+MAX_BULK_ORDERS = 500
+
+# NEW: Creates many orders with their stock lines in a single transaction.
+@write_operation
+def create_orders_bulk(orders, all_or_nothing=True):
+    """
+    Every order is validated first: required fields, contractor, stock lines
+    and stock availability (orders are served from stock in the given order).
+    With `all_or_nothing` any invalid order cancels the whole batch; otherwise
+    the valid orders are created and the invalid ones reported by index.
+    """
+    if not isinstance(orders, list) or not orders:
+        return {"success": False, "error": "'orders' must be a non-empty list"}
+    if len(orders) > MAX_BULK_ORDERS:
+        return {"success": False, "error": f"At most {MAX_BULK_ORDERS} orders per request"}
+
     db = get_db()
+    errors = []
+    prepared = []
+    for index, data in enumerate(orders):
+        try:
+            if not isinstance(data, dict):
+                raise ValueError("Each order must be an object")
+            prepared.append((index, _order_values(data), _stock_lines(data.get('transactions'))))
+        except (ValueError, TypeError) as e:
+            errors.append({"index": index, "error": str(e)})
+
     try:
-        # Calculate wage if dimensions are provided
-        wage = 0
-        length_input = data.get('Length', 0)
-        width_input = data.get('Width', 0)
-        
-        length = _parse_dimension(length_input)
-        width = _parse_dimension(width_input)
-
-        price_per_sq_ft = float(data.get('PricePerSqFt', 0))
-        if length > 0 and width > 0 and price_per_sq_ft > 0:
-            wage = length * width * price_per_sq_ft
-
-        db.execute("BEGIN")
-        cursor = db.execute(
-            """INSERT INTO Orders (ContractorID, DesignNumber, ShadeCard, Quality, Size, DateIssued, DateDue, PenaltyPerDay, Notes, Length, Width, PricePerSqFt, Wage)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (data['ContractorID'], data['DesignNumber'], data.get('ShadeCard'), data.get('Quality'),
-             data.get('Size'), data['DateIssued'], data.get('DateDue'), data.get('PenaltyPerDay', 0), data.get('Notes'),
-             length, width, price_per_sq_ft, wage)
-        )
-        order_id = cursor.lastrowid
+        # IMMEDIATE: stock is checked and taken under the same write lock
+        begin_immediate(db)
+        contractor_ids = {values[0] for _, values, _ in prepared}
+        known_contractors = {row[0] for row in db.execute(
+            "SELECT ContractorID FROM Contractors WHERE ContractorID IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted(contractor_ids)),)
+        )}
+        stock = _load_stock(db, [line[0] for _, _, lines in prepared for line in lines])
+
+        valid = []
+        needed_total = {}
+        for index, values, lines in prepared:
+            try:
+                if values[0] not in known_contractors:
+                    raise ValueError(f"Contractor ID {values[0]} not found")
+                for stock_id, weight_kg in _allocate(stock, lines).items():
+                    needed_total[stock_id] = needed_total.get(stock_id, 0) + weight_kg
+                valid.append((index, values, lines))
+            except ValueError as e:
+                errors.append({"index": index, "error": str(e)})
+        errors.sort(key=lambda e: e['index'])
+
+        if errors and (all_or_nothing or not valid):
+            db.rollback()
+            return {"success": False, "error": "No orders were created.", "errors": errors, "created": []}
+
+        created = []
+        issues = []
+        for index, values, lines in valid:
+            order_id = db.execute(_INSERT_ORDER, values).lastrowid
+            created.append({"index": index, "OrderID": order_id})
+            issues.extend((order_id, stock_id, weight_kg, stock[stock_id][1], None, transaction_date)
+                          for stock_id, weight_kg, transaction_date in lines)
+        _write_issues(db, needed_total, issues)
 
-        for trans in data.get('transactions', []):
-            stock_id = trans['StockID']
-            weight_kg = float(trans['WeightKg'])
-            # ADDED: Get optional transaction date from payload
-            transaction_date = trans.get('transaction_date')
-            
-            stock_item = db.execute("SELECT * FROM StockItems WHERE StockID = ?", (stock_id,)).fetchone()
-            if not stock_item: raise ValueError(f"Stock item ID {stock_id} not found")
+        db.commit()
+        schedule_export()
+        return {"success": True, "created": created, "errors": errors}
+    except (ValueError, db.Error) as e:
+        db.rollback()
+        return {"success": False, "error": str(e), "errors": errors, "created": []}
 
-            new_quantity = stock_item['QuantityInStockKg'] - weight_kg
-            if new_quantity < 0: raise ValueError(f"Not enough stock for item ID {stock_id}")
-            
-            db.execute("UPDATE StockItems SET QuantityInStockKg = ? WHERE StockID = ?", (new_quantity, stock_id))
-            
-            # MODIFIED: Handle custom transaction date
-            if transaction_date:
-                db.execute(
-                    "INSERT INTO StockTransactions (OrderID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction, TransactionDate) VALUES (?, ?, 'Issued', ?, ?, ?)",
-                    (order_id, stock_id, weight_kg, stock_item['CurrentPricePerKg'], transaction_date)
-                )
-            else:
-                db.execute(
-                    "INSERT INTO StockTransactions (OrderID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction) VALUES (?, ?, 'Issued', ?, ?)",
-                    (order_id, stock_id, weight_kg, stock_item['CurrentPricePerKg'])
-                )
+# MODIFIED: Set-based issuing. All stock lines are checked against one read of the
+# referenced StockItems and written with executemany (see _allocate / _write_issues).
+@write_operation
+def create_order(data):
+    db = get_db()
+    try:
+        values = _order_values(data)
+        lines = _stock_lines(data.get('transactions'))
+
+        begin_immediate(db)
+        stock = _load_stock(db, [line[0] for line in lines])
+        needed = _allocate(stock, lines)
+        order_id = db.execute(_INSERT_ORDER, values).lastrowid
+        _write_issues(db, needed, [
+            (order_id, stock_id, weight_kg, stock[stock_id][1], None, transaction_date)
+            for stock_id, weight_kg, transaction_date in lines
+        ])
         
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True, "OrderID": order_id}
-    except (ValueError, db.Error) as e:
+    except (ValueError, TypeError, db.Error) as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
+@write_operation
 def complete_order(order_id, data):
     db = get_db()
     try:
-        db.execute("BEGIN")
+        begin_immediate(db)
         
         # Prepare for dynamic update
         update_fields = ["DateCompleted = ?", "Status = 'Closed'", "Wage = ?"]
@@ -195,17 +372,18 @@ def complete_order(order_id, data):
                 )
         
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True}
     except (ValueError, db.Error) as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
+@write_operation
 def return_stock_for_order(order_id, stock_id, weight_returned):
     """Handles stock returns after an order is closed, creating a refund payment."""
     db = get_db()
     try:
-        db.execute("BEGIN")
+        begin_immediate(db)
         
         weight_returned = float(weight_returned)
         if weight_returned <= 0:
@@ -230,35 +408,28 @@ def return_stock_for_order(order_id, stock_id, weight_returned):
         )
         
         contractor_id = db.execute("SELECT ContractorID FROM Orders WHERE OrderID = ?", (order_id,)).fetchone()['ContractorID']
-        from .payment_service import add_payment
-        add_payment({
-            'order_id': order_id, 'contractor_id': contractor_id, 'amount': -refund_amount,
-            'notes': f'Refund for post-closure return of {weight_returned}kg stock'
-        })
+        # MODIFIED: The refund is written in this transaction; add_payment would commit halfway through it
+        db.execute(
+            "INSERT INTO Payments (ContractorID, OrderID, PaymentDate, Amount, Notes) VALUES (?, ?, ?, ?, ?)",
+            (contractor_id, order_id, datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+             -refund_amount, f'Refund for post-closure return of {weight_returned}kg stock')
+        )
         
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True}
     except (ValueError, db.Error) as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
-def get_order_financials(order_id):
-    db = get_db()
-    order = db.execute("SELECT * FROM Orders WHERE OrderID = ?", (order_id,)).fetchone()
-    if not order: return None
-    
-    query = """
-    SELECT
-        (SELECT IFNULL(SUM(Amount), 0) FROM Payments WHERE OrderID = o.OrderID) AS AmountPaid,
-        (SELECT IFNULL(SUM(WeightKg * PricePerKgAtTimeOfTransaction), 0) FROM StockTransactions WHERE OrderID = o.OrderID AND TransactionType = 'Issued') AS IssuedValue,
-        (SELECT IFNULL(SUM(WeightKg * PricePerKgAtTimeOfTransaction), 0) FROM StockTransactions WHERE OrderID = o.OrderID AND TransactionType = 'Returned') AS ReturnedValue,
-        (SELECT IFNULL(SUM(Amount), 0) FROM Deductions WHERE OrderID = o.OrderID) AS TotalDeductions
-    FROM Orders o WHERE o.OrderID = ?;
-    """
-    result = db.execute(query, (order_id,)).fetchone()
-    
-    financials = dict(result)
+def _compute_financials(order, balances):
+    """Wage, fine and pending amount for an order given its running balances."""
+    financials = {
+        'AmountPaid': balances['AmountPaid'],
+        'IssuedValue': balances['IssuedValue'],
+        'ReturnedValue': balances['ReturnedValue'],
+        'TotalDeductions': balances['TotalDeductions'],
+    }
     order_wage = order['Wage'] or 0.0
     
     total_fine = 0
@@ -280,25 +451,69 @@ def get_order_financials(order_id):
     
     return financials
 
-def get_transactions_by_order_id(order_id):
+# Order fields the financials depend on plus its running totals from OrderBalances
+_FINANCIALS_QUERY = """
+    SELECT o.OrderID, o.Wage, o.Status, o.DateDue, o.PenaltyPerDay,
+           IFNULL(b.AmountPaid, 0) AS AmountPaid,
+           IFNULL(b.IssuedValue, 0) AS IssuedValue,
+           IFNULL(b.ReturnedValue, 0) AS ReturnedValue,
+           IFNULL(b.TotalDeductions, 0) AS TotalDeductions
+    FROM Orders o LEFT JOIN OrderBalances b ON b.OrderID = o.OrderID
+"""
+
+# MODIFIED: Reads the running totals from OrderBalances (kept by triggers) instead of
+# summing every payment, transaction and deduction of the order on each call.
+def get_order_financials(order_id):
     db = get_db()
-    transactions = db.execute("""
+    order = db.execute(_FINANCIALS_QUERY + " WHERE o.OrderID = ?", (order_id,)).fetchone()
+    if not order: return None
+    return _compute_financials(order, order)
+
+# NEW: Financials for a whole list of orders in one query, keyed by OrderID.
+# Unknown IDs are left out.
+def get_financials_for_orders(order_ids):
+    db = get_db()
+    ids = json.dumps([int(order_id) for order_id in order_ids])
+    rows = db.execute(_FINANCIALS_QUERY + " WHERE o.OrderID IN (SELECT value FROM json_each(?))", (ids,)).fetchall()
+    return {row['OrderID']: _compute_financials(row, row) for row in rows}
+
+def _attach_financials(orders):
+    if isinstance(orders, dict) and 'columns' in orders:
+        # Columnar lists get a Financials column
+        position = orders['columns'].index('OrderID')
+        financials = get_financials_for_orders([row[position] for row in orders['rows']])
+        orders['columns'] = list(orders['columns']) + ['Financials']
+        orders['rows'] = [list(row) + [financials.get(row[position])] for row in orders['rows']]
+        return orders
+    items = orders['items'] if isinstance(orders, dict) else orders
+    financials = get_financials_for_orders([order['OrderID'] for order in items])
+    for order in items:
+        order['Financials'] = financials.get(order['OrderID'])
+    return orders
+
+def get_transactions_by_order_id(order_id, page=None):
+    db = get_db()
+    return pagination.fetch(
+        db, """
         SELECT st.*, si.Type, si.Quality, si.ColorShadeNumber, si.StockID
         FROM StockTransactions st JOIN StockItems si ON st.StockID = si.StockID
-        WHERE st.OrderID = ? ORDER BY st.TransactionID
-    """, (order_id,)).fetchall()
-    return [dict(row) for row in transactions]
+        """, ["st.OrderID = ?"], [order_id],
+        order_by=[('st.TransactionID', 'TransactionID')], page=page
+    )
 
-def get_payments_by_order_id(order_id):
+def get_payments_by_order_id(order_id, page=None):
     db = get_db()
-    payments = db.execute("SELECT * FROM Payments WHERE OrderID = ? ORDER BY PaymentDate DESC", (order_id,)).fetchall()
-    return [dict(row) for row in payments]
+    return pagination.fetch(
+        db, "SELECT * FROM Payments", ["OrderID = ?"], [order_id],
+        order_by=[('PaymentDate', 'PaymentDate'), ('PaymentID', 'PaymentID')], page=page, descending=True
+    )
 
+@write_operation
 def reassign_order(order_id, new_contractor_id, reason):
     """Reassigns an open order to a new contractor and transfers outstanding stock."""
     db = get_db()
     try:
-        db.execute("BEGIN")
+        begin_immediate(db)
         order = db.execute("SELECT * FROM Orders WHERE OrderID = ?", (order_id,)).fetchone()
         if not order: raise ValueError("Order not found.")
         if order['Status'] != 'Open': raise ValueError("Only open orders can be reassigned.")
@@ -318,8 +533,8 @@ def reassign_order(order_id, new_contractor_id, reason):
         
         # Find net outstanding stock for this order
         outstanding_stock_query = """
-            SELECT StockID, SUM(CASE WHEN TransactionType = 'Issued' THEN WeightKg ELSE -WeightKg END) as NetWeight
-            FROM StockTransactions WHERE OrderID = ? GROUP BY StockID HAVING NetWeight > 0.001
+            SELECT StockID, NetWeightKg as NetWeight
+            FROM StockHoldings WHERE OrderID = ? AND NetWeightKg > 0.001
         """
         outstanding_stock = db.execute(outstanding_stock_query, (order_id,)).fetchall()
         
@@ -344,63 +559,71 @@ def reassign_order(order_id, new_contractor_id, reason):
             )
         
         db.commit()
+        schedule_export()
         return {"success": True}
     except (ValueError, db.Error) as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
+@write_operation
 def issue_stock_to_order(order_id, stock_id, weight_kg, transaction_date=None):
     """
     Adds a new 'Issued' transaction to an existing, open order.
     MODIFIED to accept an optional transaction_date.
     """
+    return issue_stock_lines_to_order(order_id, [
+        {"stock_id": stock_id, "weight": weight_kg, "transaction_date": transaction_date}
+    ])
+
+# NEW: Issues several stock lines to an open order in one transaction.
+@write_operation
+def issue_stock_lines_to_order(order_id, lines):
+    """`lines` are {"stock_id", "weight", "transaction_date" (optional)}; either all are issued or none."""
     db = get_db()
     try:
-        db.execute("BEGIN")
-        weight_kg = float(weight_kg)
-        if weight_kg <= 0:
-            raise ValueError("Weight must be a positive number.")
-
+        if not isinstance(lines, list) or not lines:
+            raise ValueError("At least one stock line is required.")
+        normalized = []
+        for line in lines:
+            weight_kg = float(line['weight'])
+            if weight_kg <= 0:
+                raise ValueError("Weight must be a positive number.")
+            normalized.append((int(line['stock_id']), weight_kg, line.get('transaction_date') or None))
+
+        begin_immediate(db)
         # 1. Verify the order is open
         order = db.execute("SELECT Status FROM Orders WHERE OrderID = ?", (order_id,)).fetchone()
         if not order or order['Status'] != 'Open':
             raise ValueError("Stock can only be issued to an open order.")
 
-        # 2. Check stock availability
-        stock_item = db.execute("SELECT * FROM StockItems WHERE StockID = ?", (stock_id,)).fetchone()
-        if not stock_item:
-            raise ValueError(f"Stock item ID {stock_id} not found.")
-        if stock_item['QuantityInStockKg'] < weight_kg:
-            raise ValueError(f"Not enough stock for {stock_item['Type']} ({stock_item['Quality']}). Available: {stock_item['QuantityInStockKg']}kg")
-
-        # 3. Update inventory
-        db.execute("UPDATE StockItems SET QuantityInStockKg = QuantityInStockKg - ? WHERE StockID = ?", (weight_kg, stock_id))
+        # 2. Check stock availability for all lines at once
+        stock = _load_stock(db, [line[0] for line in normalized])
+        needed = _allocate(stock, normalized, detailed=True)
 
-        # 4. Create the new transaction, handling the optional date
-        if transaction_date:
-            db.execute(
-                "INSERT INTO StockTransactions (OrderID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction, Notes, TransactionDate) VALUES (?, ?, 'Issued', ?, ?, ?, ?)",
-                (order_id, stock_id, weight_kg, stock_item['CurrentPricePerKg'], 'Additional stock issued', transaction_date)
-            )
-        else:
-            db.execute(
-                "INSERT INTO StockTransactions (OrderID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction, Notes) VALUES (?, ?, 'Issued', ?, ?, ?)",
-                (order_id, stock_id, weight_kg, stock_item['CurrentPricePerKg'], 'Additional stock issued')
-            )
+        # 3. Update inventory and record the transactions
+        _write_issues(db, needed, [
+            (order_id, stock_id, weight_kg, stock[stock_id][1], 'Additional stock issued', transaction_date)
+            for stock_id, weight_kg, transaction_date in normalized
+        ])
 
         db.commit()
-        return {"success": True}
+        schedule_export()
+        return {"success": True, "issued": len(normalized)}
+    except (KeyError, TypeError) as e:
+        db.rollback()
+        return {"success": False, "error": f"Invalid stock line: {e}"}
     except (ValueError, db.Error) as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
 # --- ADDED: Service functions for stock transaction CRUD ---
 
+@write_operation
 def update_stock_transaction(transaction_id, data):
     """Updates the weight and date of a stock transaction and adjusts inventory accordingly."""
     db = get_db()
     try:
-        db.execute("BEGIN")
+        begin_immediate(db)
         
         # 1. Get the original transaction
         original_trans = db.execute("SELECT * FROM StockTransactions WHERE TransactionID = ?", (transaction_id,)).fetchone()
@@ -432,16 +655,18 @@ def update_stock_transaction(transaction_id, data):
         )
         
         db.commit()
+        schedule_export()
         return {"success": True}
     except (ValueError, db.Error) as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
+@write_operation
 def delete_stock_transaction(transaction_id):
     """Deletes a stock transaction and reverses its effect on inventory."""
     db = get_db()
     try:
-        db.execute("BEGIN")
+        begin_immediate(db)
 
         # 1. Get the transaction to be deleted
         trans_to_delete = db.execute("SELECT * FROM StockTransactions WHERE TransactionID = ?", (transaction_id,)).fetchone()
@@ -468,6 +693,7 @@ def delete_stock_transaction(transaction_id):
         db.execute("DELETE FROM StockTransactions WHERE TransactionID = ?", (transaction_id,))
         
         db.commit()
+        schedule_export()
         return {"success": True}
     except (ValueError, db.Error) as e:
         db.rollback()
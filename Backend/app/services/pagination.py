@@ -0,0 +1,167 @@
+# /app/services/pagination.py
+# Keyset (cursor) pagination and field projection shared by the list endpoints.
+
+import base64
+import json
+from flask import current_app
+
+
+class Page:
+    """
+    List options parsed from the query string. `cursor` holds the sort key
+    values of the last row of the previous page; `fields` limits the keys
+    returned for each row. Lists are only wrapped in a page envelope when a
+    limit or cursor was asked for, so plain list requests keep their shape.
+    `format` 'columnar' returns {"columns": [...], "rows": [[...], ...]}
+    (plus "next_cursor" when paginated) instead of one object per row.
+    """
+
+    def __init__(self, limit=None, cursor=None, fields=None, format='json'):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+        self.format = format
+
+    @property
+    def columnar(self):
+        return self.format == 'columnar'
+
+    @property
+    def paginated(self):
+        return self.limit is not None or self.cursor is not None
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+    # Only plain sort key values can be bound as query parameters
+    if not isinstance(values, list) or not all(v is None or isinstance(v, (str, int, float)) for v in values):
+        raise ValueError("Invalid cursor.")
+    return values
+
+
+FORMATS = ('json', 'columnar')
+
+
+def page_from_args(args):
+    """Builds a Page from ?limit=&cursor=&fields=&format=; raises ValueError on bad input."""
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    fields = args.get('fields')
+    fmt = args.get('format') or 'json'
+    if fmt not in FORMATS:
+        raise ValueError(f"'format' must be one of: {', '.join(FORMATS)}")
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError("'limit' must be a whole number.")
+        if limit < 1:
+            raise ValueError("'limit' must be at least 1.")
+        limit = min(limit, current_app.config.get('PAGE_SIZE_MAX', 1000))
+    elif cursor:
+        limit = current_app.config.get('PAGE_SIZE_DEFAULT', 100)
+
+    if fields is not None:
+        fields = [f.strip() for f in fields.split(',') if f.strip()] or None
+
+    return Page(limit, decode_cursor(cursor) if cursor else None, fields, fmt)
+
+
+def _check_fields(columns, fields):
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+
+
+def _projector(columns, fields):
+    if not fields:
+        return dict
+    _check_fields(columns, fields)
+    return lambda row: {f: row[f] for f in fields}
+
+
+def _columnar(columns, rows, fields):
+    # Built straight from the cursor's tuples: no Row objects, no per-row dicts
+    if not fields:
+        return {"columns": columns, "rows": rows}
+    _check_fields(columns, fields)
+    positions = [columns.index(f) for f in fields]
+    return {"columns": list(fields), "rows": [[row[i] for i in positions] for row in rows]}
+
+
+def _execute(db, query, params, page):
+    cursor = db.cursor()
+    if page is not None and page.columnar:
+        cursor.row_factory = None
+    cursor.execute(query, tuple(params))
+    return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+def _result(columns, rows, page):
+    fields = page.fields if page is not None else None
+    if page is not None and page.columnar:
+        return _columnar(columns, rows, fields)
+    project = _projector(columns, fields)
+    return [project(row) for row in rows]
+
+
+def fetch(db, query, conditions, params, order_by, page=None, descending=False):
+    """
+    Runs `query` with the given WHERE conditions, sorted by `order_by` — a list
+    of (sql expression, result column) pairs that together identify a row — and
+    returns the rows, or a {"items", "next_cursor"} page when `page` asks for one.
+    The cursor becomes a row-value comparison on the sort key, so every page is
+    an index range scan instead of an OFFSET over all the rows before it.
+    """
+    conditions, params = list(conditions), list(params)
+    expressions = [expr for expr, _ in order_by]
+
+    if page is not None and page.cursor is not None:
+        if len(page.cursor) != len(order_by):
+            raise ValueError("Invalid cursor.")
+        conditions.append(
+            f"({', '.join(expressions)}) {'<' if descending else '>'} ({', '.join('?' * len(expressions))})"
+        )
+        params.extend(page.cursor)
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY " + ", ".join(expr + (" DESC" if descending else "") for expr in expressions)
+
+    limit = page.limit if page is not None else None
+    if limit is not None:
+        # One extra row tells us whether there is a next page
+        query += " LIMIT ?"
+        params.append(limit + 1)
+
+    columns, rows = _execute(db, query, params, page)
+    if page is None or not page.paginated:
+        return _result(columns, rows, page)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        key = [columns.index(column) for _, column in order_by]
+        next_cursor = encode_cursor([rows[-1][i] for i in key])
+    result = _result(columns, rows, page)
+    if page.columnar:
+        result["next_cursor"] = next_cursor
+        return result
+    return {"items": result, "next_cursor": next_cursor}
+
+
+def fetch_all(db, query, params, page=None):
+    """Runs a complete query (e.g. ranked search) and shapes its rows like `fetch` does, without paging."""
+    columns, rows = _execute(db, query, params, page)
+    return _result(columns, rows, page)
@@ -3,9 +3,11 @@
 # /app/services/payment_service.py
 
 from app.database.db import get_db
-from app.services.excel_service import export_all_tables_to_excel
+from app.database.writer import write_operation
+from app.services.export_worker import schedule_export
 from datetime import datetime, timezone
 
+@write_operation
 def add_payment(data):
     """
     Adds a payment record. Can be a general payment (OrderID is None)
@@ -31,13 +33,14 @@ def add_payment(data):
             (contractor_id, order_id, payment_date, amount, notes)
         )
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True}
     except db.Error as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
 # ADDED: Function to update an existing payment
+@write_operation
 def update_payment(payment_id, data):
     """Updates an existing payment record's amount, date, and notes."""
     db = get_db()
@@ -57,13 +60,14 @@ def update_payment(payment_id, data):
         if cursor.rowcount == 0:
             return {"success": False, "error": "Payment not found."}
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True}
     except db.Error as e:
         db.rollback()
         return {"success": False, "error": str(e)}
 
 # ADDED: Function to delete a payment
+@write_operation
 def delete_payment(payment_id):
     """Deletes a payment record from the database."""
     db = get_db()
@@ -72,7 +76,7 @@ def delete_payment(payment_id):
         if cursor.rowcount == 0:
             return {"success": False, "error": "Payment not found."}
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True}
     except db.Error as e:
         db.rollback()
@@ -0,0 +1,234 @@
+# /app/services/payroll_service.py
+# Wage-day payroll and bulk payment import. The payroll run works out what is
+# pending for every order (or contractor) from the balance rollups in one pass
+# and writes all the payments in a single transaction.
+
+import json
+from datetime import datetime, timezone
+from flask import current_app
+from app.database.db import get_db, begin_immediate
+from app.database.writer import write_operation
+from app.services import sheet_import
+from app.services.export_worker import schedule_export
+from app.services.order_service import _compute_financials
+
+# 'order' pays each order's AmountPending (as in get_order_financials) as an order payment.
+# 'contractor' pays each contractor's final_balance_owed (as in get_contractor_details) as a general payment.
+PAYROLL_BASES = ('order', 'contractor')
+
+_INSERT_PAYMENT = "INSERT INTO Payments (ContractorID, OrderID, PaymentDate, Amount, Notes) VALUES (?, ?, ?, ?, ?)"
+
+# Accepted spellings of each column of a payments sheet
+PAYMENT_COLUMN_ALIASES = {
+    'ContractorID': ('contractorid', 'contractor'),
+    'OrderID': ('orderid', 'order'),
+    'Amount': ('amount', 'payment', 'paid'),
+    'PaymentDate': ('paymentdate', 'date'),
+    'Notes': ('notes', 'note', 'remarks'),
+}
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _json_ids(ids):
+    return json.dumps([int(i) for i in ids])
+
+
+def _order_pending(db, contractor_ids, status):
+    conditions, params = [], []
+    if contractor_ids:
+        conditions.append("o.ContractorID IN (SELECT value FROM json_each(?))")
+        params.append(_json_ids(contractor_ids))
+    if status:
+        conditions.append("o.Status = ?")
+        params.append(status)
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    rows = db.execute(f"""
+        SELECT o.OrderID, o.ContractorID, c.Name AS ContractorName,
+               o.Wage, o.Status, o.DateDue, o.PenaltyPerDay,
+               IFNULL(b.AmountPaid, 0) AS AmountPaid,
+               IFNULL(b.IssuedValue, 0) AS IssuedValue,
+               IFNULL(b.ReturnedValue, 0) AS ReturnedValue,
+               IFNULL(b.TotalDeductions, 0) AS TotalDeductions
+        FROM Orders o
+        JOIN Contractors c ON c.ContractorID = o.ContractorID
+        LEFT JOIN OrderBalances b ON b.OrderID = o.OrderID
+        {where}
+        ORDER BY c.Name, o.ContractorID, o.OrderID
+    """, params)
+    return [{
+        "contractor_id": row['ContractorID'], "contractor_name": row['ContractorName'],
+        "order_id": row['OrderID'], "amount": _compute_financials(row, row)['AmountPending'],
+    } for row in rows]
+
+
+def _contractor_pending(db, contractor_ids):
+    # Same per-quality rounding as get_contractor_details, so the amounts match its final_balance_owed
+    condition, params = "", []
+    if contractor_ids:
+        condition = "WHERE c.ContractorID IN (SELECT value FROM json_each(?))"
+        params.append(_json_ids(contractor_ids))
+    rows = db.execute(f"""
+        SELECT c.ContractorID, c.Name, IFNULL(cb.GeneralPayments, 0) AS GeneralPayments,
+               q.TotalWages, q.IssuedValue, q.ReturnedValue, q.Deductions, q.OrderPayments
+        FROM Contractors c
+        LEFT JOIN ContractorBalances cb ON cb.ContractorID = c.ContractorID
+        LEFT JOIN ContractorQualityBalances q ON q.ContractorID = c.ContractorID AND q.OrderCount > 0
+        {condition}
+        ORDER BY c.Name, c.ContractorID
+    """, params)
+
+    totals = {}
+    for row in rows:
+        entry = totals.setdefault(row['ContractorID'], {
+            "contractor_id": row['ContractorID'], "contractor_name": row['Name'],
+            "order_id": None, "owed": -row['GeneralPayments'],
+        })
+        if row['TotalWages'] is None:
+            continue
+        net_stock_value = round(row['IssuedValue'] - row['ReturnedValue'], 2)
+        entry["owed"] += round(row['TotalWages'], 2) - net_stock_value - round(row['Deductions'], 2) - round(row['OrderPayments'], 2)
+
+    for entry in totals.values():
+        entry["amount"] = round(entry.pop("owed"), 2)
+    return list(totals.values())
+
+
+def compute_payroll(basis='order', contractor_ids=None, status=None, min_amount=0.01):
+    """
+    Pending amounts for a payroll run, without writing anything. Returns the
+    payment lines (only those owed at least `min_amount`) and their total.
+    """
+    if basis not in PAYROLL_BASES:
+        raise ValueError(f"Unknown payroll basis '{basis}', expected one of: {', '.join(PAYROLL_BASES)}")
+    db = get_db()
+    if basis == 'order':
+        lines = _order_pending(db, contractor_ids, status)
+    else:
+        lines = _contractor_pending(db, contractor_ids)
+    lines = [line for line in lines if line['amount'] >= min_amount]
+    return {
+        "basis": basis,
+        "payments": lines,
+        "count": len(lines),
+        "contractors": len({line['contractor_id'] for line in lines}),
+        "total": round(sum(line['amount'] for line in lines), 2),
+    }
+
+
+@write_operation
+def run_payroll(basis='order', contractor_ids=None, status=None, min_amount=0.01,
+                payment_date=None, notes='Payroll', expected_total=None):
+    """
+    Pays everything `compute_payroll` reports, in one transaction. The amounts
+    are recomputed under the write lock; if `expected_total` (the total shown in
+    the preview) no longer matches, nothing is paid.
+    """
+    db = get_db()
+    payment_date = payment_date or _now()
+    try:
+        begin_immediate(db)
+        payroll = compute_payroll(basis, contractor_ids, status, min_amount)
+        if expected_total is not None and abs(payroll['total'] - float(expected_total)) > 0.005:
+            db.rollback()
+            return {"success": False, "conflict": True, **payroll,
+                    "error": "Balances changed since the preview; review the payroll again."}
+        db.executemany(_INSERT_PAYMENT, [
+            (line['contractor_id'], line['order_id'], payment_date, line['amount'], notes)
+            for line in payroll['payments']
+        ])
+        db.commit()
+        if payroll['payments']:
+            schedule_export()
+        return {"success": True, "payment_date": payment_date, **payroll}
+    except ValueError as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    except db.Error as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+
+
+# Reads the upload stream as it goes, so it can only run once
+@write_operation(replayable=False)
+def import_payments(stream, fmt, dry_run=False):
+    """
+    Adds the payments listed in a CSV/XLSX sheet (ContractorID, Amount and
+    optionally OrderID, PaymentDate, Notes) in one transaction. Rows naming an
+    unknown contractor or order, or an order of another contractor, are rejected.
+    """
+    db = get_db()
+    chunk_size = int(current_app.config.get('IMPORT_CHUNK_SIZE', 1000))
+    summary = {"inserted": 0, "rejected": 0, "rejected_rows": [], "total": 0.0, "dry_run": dry_run}
+    default_date = _now()
+
+    def reject(number, reason):
+        summary["rejected"] += 1
+        if len(summary["rejected_rows"]) < sheet_import.MAX_REPORTED_REJECTS:
+            summary["rejected_rows"].append({"row": number, "error": reason})
+
+    try:
+        begin_immediate(db)
+        contractors = {row[0] for row in db.execute("SELECT ContractorID FROM Contractors")}
+        for chunk in sheet_import.read_rows(stream, fmt, PAYMENT_COLUMN_ALIASES, ('ContractorID', 'Amount'), chunk_size):
+            order_ids = set()
+            for _, values in chunk:
+                try:
+                    order_id = sheet_import.integer(values.get('OrderID'), 'OrderID')
+                except ValueError:
+                    continue
+                if order_id is not None:
+                    order_ids.add(order_id)
+            order_owner = dict(db.execute(
+                "SELECT OrderID, ContractorID FROM Orders WHERE OrderID IN (SELECT value FROM json_each(?))",
+                (_json_ids(order_ids),)
+            ).fetchall())
+
+            rows = []
+            for number, values in chunk:
+                try:
+                    contractor_id = sheet_import.integer(values.get('ContractorID'), 'ContractorID')
+                    amount = sheet_import.number(values.get('Amount'), 'Amount')
+                    order_id = sheet_import.integer(values.get('OrderID'), 'OrderID')
+                except ValueError as e:
+                    reject(number, str(e))
+                    continue
+                if contractor_id is None or amount is None:
+                    reject(number, "ContractorID and Amount are required")
+                    continue
+                if amount == 0:
+                    reject(number, "Amount must not be zero")
+                    continue
+                if contractor_id not in contractors:
+                    reject(number, f"Contractor {contractor_id} not found")
+                    continue
+                if order_id is not None and order_owner.get(order_id) != contractor_id:
+                    reject(number, f"Order {order_id} not found for contractor {contractor_id}")
+                    continue
+                payment_date = values.get('PaymentDate')
+                if isinstance(payment_date, datetime):
+                    payment_date = payment_date.strftime('%Y-%m-%d %H:%M:%S')
+                rows.append((contractor_id, order_id, sheet_import.text(payment_date) or default_date,
+                             amount, sheet_import.text(values.get('Notes')) or ''))
+                summary["total"] += amount
+            if rows:
+                db.executemany(_INSERT_PAYMENT, rows)
+                summary["inserted"] += len(rows)
+
+        summary["total"] = round(summary["total"], 2)
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+            if summary["inserted"]:
+                schedule_export()
+        summary["success"] = True
+        return summary
+    except ValueError as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    except db.Error as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
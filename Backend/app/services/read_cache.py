@@ -0,0 +1,128 @@
+# /app/services/read_cache.py
+# In-process cache for expensive service reads. Entries remember the versions
+# of the tables they were built from; any write to one of those tables bumps
+# its version (change-tracking triggers), so the next lookup drops the entry.
+# This also holds for writes made by other processes or outside the services.
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app
+from app.database.db import get_db
+from app.database.versions import table_versions
+
+_MISS = object()
+
+
+class ReadCache:
+    """Thread-safe LRU cache with a TTL and hit/miss counters."""
+
+    def __init__(self, maxsize=256, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._functions = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key, versions):
+        with self._lock:
+            counters = self._functions.setdefault(key[0], {"hits": 0, "misses": 0})
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, entry_versions = entry
+                if time.monotonic() >= expires_at:
+                    del self._entries[key]
+                    self.expirations += 1
+                elif entry_versions != versions:
+                    del self._entries[key]
+                    self.invalidations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    counters["hits"] += 1
+                    return value
+            self.misses += 1
+            counters["misses"] += 1
+            return _MISS
+
+    def put(self, key, value, versions):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl, versions)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "functions": {name: dict(counters) for name, counters in self._functions.items()},
+            }
+
+
+def cached_read(*tables):
+    """
+    Caches a service read function by its arguments. `tables` are the tracked
+    tables its result is built from. Cached results are shared between
+    requests, so callers must not modify them.
+    """
+    def decorator(func):
+        name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get('read_cache')
+            if cache is None:
+                return func(*args, **kwargs)
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+
+            # Versions are read before the data, so a write racing with the
+            # read can only make the entry look older than it is, never newer
+            versions = table_versions(get_db(), tables)
+            value = cache.get(key, versions)
+            if value is _MISS:
+                value = func(*args, **kwargs)
+                cache.put(key, value, versions)
+            return value
+        return wrapper
+    return decorator
+
+
+def get_cache_stats():
+    cache = current_app.extensions.get('read_cache')
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+def init_app(app):
+    if not app.config.get('READ_CACHE_ENABLED', True):
+        return
+    app.extensions['read_cache'] = ReadCache(
+        maxsize=int(app.config.get('READ_CACHE_SIZE', 256)),
+        ttl=float(app.config.get('READ_CACHE_TTL_SECONDS', 60.0)),
+    )
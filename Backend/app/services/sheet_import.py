@@ -0,0 +1,125 @@
+# /app/services/sheet_import.py
+# Reads uploaded CSV/XLSX sheets row by row, in chunks, for the bulk import
+# services. Columns are matched by header name through a table of aliases.
+
+import csv
+import io
+import math
+import os
+import re
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+# Rejected rows listed in an import summary (the count covers all of them)
+MAX_REPORTED_REJECTS = 100
+
+# 1,250 or -12,500.75: commas only between groups of three digits
+_THOUSANDS = re.compile(r'^[+-]?\d{1,3}(,\d{3})+(\.\d+)?$')
+
+
+def _normalize_header(name):
+    return ''.join(ch for ch in str(name or '').lower() if ch not in ' _-')
+
+
+def _map_columns(header, aliases, required):
+    """{field: column index} for the recognised columns of the sheet's header row."""
+    positions = {}
+    for index, name in enumerate(header):
+        key = _normalize_header(name)
+        for field, names in aliases.items():
+            if key in names and field not in positions:
+                positions[field] = index
+    missing = [f for f in required if f not in positions]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    return positions
+
+
+def _read_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return csv.reader(text, strict=True), text.detach
+
+
+def _read_xlsx(stream):
+    from openpyxl import load_workbook
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:  # BadZipFile, openpyxl's InvalidFileException, ...
+        raise ValueError(f"The file is not a valid XLSX workbook ({e}).")
+    return workbook.worksheets[0].iter_rows(values_only=True), workbook.close
+
+
+def read_rows(stream, fmt, aliases, required=(), chunk_size=1000):
+    """
+    Yields chunks of (row number, {field: value}) from a CSV or XLSX stream.
+    `aliases` maps each field to the accepted header spellings (lower-case,
+    without spaces/underscores). The first row is the header; blank lines are skipped.
+    Unreadable files raise ValueError with a message meant for the user.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of: {', '.join(IMPORT_FORMATS)}")
+    rows, close = _read_csv(stream) if fmt == 'csv' else _read_xlsx(stream)
+    number = 1
+    try:
+        header = next(rows, None)
+        if header is None:
+            raise ValueError("The file is empty.")
+        if fmt == 'csv' and len(header) == 1 and any(sep in str(header[0]) for sep in ';\t'):
+            raise ValueError("The CSV file must be comma-separated.")
+        positions = _map_columns(header, aliases, required)
+
+        chunk = []
+        for number, row in enumerate(rows, start=2):
+            if not row or all(v is None or str(v).strip() == '' for v in row):
+                continue
+            chunk.append((number, {f: (row[i] if i < len(row) else None) for f, i in positions.items()}))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    except UnicodeDecodeError:
+        raise ValueError("The file is not a UTF-8 CSV; save it as 'CSV UTF-8' and try again.")
+    except csv.Error as e:
+        raise ValueError(f"The CSV file is malformed near row {number + 1}: {e}")
+    finally:
+        close()
+
+
+def text(value):
+    value = '' if value is None else str(value).strip()
+    return value or None
+
+
+def number(value, name):
+    """
+    Parses a numeric cell. Commas are only accepted as thousands separators
+    (1,250.50); "1,5" could mean 1.5 or 15 and is rejected, as are nan and inf.
+    """
+    if value is None or str(value).strip() == '':
+        return None
+    text = str(value).strip()
+    if ',' in text:
+        if not _THOUSANDS.match(text):
+            raise ValueError(f"{name} has an ambiguous comma, use a dot for decimals: {value!r}")
+        text = text.replace(',', '')
+    try:
+        parsed = float(text)
+    except ValueError:
+        raise ValueError(f"{name} is not a number: {value!r}")
+    if not math.isfinite(parsed):
+        raise ValueError(f"{name} is not a finite number: {value!r}")
+    return parsed
+
+
+def integer(value, name):
+    """Parses an ID column; 12 and 12.0 are fine, 1.7 is rejected rather than truncated."""
+    value = number(value, name)
+    if value is not None and not value.is_integer():
+        raise ValueError(f"{name} is not a whole number: {value!r}")
+    return int(value) if value is not None else None
+
+
+def format_from_filename(filename):
+    ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return 'xlsx' if ext in ('xlsx', 'xlsm') else ext
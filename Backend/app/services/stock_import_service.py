@@ -0,0 +1,152 @@
+# /app/services/stock_import_service.py
+# Imports supplier stock sheets (CSV or XLSX) into StockItems. Existing items
+# (same Type, Quality and Color/Shade) are topped up and re-priced, new ones
+# are inserted, all in one transaction.
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app.database.db import get_db, begin_immediate
+from app.database.writer import write_operation
+from app.services import sheet_import
+from app.services.export_worker import schedule_export
+
+# Accepted spellings of each column, compared lower-case without spaces/underscores
+COLUMN_ALIASES = {
+    'Type': ('type', 'stocktype', 'material'),
+    'Quality': ('quality', 'stockquality'),
+    'ColorShadeNumber': ('colorshadenumber', 'colorshade', 'shade', 'shadenumber', 'color', 'colour'),
+    'QuantityKg': ('quantitykg', 'quantityinstockkg', 'quantity', 'weightkg', 'weight', 'kg'),
+    'PricePerKg': ('priceperkg', 'currentpriceperkg', 'price', 'rate'),
+}
+
+# NOT NULL is checked before the conflict is, so a missing price (allowed only
+# for items that already exist) needs a placeholder that DO UPDATE never keeps
+_UPSERT = """
+    INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg)
+    VALUES (?, ?, ?, IFNULL(?, 0), ?)
+    ON CONFLICT (Type, Quality, ColorShadeNumber) DO UPDATE SET
+        QuantityInStockKg = QuantityInStockKg + excluded.QuantityInStockKg,
+        CurrentPricePerKg = IFNULL(?, CurrentPricePerKg)
+"""
+
+
+def read_stock_rows(stream, fmt, chunk_size=1000):
+    """Yields chunks of (row number, {field: value}) from a stock sheet."""
+    return sheet_import.read_rows(stream, fmt, COLUMN_ALIASES, ('Type', 'Quality'), chunk_size)
+
+
+def _parse_row(values):
+    stock_type, quality = sheet_import.text(values.get('Type')), sheet_import.text(values.get('Quality'))
+    if not stock_type or not quality:
+        raise ValueError("Type and Quality are required")
+    quantity = sheet_import.number(values.get('QuantityKg'), 'Quantity') or 0.0
+    price = sheet_import.number(values.get('PricePerKg'), 'Price')
+    if quantity < 0:
+        raise ValueError("Quantity cannot be negative")
+    if price is not None and price < 0:
+        raise ValueError("Price cannot be negative")
+    return stock_type, quality, sheet_import.text(values.get('ColorShadeNumber')), quantity, price
+
+
+# Consumes the `chunks` generator, so it can only run once
+@write_operation(replayable=False)
+def import_stock(chunks, dry_run=False):
+    """
+    Upserts stock rows read by `read_stock_rows`. Items with a Color/Shade go
+    through ON CONFLICT on uq_stock_item; items without one are matched
+    explicitly, since the unique constraint never matches NULLs.
+    New items need a price. Returns a summary of inserted/updated/rejected rows.
+    """
+    db = get_db()
+    summary = {"inserted": 0, "updated": 0, "rejected": 0, "rejected_rows": [], "dry_run": dry_run}
+
+    def reject(number, reason):
+        summary["rejected"] += 1
+        if len(summary["rejected_rows"]) < sheet_import.MAX_REPORTED_REJECTS:
+            summary["rejected_rows"].append({"row": number, "error": reason})
+
+    try:
+        begin_immediate(db)
+        existing = {
+            (row['Type'], row['Quality'], row['ColorShadeNumber'] or None)
+            for row in db.execute("SELECT Type, Quality, ColorShadeNumber FROM StockItems")
+        }
+
+        for chunk in chunks:
+            upserts = []
+            for number, values in chunk:
+                try:
+                    stock_type, quality, shade, quantity, price = _parse_row(values)
+                except ValueError as e:
+                    reject(number, str(e))
+                    continue
+                key = (stock_type, quality, shade)
+                if key not in existing and price is None:
+                    reject(number, "A price is required for a new stock item")
+                    continue
+
+                if key in existing:
+                    summary["updated"] += 1
+                else:
+                    summary["inserted"] += 1
+                    existing.add(key)
+
+                if shade is not None:
+                    upserts.append((stock_type, quality, shade, price, quantity, price))
+                    continue
+                # Old data can hold several shadeless rows (NULL or ''); top up the first one only
+                match = db.execute(
+                    """SELECT StockID FROM StockItems WHERE Type = ? AND Quality = ? AND IFNULL(ColorShadeNumber, '') = ''
+                       ORDER BY StockID LIMIT 1""",
+                    (stock_type, quality)
+                ).fetchone()
+                if match is not None:
+                    db.execute(
+                        "UPDATE StockItems SET QuantityInStockKg = QuantityInStockKg + ?, CurrentPricePerKg = IFNULL(?, CurrentPricePerKg) WHERE StockID = ?",
+                        (quantity, price, match['StockID'])
+                    )
+                else:
+                    db.execute(
+                        "INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg) VALUES (?, ?, NULL, ?, ?)",
+                        (stock_type, quality, price, quantity)
+                    )
+            if upserts:
+                db.executemany(_UPSERT, upserts)
+
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+            if summary["inserted"] or summary["updated"]:
+                schedule_export()
+        summary["success"] = True
+        return summary
+    except (ValueError, db.Error) as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+
+
+def import_stock_file(stream, fmt, dry_run=False):
+    chunk_size = int(current_app.config.get('IMPORT_CHUNK_SIZE', 1000))
+    try:
+        chunks = read_stock_rows(stream, fmt, chunk_size)
+        return import_stock(chunks, dry_run=dry_run)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+
+
+@click.command('import-stock')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Report what would be inserted/updated without saving anything.')
+@with_appcontext
+def import_stock_command(path, dry_run):
+    """Imports a supplier stock sheet (CSV or XLSX) into the stock catalogue."""
+    with open(path, 'rb') as stream:
+        result = import_stock_file(stream, sheet_import.format_from_filename(path), dry_run=dry_run)
+    if not result.get('success'):
+        raise click.ClickException(result.get('error', 'Import failed'))
+    click.echo(f"{'Would insert' if dry_run else 'Inserted'} {result['inserted']}, "
+               f"{'update' if dry_run else 'updated'} {result['updated']}, rejected {result['rejected']} row(s).")
+    for rejected in result['rejected_rows']:
+        click.echo(f"  row {rejected['row']}: {rejected['error']}")
@@ -2,11 +2,13 @@
 
 # /app/services/stock_report_service.py
 from app.database.db import get_db
+from app.services.read_cache import cached_read
 from collections import defaultdict
 
+@cached_read('Orders', 'StockTransactions', 'StockItems', 'Contractors')
 def get_all_currently_held_stock():
     """
-    Generates a report of all stock currently held by contractors from 'Open' records.
+    Generates a report of all stock currently held by contractors from 'Open' orders.
     The data is structured as a list of contractors, each with a list of stock they hold.
     """
     db = get_db()
@@ -17,14 +19,14 @@ def get_all_currently_held_stock():
             si.Type, 
             si.Quality, 
             si.ColorShadeNumber,
-            SUM(CASE WHEN st.TransactionType = 'Issued' THEN st.WeightKg ELSE -st.WeightKg END) as NetWeightKg
-        FROM StockTransactions st
-        JOIN LentRecords lr ON st.LentRecordID = lr.LentRecordID
-        JOIN StockItems si ON st.StockID = si.StockID
-        JOIN Contractors c ON lr.ContractorID = c.ContractorID
-        WHERE lr.Status = 'Open'
-        GROUP BY c.ContractorID, st.StockID
-        HAVING NetWeightKg > 0.001
+            SUM(h.NetWeightKg) as NetWeightKg
+        FROM Orders o
+        JOIN StockHoldings h ON h.OrderID = o.OrderID
+        JOIN StockItems si ON h.StockID = si.StockID
+        JOIN Contractors c ON o.ContractorID = c.ContractorID
+        WHERE o.Status = 'Open'
+        GROUP BY c.ContractorID, h.StockID
+        HAVING SUM(h.NetWeightKg) > 0.001
         ORDER BY c.Name, si.Type, si.Quality
     """
     rows = db.execute(query).fetchall()
@@ -46,6 +48,7 @@ def get_all_currently_held_stock():
         
     return list(contractor_stock.values())
 
+@cached_read('Orders', 'StockTransactions', 'StockItems', 'Contractors')
 def get_total_issue_history():
     """
     Generates a report of all stock ever issued to contractors.
@@ -59,13 +62,13 @@ def get_total_issue_history():
             si.Type, 
             si.Quality, 
             si.ColorShadeNumber,
-            SUM(st.WeightKg) as TotalIssuedKg
-        FROM StockTransactions st
-        JOIN LentRecords lr ON st.LentRecordID = lr.LentRecordID
-        JOIN StockItems si ON st.StockID = si.StockID
-        JOIN Contractors c ON lr.ContractorID = c.ContractorID
-        WHERE st.TransactionType = 'Issued'
-        GROUP BY c.ContractorID, st.StockID
+            SUM(h.IssuedKg) as TotalIssuedKg
+        FROM Orders o
+        JOIN StockHoldings h ON h.OrderID = o.OrderID
+        JOIN StockItems si ON h.StockID = si.StockID
+        JOIN Contractors c ON o.ContractorID = c.ContractorID
+        WHERE h.IssuedKg > 0
+        GROUP BY c.ContractorID, h.StockID
         ORDER BY c.Name, si.Type, si.Quality
     """
     rows = db.execute(query).fetchall()
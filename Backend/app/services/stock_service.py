@@ -1,8 +1,10 @@
 import sqlite3
-from app.database.db import get_db
-from app.services.excel_service import export_all_tables_to_excel
+from app.database.db import get_db, begin_immediate
+from app.database.writer import write_operation
+from app.services.export_worker import schedule_export
+from app.services import pagination
 
-def get_all_stock_items(search_type=None, search_quality=None, search_color=None):
+def get_all_stock_items(search_type=None, search_quality=None, search_color=None, page=None):
     """
     Fetches stock items with flexible search filters.
     """
@@ -24,14 +26,12 @@ def get_all_stock_items(search_type=None, search_quality=None, search_color=None
         conditions.append("IFNULL(ColorShadeNumber, '') LIKE ?")
         params.append(f"%{search_color}%")
 
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-        
-    query += " ORDER BY Type, Quality"
-    
-    items = db.execute(query, tuple(params)).fetchall()
-    return [dict(row) for row in items]
+    return pagination.fetch(
+        db, query, conditions, params,
+        order_by=[('Type', 'Type'), ('Quality', 'Quality'), ('StockID', 'StockID')], page=page
+    )
 
+@write_operation
 def add_stock_item(data):
     db = get_db()
     try:
@@ -40,11 +40,12 @@ def add_stock_item(data):
             (data['Type'], data['Quality'], data.get('ColorShadeNumber'), data['CurrentPricePerKg'], data['QuantityInStockKg'])
         )
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"id": cursor.lastrowid}
     except sqlite3.IntegrityError:
         return {"error": "A stock item with this Type, Quality, and Color/Shade already exists."}
 
+@write_operation
 def update_stock_item(stock_id, data):
     db = get_db()
     fields = []
@@ -65,11 +66,13 @@ def update_stock_item(stock_id, data):
     query = f"UPDATE StockItems SET {', '.join(fields)} WHERE StockID = ?"
     
     try:
+        begin_immediate(db)
         cursor = db.execute(query, tuple(params))
         if cursor.rowcount == 0:
+            db.rollback()
             return {"error": "Stock item not found."}
         db.commit()
-        export_all_tables_to_excel()
+        schedule_export()
         return {"success": True, "rows_affected": cursor.rowcount}
     except db.Error as e:
         db.rollback()
@@ -0,0 +1 @@
+# Benchmarks. Run from the Backend folder, e.g. `python -m benchmarks.bench_indexes`.
@@ -0,0 +1,92 @@
+# /benchmarks/bench_group_commit.py
+"""
+Write throughput of POST /api/payments and POST /api/orders/<id>/issue-stock
+from concurrent clients, with every request committing on its own versus the
+write executor grouping pending writes into one commit (WRITE_EXECUTOR_ENABLED).
+Runs with synchronous=NORMAL (the default) and FULL, where each commit fsyncs.
+
+    python -m benchmarks.bench_group_commit [--threads 16] [--requests 100]
+"""
+
+import argparse
+import threading
+import time
+
+from benchmarks.common import make_app, print_table
+from app.database.db import get_db
+from app.database.writer import get_writer_stats
+
+
+def setup(app, contractors=50, orders=500, stock_items=50):
+    with app.app_context():
+        db = get_db()
+        db.executemany("INSERT INTO Contractors (Name, ContactInfo) VALUES (?, '')",
+                       [(f"Contractor {i}",) for i in range(contractors)])
+        db.executemany(
+            "INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg) VALUES ('Yarn', 'Q1', ?, 400, 1000000)",
+            [(f"S{i}",) for i in range(stock_items)]
+        )
+        db.executemany(
+            "INSERT INTO Orders (ContractorID, DesignNumber, DateIssued, Status) VALUES (?, ?, '2024-01-01', 'Open')",
+            [(i % contractors + 1, f"D-{i}") for i in range(orders)]
+        )
+        db.commit()
+    return contractors, orders, stock_items
+
+
+def run(endpoint, executor, synchronous, threads, requests):
+    app = make_app(SQL_INSTRUMENTATION=False, WRITE_EXECUTOR_ENABLED=executor,
+                   DB_SYNCHRONOUS=synchronous, DB_POOL_SIZE=threads)
+    contractors, orders, stock_items = setup(app)
+    failures = []
+
+    def client(n):
+        c = app.test_client()
+        for i in range(requests):
+            k = n * requests + i
+            if endpoint == 'payments':
+                r = c.post('/api/payments', json={'contractor_id': k % contractors + 1, 'order_id': None,
+                                                  'amount': 100, 'notes': 'bench'})
+            else:
+                r = c.post(f'/api/orders/{k % orders + 1}/issue-stock',
+                           json={'stock_id': k % stock_items + 1, 'weight': 1.5})
+            if r.status_code >= 400:
+                failures.append(r.get_json())
+
+    workers = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        table = 'Payments' if endpoint == 'payments' else 'StockTransactions'
+        written = get_db().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        stats = get_writer_stats()
+    total = threads * requests
+    assert not failures, failures[:3]
+    assert written == total, f"{written} rows written for {total} requests"
+    return total / elapsed, stats.get('average_batch')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=100, help='requests per thread')
+    args = parser.parse_args()
+
+    rows = []
+    for endpoint in ('payments', 'issue-stock'):
+        for synchronous in ('NORMAL', 'FULL'):
+            direct, _ = run(endpoint, False, synchronous, args.threads, args.requests)
+            grouped, batch = run(endpoint, True, synchronous, args.threads, args.requests)
+            rows.append((endpoint, synchronous, f"{direct:.0f}", f"{grouped:.0f}", batch, f"{grouped / direct:.2f}x"))
+
+    print(f"\n{args.threads} concurrent clients x {args.requests} requests\n")
+    print_table(('endpoint', 'synchronous', 'req/s (commit each)', 'req/s (group commit)', 'avg batch', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
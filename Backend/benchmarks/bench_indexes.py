@@ -0,0 +1,84 @@
+# /benchmarks/bench_indexes.py
+"""
+Before/after latency of the hot service lookups with and without the
+secondary indexes from app.database.db.INDEXES.
+
+    python -m benchmarks.bench_indexes [--transactions 120000] [--repeat 50]
+"""
+
+import argparse
+import itertools
+import random
+
+from benchmarks.common import make_app, seed, measure, print_table
+from app.database.db import get_db
+from app.database.schema import INDEXES
+from app.services import order_service, contractor_service
+
+
+def cases(app, rng, contractors, orders):
+    open_orders = []
+    with app.app_context():
+        open_orders = [r['OrderID'] for r in get_db().execute("SELECT OrderID FROM Orders WHERE Status = 'Open'")]
+    reassign_targets = itertools.cycle(open_orders)
+
+    def in_context(fn):
+        def run():
+            with app.app_context():
+                fn()
+        return run
+
+    def reassign():
+        order_id = next(reassign_targets)
+        order = order_service.get_order_by_id(order_id)
+        new_contractor = order['ContractorID'] % contractors + 1
+        result = order_service.reassign_order(order_id, new_contractor, 'benchmark')
+        assert result['success'], result
+
+    return [
+        ('get_order_financials', in_context(lambda: order_service.get_order_financials(rng.randint(1, orders)))),
+        ('get_transactions_by_order_id', in_context(lambda: order_service.get_transactions_by_order_id(rng.randint(1, orders)))),
+        ('get_payments_by_order_id', in_context(lambda: order_service.get_payments_by_order_id(rng.randint(1, orders)))),
+        ('get_contractor_details', in_context(lambda: contractor_service.get_contractor_details(rng.randint(1, contractors)))),
+        ("get_all_orders(status='open')", in_context(lambda: order_service.get_all_orders(status='open'))),
+        ('reassign_order', in_context(reassign)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=120000)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--contractors', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        db = get_db()
+        seed(db, contractors=args.contractors, orders=args.orders, transactions=args.transactions)
+
+    results = {}
+    for phase in ('without', 'with'):
+        with app.app_context():
+            db = get_db()
+            for name in INDEXES:
+                db.execute(f"DROP INDEX IF EXISTS {name}")
+            if phase == 'with':
+                for name, definition in INDEXES.items():
+                    db.execute(f"CREATE INDEX {name} ON {definition}")
+            db.commit()
+        rng = random.Random(7)
+        for label, fn in cases(app, rng, args.contractors, args.orders):
+            results.setdefault(label, {})[phase] = measure(fn, repeat=args.repeat)
+
+    rows = []
+    for label, r in results.items():
+        before, after = r['without']['median_ms'], r['with']['median_ms']
+        rows.append((label, f"{before:.2f}", f"{after:.2f}", f"{r['without']['p95_ms']:.2f}", f"{r['with']['p95_ms']:.2f}", f"{before / after:.1f}x"))
+    print(f"\n{args.transactions} transactions, {args.orders} orders, {args.contractors} contractors, {args.repeat} runs each\n")
+    print_table(('function', 'median ms (no idx)', 'median ms (idx)', 'p95 (no idx)', 'p95 (idx)', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
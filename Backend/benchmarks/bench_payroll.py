@@ -0,0 +1,70 @@
+# /benchmarks/bench_payroll.py
+"""
+Wage-day payroll: one set-based payroll run against paying every order one
+POST /api/payments at a time (a commit per payment). Also checks that after
+the run every paid order / contractor shows nothing pending.
+
+    python -m benchmarks.bench_payroll [--contractors 300] [--orders 20000]
+"""
+
+import argparse
+import time
+
+from benchmarks.common import make_app, seed, measure, print_table
+from app.database.db import get_db
+from app.services import payroll_service, payment_service, order_service, contractor_service
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contractors', type=int, default=300)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--transactions', type=int, default=120000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = []
+    for basis in payroll_service.PAYROLL_BASES:
+        app = make_app(READ_CACHE_ENABLED=False, SQL_INSTRUMENTATION=False)
+        with app.app_context():
+            seed(get_db(), contractors=args.contractors, orders=args.orders, transactions=args.transactions)
+            preview = measure(lambda: payroll_service.compute_payroll(basis), repeat=args.repeat)
+            result, run_ms = timed(lambda: payroll_service.run_payroll(basis, notes='bench'))
+            assert result['success'], result
+
+            if basis == 'order':
+                leftover = [o for o, f in order_service.get_financials_for_orders(
+                    [line['order_id'] for line in result['payments']]).items() if abs(f['AmountPending']) > 0.01]
+            else:
+                leftover = [line['contractor_id'] for line in result['payments']
+                            if abs(contractor_service.get_contractor_details(line['contractor_id'])
+                                   ['overall_summary']['final_balance_owed']) > 0.01]
+            assert not leftover, f"{len(leftover)} still pending after the run"
+            rows.append((f"payroll run ({basis})", result['count'], f"{preview['median_ms']:.1f}", f"{run_ms:.1f}"))
+
+    # Baseline: the same order payments, one add_payment (and commit) each
+    app = make_app(READ_CACHE_ENABLED=False, SQL_INSTRUMENTATION=False)
+    with app.app_context():
+        seed(get_db(), contractors=args.contractors, orders=args.orders, transactions=args.transactions)
+        lines = payroll_service.compute_payroll('order')['payments']
+
+        def one_by_one():
+            for line in lines:
+                order_service.get_order_financials(line['order_id'])
+                payment_service.add_payment({'contractor_id': line['contractor_id'], 'order_id': line['order_id'],
+                                             'amount': line['amount'], 'notes': 'bench'})
+        _, loop_ms = timed(one_by_one)
+        rows.append(("add_payment per order", len(lines), "-", f"{loop_ms:.1f}"))
+
+    print(f"\n{args.contractors} contractors, {args.orders} orders, {args.transactions} transactions\n")
+    print_table(('method', 'payments', 'preview median ms', 'run ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# /benchmarks/bench_server.py
+"""
+Load test of the two ways run.py can serve the app: the Flask development
+server ('dev') and waitress ('production'). Each server runs in its own
+process against the same seeded database, while client threads send a mix of
+list/detail reads and payment writes over keep-alive connections.
+Reports requests per second and p50/p99 latency.
+
+    python -m benchmarks.bench_server [--clients 16] [--seconds 10] [--threads 8]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import make_app, seed, print_table
+from app.database.db import get_db
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def child(mode, port, db_path, threads):
+    """Runs in the server process."""
+    from app import create_app
+    from app.server import serve
+    app = create_app({
+        'DB_PATH': db_path, 'EXPORT_ENABLED': False, 'SQL_INSTRUMENTATION': False,
+        'DB_POOL_SIZE': threads,
+    })
+    serve(app, mode, host='127.0.0.1', port=port, threads=threads)
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def load(port, clients, seconds, contractors, writes):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client(n):
+        rng = random.Random(n)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        while time.monotonic() < stop_at:
+            pick = rng.random()
+            if pick < writes:
+                method, path = 'POST', '/api/payments'
+                body = json.dumps({'contractor_id': rng.randint(1, contractors), 'amount': 10, 'notes': 'load'})
+            elif pick < 0.5:
+                method, path, body = 'GET', '/api/orders?limit=50', None
+            elif pick < 0.8:
+                method, path, body = 'GET', '/api/stock_items?limit=100', None
+            else:
+                method, path, body = 'GET', f'/api/contractors/{rng.randint(1, contractors)}', None
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors.append(f"{method} {path}: {response.status}")
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(f"{method} {path}: {e}")
+                conn.close()
+                continue
+            local.append((time.perf_counter() - started) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] if latencies else float('nan')
+    return len(latencies) / elapsed, pick(0.5), pick(0.99), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=8, help='waitress worker threads')
+    parser.add_argument('--writes', type=float, default=0.1, help='share of requests that add a payment')
+    parser.add_argument('--contractors', type=int, default=300)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'PORT', 'DB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, port, db_path = args.child
+        child(mode, int(port), db_path, args.threads)
+        return
+
+    app = make_app(SQL_INSTRUMENTATION=False)
+    with app.app_context():
+        seed(get_db(), contractors=args.contractors, orders=args.orders, transactions=args.orders * 6,
+             payments=args.orders * 2, deductions=args.orders // 4)
+    template = app.config['DB_PATH']
+
+    rows = []
+    for mode in ('dev', 'production'):
+        # Every server starts from the same data
+        db_path = f"{template}.{mode}.db"
+        shutil.copyfile(template, db_path)
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.bench_server', '--threads', str(args.threads), '--child', mode, str(port), db_path],
+            cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_up(port)
+            load(port, args.clients, 1, args.contractors, args.writes)  # warm-up
+            rps, p50, p99, errors = load(port, args.clients, args.seconds, args.contractors, args.writes)
+        finally:
+            server.terminate()
+            server.wait()
+        rows.append((mode, f"{rps:.0f}", f"{p50:.1f}", f"{p99:.1f}", len(errors)))
+        if errors:
+            print(f"{mode}: {len(errors)} errors, e.g. {errors[:3]}")
+
+    print(f"\n{args.clients} clients for {args.seconds:.0f}s, {args.writes:.0%} writes, waitress threads={args.threads}\n")
+    print_table(('server', 'req/s', 'p50 ms', 'p99 ms', 'errors'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# /benchmarks/bench_startup.py
+"""
+Cold start of the backend: a fresh interpreter imports the app and runs
+create_app() with the default configuration (export worker included) against
+an empty database and workbook path, as the one-file binary does before
+it can answer the first request. Reports wall-clock time over several runs
+and, from `python -X importtime`, the slowest imports.
+
+With --check it exits non-zero when the median start-up exceeds --budget-ms
+or when a module that should only be imported on demand (openpyxl, numpy,
+pandas, waitress) gets loaded at start-up, so regressions are caught in CI.
+
+    python -m benchmarks.bench_startup [--runs 10] [--top 15] [--check] [--budget-ms 1000] [--processes 1]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import print_table
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Imported inside the functions that need them, never at start-up
+LAZY_MODULES = ('openpyxl', 'numpy', 'pandas', 'waitress')
+
+CHILD = """
+import sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+# The shipped configuration; only the files go to a temporary folder
+create_app({'DB_PATH': sys.argv[1] + '/startup.db', 'EXCEL_PATH': sys.argv[1] + '/startup.xlsx', 'EXPORT_DIR': sys.argv[1] + '/export',
+            'SERVER_PROCESSES': int(sys.argv[3])})
+created = time.perf_counter()
+lazy = [m for m in sys.argv[2].split(',') if m in sys.modules]
+print((imported - started) * 1000, (created - imported) * 1000, ','.join(lazy))
+"""
+
+
+def start_once(importtime=False, processes=1):
+    """Starts a fresh interpreter; returns (total ms, import ms, create_app ms, lazy modules loaded, stderr)."""
+    tmp_dir = tempfile.mkdtemp(prefix='carpet-startup-')
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + \
+              ['-c', CHILD, tmp_dir, ','.join(LAZY_MODULES), str(processes)]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    total = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"start-up failed:\n{result.stderr}")
+    import_ms, create_ms, *lazy = result.stdout.strip().splitlines()[-1].split(' ')
+    return total, float(import_ms), float(create_ms), [m for m in ','.join(lazy).split(',') if m], result.stderr
+
+
+def slowest_imports(stderr, top):
+    """Parses `-X importtime` output into the `top` modules with the largest cumulative time."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), int(own), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--check', action='store_true', help='fail when over budget or a lazy module is imported')
+    parser.add_argument('--budget-ms', type=float, default=1000, help='budget for the median total start-up')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='start up as one of this many server processes (export lock and poller)')
+    args = parser.parse_args()
+
+    start_once(processes=args.processes)  # warm the OS file cache and __pycache__
+    runs = [start_once(processes=args.processes) for _ in range(args.runs)]
+    totals = [r[0] for r in runs]
+    rows = [
+        ('total (interpreter + import + create_app)', f"{statistics.median(totals):.0f}", f"{min(totals):.0f}", f"{max(totals):.0f}"),
+        ('import app', f"{statistics.median(r[1] for r in runs):.0f}", f"{min(r[1] for r in runs):.0f}", f"{max(r[1] for r in runs):.0f}"),
+        ('create_app()', f"{statistics.median(r[2] for r in runs):.0f}", f"{min(r[2] for r in runs):.0f}", f"{max(r[2] for r in runs):.0f}"),
+    ]
+    print(f"\nCold start over {args.runs} runs (ms), SERVER_PROCESSES={args.processes}\n")
+    print_table(('phase', 'median', 'min', 'max'), rows)
+
+    _, _, _, lazy, stderr = start_once(importtime=True, processes=args.processes)
+    if args.top:
+        print("\nSlowest imports (-X importtime, us)\n")
+        print_table(('cumulative', 'self', 'module'), slowest_imports(stderr, args.top))
+
+    if not args.check:
+        return
+    failures = []
+    if lazy:
+        failures.append(f"imported at start-up: {', '.join(lazy)}")
+    if statistics.median(totals) > args.budget_ms:
+        failures.append(f"median start-up {statistics.median(totals):.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print(f"\nOK: start-up within {args.budget_ms:.0f} ms, no on-demand modules imported")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# /benchmarks/common.py
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+
+
+def make_app(**config):
+    """Creates the app against a fresh database in a temporary folder."""
+    tmp_dir = tempfile.mkdtemp(prefix='carpet-bench-')
+    settings = {
+        'DB_PATH': os.path.join(tmp_dir, 'bench.db'),
+        'EXCEL_PATH': os.path.join(tmp_dir, 'bench.xlsx'),
+        'EXPORT_DIR': os.path.join(tmp_dir, 'export'),
+        'EXPORT_ENABLED': False,
+    }
+    settings.update(config)
+    return create_app(settings)
+
+
+def seed(db, contractors=300, stock_items=200, orders=20000, transactions=120000, payments=40000, deductions=5000, rng=None):
+    """Fills an empty database with realistic looking data, in bulk."""
+    rng = rng or random.Random(42)
+    qualities = ['60x60', '40x40', '80x80', '100x100']
+
+    db.execute("BEGIN")
+    db.executemany(
+        "INSERT INTO Contractors (Name, ContactInfo) VALUES (?, ?)",
+        [(f"Contractor {i}", f"0300-{i:07d}") for i in range(1, contractors + 1)]
+    )
+    db.executemany(
+        "INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg) VALUES (?, ?, ?, ?, ?)",
+        [(f"Yarn {i % 10}", f"Q{i % 7}", f"S{i}", rng.uniform(200, 900), 1_000_000.0) for i in range(1, stock_items + 1)]
+    )
+    db.executemany(
+        """INSERT INTO Orders (ContractorID, DesignNumber, ShadeCard, Quality, Size, DateIssued, DateDue, PenaltyPerDay, Notes, Status, Wage)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [(rng.randint(1, contractors), f"D-{i}", f"SC-{i % 50}", rng.choice(qualities), '8x10',
+          f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", '2025-01-01', 10, f"Order notes {i}",
+          'Open' if rng.random() < 0.3 else 'Closed', rng.uniform(5000, 50000))
+         for i in range(1, orders + 1)]
+    )
+    db.executemany(
+        """INSERT INTO StockTransactions (OrderID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction, TransactionDate)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        [(rng.randint(1, orders), rng.randint(1, stock_items), 'Issued' if rng.random() < 0.75 else 'Returned',
+          rng.uniform(0.5, 20), rng.uniform(200, 900), '2024-06-01 10:00:00')
+         for _ in range(transactions)]
+    )
+    db.executemany(
+        "INSERT INTO Payments (OrderID, ContractorID, PaymentDate, Amount, Notes) VALUES (?, ?, ?, ?, ?)",
+        [(rng.randint(1, orders) if rng.random() < 0.8 else None, rng.randint(1, contractors),
+          '2024-06-01 10:00:00', rng.uniform(100, 5000), '')
+         for _ in range(payments)]
+    )
+    db.executemany(
+        "INSERT INTO Deductions (OrderID, Amount, Reason) VALUES (?, ?, ?)",
+        [(rng.randint(1, orders), rng.uniform(10, 500), 'Damage') for _ in range(deductions)]
+    )
+    db.commit()
+
+
+def measure(fn, repeat=50, warmup=3):
+    """Runs fn repeatedly and returns latency statistics in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'median_ms': statistics.median(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'max_ms': samples[-1],
+    }
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    line = "  ".join(str(h).ljust(w) for h, w in zip(headers, widths))
+    print(line)
+    print("-" * len(line))
+    for r in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(r, widths)))
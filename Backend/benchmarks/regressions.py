@@ -0,0 +1,374 @@
+# /benchmarks/regressions.py
+"""
+Regression checks for bugs found in review. Each check builds its own small
+database, drives the app through the API (or the service it tests) and
+returns a list of failures. Exits non-zero if any check fails; CI runs it.
+
+    python -m benchmarks.regressions
+"""
+
+import io
+import json
+import sqlite3
+import sys
+import tracemalloc
+
+from benchmarks.common import make_app, seed
+from app.database.db import get_db
+from app.services.pagination import encode_cursor
+
+
+def _app():
+    return make_app(SQL_INSTRUMENTATION=False)
+
+
+def check_held_stock_across_orders():
+    """
+    Two open orders of one contractor hold the same stock item and one of them
+    returned everything: held stock is the sum over both orders, and items whose
+    sum is not positive are not listed.
+    """
+    app = _app()
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO Contractors (Name, ContactInfo) VALUES ('Held', '')")
+        db.executemany(
+            "INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg) VALUES ('Yarn', 'Q1', ?, 400, 1000)",
+            [('S1',), ('S2',)]
+        )
+        db.executemany(
+            "INSERT INTO Orders (ContractorID, DesignNumber, DateIssued, Status) VALUES (1, ?, '2024-01-01', 'Open')",
+            [('D-1',), ('D-2',)]
+        )
+        db.executemany(
+            """INSERT INTO StockTransactions (OrderID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction, TransactionDate)
+               VALUES (?, ?, ?, ?, 400, '2024-01-02')""",
+            [
+                (1, 1, 'Issued', 10), (1, 1, 'Returned', 10),   # order 1 gave all of S1 back
+                (2, 1, 'Issued', 5),                            # order 2 still holds 5 kg of S1
+                (1, 2, 'Issued', 2), (2, 2, 'Returned', 3.5),   # S2 nets out negative
+            ]
+        )
+        db.commit()
+
+    client = app.test_client()
+    expected = {'S1': 5.0}
+    failures = []
+    held = {row['ColorShadeNumber']: row['NetWeightKg'] for row in client.get('/api/contractors/1').get_json()['currently_held_stock']}
+    if held != expected:
+        failures.append(f"contractor details: held stock {held}, expected {expected}")
+    report = client.get('/api/stock-reports/currently-held').get_json()
+    held = {item['ColorShadeNumber']: item['NetWeightKg'] for c in report for item in c['HeldStock']}
+    if held != expected:
+        failures.append(f"currently-held report: {held}, expected {expected}")
+    return failures
+
+
+def check_crafted_cursor():
+    """A cursor that decodes to something other than plain sort key values is a 400, not a 500."""
+    client = _app().test_client()
+    failures = []
+    for values in ('[[1],{"a":1}]', '{"a":1}', '[1,[2]]'):
+        r = client.get(f"/api/contractors?cursor={encode_cursor(json.loads(values))}")
+        if r.status_code != 400:
+            failures.append(f"cursor {values}: {r.status_code}, expected 400")
+    return failures
+
+
+def check_bulk_order_weights():
+    """Stock lines of new orders must have a positive weight, as on issue-stock."""
+    app = _app()
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO Contractors (Name, ContactInfo) VALUES ('Weights', '')")
+        db.execute("INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg) VALUES ('Yarn', 'Q1', 'S1', 400, 100)")
+        db.commit()
+    client = app.test_client()
+    failures = []
+    for weight in (-5, 0):
+        order = {'ContractorID': 1, 'DesignNumber': 'D-1', 'DateIssued': '2024-01-01',
+                 'transactions': [{'StockID': 1, 'WeightKg': weight}]}
+        for path, body in (('/api/orders/bulk', {'orders': [order]}), ('/api/orders', order)):
+            r = client.post(path, json=body)
+            if r.status_code < 400:
+                failures.append(f"{path} with WeightKg {weight}: {r.status_code}, expected a 4xx")
+    with app.app_context():
+        stock = get_db().execute("SELECT QuantityInStockKg FROM StockItems").fetchone()[0]
+    if stock != 100:
+        failures.append(f"stock changed to {stock} kg")
+    return failures
+
+
+def check_order_required_fields():
+    """Empty DesignNumber / DateIssued are missing, for single and bulk order creation."""
+    app = _app()
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO Contractors (Name, ContactInfo) VALUES ('Required', '')")
+        db.commit()
+    client = app.test_client()
+    failures = []
+    for field in ('DesignNumber', 'DateIssued'):
+        order = {'ContractorID': 1, 'DesignNumber': 'D-1', 'DateIssued': '2024-01-01', field: ''}
+        for path, body in (('/api/orders/bulk', {'orders': [order]}), ('/api/orders', order)):
+            r = client.post(path, json=body)
+            if r.status_code < 400:
+                failures.append(f"{path} with empty {field}: {r.status_code}, expected a 4xx")
+    return failures
+
+
+def check_unreadable_import_files():
+    """Files that can't be read give a clear 400; a good XLSX imports and its workbook is closed."""
+    from openpyxl import Workbook
+    from openpyxl.reader.excel import ExcelReader
+    client = _app().test_client()
+    failures = []
+    bad = {
+        'latin1.csv': ('Type,Quality,Shade,Price\nYarn,Q1,S\u00e9,400\n'.encode('cp1252'), 'UTF-8'),
+        'semicolons.csv': (b'Type;Quality;Shade\nYarn;Q1;S1\n', 'comma-separated'),
+        'quote.csv': (b'Type,Quality\n"Yarn,Q1\n', 'malformed'),
+        'garbage.xlsx': (b'not a workbook', 'not a valid XLSX'),
+    }
+    for name, (data, message) in bad.items():
+        r = client.post('/api/stock_items/import?dry_run=1', data={'file': (io.BytesIO(data), name)},
+                        content_type='multipart/form-data')
+        error = (r.get_json() or {}).get('error') or ''
+        if r.status_code != 400 or message not in error:
+            failures.append(f"{name}: {r.status_code} {error!r}, expected 400 mentioning {message!r}")
+
+    workbook = Workbook()
+    workbook.active.append(['Type', 'Quality', 'Shade', 'Price', 'Quantity'])
+    workbook.active.append(['Yarn', 'Q1', 'S1', 400, 5])
+    data = io.BytesIO()
+    workbook.save(data)
+    opened = []
+    original = ExcelReader.read
+    def read(reader):
+        opened.append(reader.archive)
+        return original(reader)
+    ExcelReader.read = read
+    try:
+        r = client.post('/api/stock_items/import', data={'file': (io.BytesIO(data.getvalue()), 'good.xlsx')},
+                        content_type='multipart/form-data')
+    finally:
+        ExcelReader.read = original
+    if r.status_code != 200 or (r.get_json() or {}).get('inserted') != 1:
+        failures.append(f"good.xlsx: {r.status_code} {r.get_json()}")
+    if any(archive.fp is not None for archive in opened):
+        failures.append("the uploaded workbook was left open")
+    return failures
+
+
+def check_payment_import_and_payroll_input():
+    """Fractional IDs and zero amounts are rejected per row; bad payroll options are a readable 400."""
+    app = _app()
+    with app.app_context():
+        db = get_db()
+        db.executemany("INSERT INTO Contractors (Name, ContactInfo) VALUES (?, '')", [('P1',), ('P2',)])
+        db.commit()
+    client = app.test_client()
+    failures = []
+    sheet = b'ContractorID,Amount\n1.7,100\n1,0\n2,50\n'
+    r = client.post('/api/payments/import', data={'file': (io.BytesIO(sheet), 'payments.csv')},
+                    content_type='multipart/form-data')
+    summary = r.get_json() or {}
+    if summary.get('inserted') != 1 or [row['row'] for row in summary.get('rejected_rows', [])] != [2, 3]:
+        failures.append(f"payment import: {r.status_code} {summary}")
+    for body in ({'contractor_ids': 'abc'}, {'contractor_ids': [1, 'x']}, {'min_amount': 'lots'}):
+        for path in ('/api/payroll/preview', '/api/payroll/run'):
+            r = client.post(path, json=body)
+            error = (r.get_json() or {}).get('error') or ''
+            if r.status_code != 400 or 'must be' not in error:
+                failures.append(f"{path} {body}: {r.status_code} {error!r}")
+    return failures
+
+
+def check_default_export_memory():
+    """
+    The default (incremental xlsx) export streams the workbook: its peak memory
+    after a small change does not grow with the history, and no workbook is loaded.
+    """
+    from openpyxl.reader.excel import ExcelReader
+    from app.services.excel_service import export_all_tables_to_excel
+    failures = []
+    peaks = {}
+    for scale in (1, 8):
+        app = _app()
+        app.config['EXPORT_CHUNK_SIZE'] = 500
+        with app.app_context():
+            db = get_db()
+            seed(db, contractors=50, stock_items=50, orders=500 * scale, transactions=2000 * scale,
+                 payments=1000 * scale, deductions=100 * scale)
+            export_all_tables_to_excel()
+            db.execute("INSERT INTO Payments (ContractorID, PaymentDate, Amount) VALUES (1, '2024-07-01', 10)")
+            db.commit()
+            loaded = []
+            original = ExcelReader.read
+            ExcelReader.read = lambda reader: loaded.append(reader) or original(reader)
+            tracemalloc.start()
+            try:
+                exported = export_all_tables_to_excel()
+                peaks[scale] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                ExcelReader.read = original
+        if not exported:
+            failures.append(f"export of {scale}x history failed")
+        if loaded:
+            failures.append(f"export of {scale}x history loaded the workbook")
+    if peaks[8] > peaks[1] * 1.5:
+        failures.append(f"peak memory {peaks[8] / 1e6:.1f} MB for 8x history, {peaks[1] / 1e6:.1f} MB for 1x")
+    return failures
+
+
+def check_imports_after_failed_group_commit():
+    """
+    When a group commit fails, imports (which read a single-use stream) are not
+    run again on an exhausted stream: they report the failure, nothing is saved,
+    and uploading the file again works.
+    """
+    from app.database.writer import GroupCommitConnection
+    app = make_app(SQL_INSTRUMENTATION=False, WRITE_EXECUTOR_ENABLED=True)
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO Contractors (Name, ContactInfo) VALUES ('Import', '')")
+        db.commit()
+    client = app.test_client()
+    uploads = (
+        ('/api/stock_items/import', b'Type,Quality,Shade,Price,Quantity\nYarn,Q1,S1,400,5\n', 'StockItems'),
+        ('/api/payments/import', b'ContractorID,Amount\n1,100\n', 'Payments'),
+    )
+    failures = []
+    original = GroupCommitConnection.commit
+    for path, sheet, table in uploads:
+        failing = [True]
+        def commit(conn):
+            if not conn.in_group and failing:
+                failing.pop()
+                raise sqlite3.OperationalError("disk I/O error")
+            return original(conn)
+        GroupCommitConnection.commit = commit
+        try:
+            r = client.post(path, data={'file': (io.BytesIO(sheet), 'sheet.csv')}, content_type='multipart/form-data')
+        finally:
+            GroupCommitConnection.commit = original
+        with app.app_context():
+            saved = get_db().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if r.status_code != 400 or 'could not be saved' not in ((r.get_json() or {}).get('error') or '') or saved:
+            failures.append(f"{path} after a failed commit: {r.status_code} {r.get_json()}, {saved} row(s) saved")
+        r = client.post(path, data={'file': (io.BytesIO(sheet), 'sheet.csv')}, content_type='multipart/form-data')
+        if r.status_code != 200 or (r.get_json() or {}).get('inserted') != 1:
+            failures.append(f"{path} uploaded again: {r.status_code} {r.get_json()}")
+    return failures
+
+
+def check_post_closure_return_is_atomic():
+    """
+    A post-closure stock return records the stock, the transaction and the
+    refund together; if the refund can't be written, none of them is.
+    """
+    app = _app()
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO Contractors (Name, ContactInfo) VALUES ('Return', '')")
+        db.execute("INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg) VALUES ('Yarn', 'Q1', 'S1', 400, 90)")
+        db.execute("INSERT INTO Orders (ContractorID, DesignNumber, DateIssued, Status) VALUES (1, 'D-1', '2024-01-01', 'Closed')")
+        db.execute("""INSERT INTO StockTransactions (OrderID, StockID, TransactionType, WeightKg, PricePerKgAtTimeOfTransaction, TransactionDate)
+                      VALUES (1, 1, 'Issued', 10, 400, '2024-01-02')""")
+        db.execute("CREATE TRIGGER no_refunds BEFORE INSERT ON Payments BEGIN SELECT RAISE(ABORT, 'refunds are off'); END")
+        db.commit()
+
+    def recorded():
+        with app.app_context():
+            db = get_db()
+            return (db.execute("SELECT QuantityInStockKg FROM StockItems").fetchone()[0],
+                    db.execute("SELECT COUNT(*) FROM StockTransactions").fetchone()[0],
+                    db.execute("SELECT IFNULL(SUM(Amount), 0) FROM Payments").fetchone()[0])
+
+    client = app.test_client()
+    failures = []
+    r = client.post('/api/orders/1/return-stock', json={'stock_id': 1, 'weight': 2})
+    if r.status_code != 400 or recorded() != (90, 1, 0):
+        failures.append(f"return with a failing refund: {r.status_code}, recorded {recorded()}, expected 400 and nothing")
+    with app.app_context():
+        db = get_db()
+        db.execute("DROP TRIGGER no_refunds")
+        db.commit()
+    r = client.post('/api/orders/1/return-stock', json={'stock_id': 1, 'weight': 2})
+    if r.status_code != 200 or recorded() != (92, 2, -800):
+        failures.append(f"return: {r.status_code}, recorded {recorded()}, expected (92, 2, -800)")
+    return failures
+
+
+def check_import_number_parsing():
+    """nan, inf and comma decimals are rejected per row; thousands separators are fine."""
+    app = _app()
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO Contractors (Name, ContactInfo) VALUES ('Numbers', '')")
+        db.commit()
+    client = app.test_client()
+    failures = []
+    sheet = b'ContractorID,Amount\n1,nan\n1,inf\n1,"1,5"\n1,"1,250.50"\n'
+    r = client.post('/api/payments/import', data={'file': (io.BytesIO(sheet), 'payments.csv')},
+                    content_type='multipart/form-data')
+    summary = r.get_json() or {}
+    if [row['row'] for row in summary.get('rejected_rows', [])] != [2, 3, 4] or summary.get('total') != 1250.5:
+        failures.append(f"payment import: {r.status_code} {summary}")
+    sheet = b'Type,Quality,Shade,Price,Quantity\nYarn,Q1,S1,400,NaN\nYarn,Q1,S2,-inf,5\nYarn,Q1,S3,"2,5",5\n'
+    r = client.post('/api/stock_items/import', data={'file': (io.BytesIO(sheet), 'stock.csv')},
+                    content_type='multipart/form-data')
+    summary = r.get_json() or {}
+    if summary.get('rejected') != 3 or summary.get('inserted') != 0:
+        failures.append(f"stock import: {r.status_code} {summary}")
+    return failures
+
+
+def check_shadeless_stock_import():
+    """A row without Color/Shade tops up exactly one of several shadeless items."""
+    app = _app()
+    with app.app_context():
+        db = get_db()
+        db.executemany(
+            "INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg) VALUES ('Yarn', 'Q1', ?, 400, 10)",
+            [(None,), (None,), ('',)]
+        )
+        db.commit()
+    client = app.test_client()
+    r = client.post('/api/stock_items/import', data={'file': (io.BytesIO(b'Type,Quality,Shade,Quantity\nYarn,Q1,,5\n'), 'stock.csv')},
+                    content_type='multipart/form-data')
+    with app.app_context():
+        stock = [row[0] for row in get_db().execute("SELECT QuantityInStockKg FROM StockItems ORDER BY StockID")]
+    if r.status_code != 200 or stock != [15, 10, 10]:
+        return [f"import: {r.status_code} {r.get_json()}, stock {stock}, expected [15, 10, 10]"]
+    return []
+
+
+CHECKS = [
+    check_held_stock_across_orders,
+    check_crafted_cursor,
+    check_bulk_order_weights,
+    check_order_required_fields,
+    check_unreadable_import_files,
+    check_payment_import_and_payroll_input,
+    check_default_export_memory,
+    check_imports_after_failed_group_commit,
+    check_post_closure_return_is_atomic,
+    check_import_number_parsing,
+    check_shadeless_stock_import,
+]
+
+
+def main():
+    failed = False
+    for check in CHECKS:
+        failures = check()
+        print(f"{check.__name__}: {'FAILED' if failures else 'OK'}")
+        for failure in failures:
+            print(f"  {failure}")
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
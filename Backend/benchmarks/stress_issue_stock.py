@@ -0,0 +1,132 @@
+# /benchmarks/stress_issue_stock.py
+"""
+Concurrency stress test for stock issuing. Many threads call
+issue_stock_to_order on a handful of scarce stock items while others top the
+same items up, then the final stock of every item is checked against its
+ledger (starting quantity - issued + restocked) and must never be negative.
+
+A short busy timeout makes writers contend for the lock, so the BEGIN
+IMMEDIATE retry path is exercised too. Exits non-zero on any mismatch.
+
+    python -m benchmarks.stress_issue_stock [--threads 16] [--operations 200]
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from benchmarks.common import make_app, print_table
+from app.database.db import get_db
+from app.services import order_service, stock_service
+
+START_KG = 500.0
+
+
+def setup(app, stock_items, orders):
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO Contractors (Name, ContactInfo) VALUES ('Stress', '')")
+        db.executemany(
+            "INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg) VALUES (?, ?, ?, ?, ?)",
+            [('Yarn', 'Q1', f"S{i}", 400.0, START_KG) for i in range(stock_items)]
+        )
+        db.executemany(
+            "INSERT INTO Orders (ContractorID, DesignNumber, DateIssued, Status) VALUES (1, ?, '2024-01-01', 'Open')",
+            [(f"D-{i}",) for i in range(orders)]
+        )
+        db.commit()
+        return [row[0] for row in db.execute("SELECT StockID FROM StockItems")]
+
+
+def worker(app, seed, stock_ids, orders, operations, restocks, outcomes, lock):
+    rng = random.Random(seed)
+    local = Counter()
+    added = Counter()
+    for _ in range(operations):
+        stock_id = rng.choice(stock_ids)
+        with app.app_context():
+            if rng.random() < restocks:
+                amount = round(rng.uniform(1, 20), 3)
+                result = stock_service.update_stock_item(stock_id, {'add_quantity': amount})
+                if result.get('success'):
+                    added[stock_id] += amount
+                    local['restocked'] += 1
+                else:
+                    local[f"restock failed: {result.get('error')}"] += 1
+                continue
+            result = order_service.issue_stock_to_order(rng.randint(1, orders), stock_id, round(rng.uniform(0.5, 15), 3))
+        if result.get('success'):
+            local['issued'] += 1
+        elif 'Not enough stock' in result.get('error', ''):
+            local['rejected (not enough stock)'] += 1
+        else:
+            local[f"error: {result.get('error')}"] += 1
+    with lock:
+        outcomes['counts'].update(local)
+        outcomes['added'].update(added)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--operations', type=int, default=200, help='operations per thread')
+    parser.add_argument('--stock-items', type=int, default=4)
+    parser.add_argument('--orders', type=int, default=50)
+    parser.add_argument('--restocks', type=float, default=0.2, help='share of operations that add stock')
+    parser.add_argument('--busy-timeout-ms', type=int, default=50)
+    args = parser.parse_args()
+
+    app = make_app(SQL_INSTRUMENTATION=False, DB_BUSY_TIMEOUT_MS=args.busy_timeout_ms, DB_POOL_SIZE=args.threads)
+    stock_ids = setup(app, args.stock_items, args.orders)
+
+    outcomes = {'counts': Counter(), 'added': Counter()}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=worker, args=(app, n, stock_ids, args.orders, args.operations, args.restocks, outcomes, lock))
+        for n in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    failures = []
+    rows = []
+    with app.app_context():
+        db = get_db()
+        for stock_id in stock_ids:
+            final = db.execute("SELECT QuantityInStockKg FROM StockItems WHERE StockID = ?", (stock_id,)).fetchone()[0]
+            issued = db.execute(
+                "SELECT IFNULL(SUM(WeightKg), 0) FROM StockTransactions WHERE StockID = ? AND TransactionType = 'Issued'",
+                (stock_id,)
+            ).fetchone()[0]
+            expected = START_KG - issued + outcomes['added'][stock_id]
+            rows.append((stock_id, f"{issued:.3f}", f"{outcomes['added'][stock_id]:.3f}", f"{final:.3f}", f"{expected:.3f}"))
+            if abs(final - expected) > 1e-6:
+                failures.append(f"stock {stock_id}: {final} in stock, ledger says {expected}")
+            if final < 0:
+                failures.append(f"stock {stock_id} went negative: {final}")
+        holdings = db.execute("SELECT COUNT(*) FROM StockTransactions").fetchone()[0]
+
+    total = args.threads * args.operations
+    print(f"\n{args.threads} threads x {args.operations} operations on {args.stock_items} stock items, "
+          f"busy timeout {args.busy_timeout_ms} ms: {elapsed:.2f} s ({total / elapsed:.0f} ops/s, {holdings} transactions)\n")
+    print_table(('StockID', 'issued kg', 'restocked kg', 'final kg', 'ledger kg'), rows)
+    print()
+    print_table(('outcome', 'count'), sorted(outcomes['counts'].items()))
+
+    failures += [f"{count} x {outcome}" for outcome, count in outcomes['counts'].items()
+                 if outcome.startswith(('error', 'restock failed'))]
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK: every item's stock matches its ledger")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+# /benchmarks/stress_multiprocess.py
+"""
+Multi-process stress test. Several processes each build their own app on the
+same database and workbook (as run.py --processes does) and send a mix of
+payments, stock issues and reads for a while, with the Excel export enabled.
+Afterwards the database must pass an integrity check, every rollup must match
+its source tables, stock must match the ledger, every reported payment must
+be there, and exactly one process must have written the workbook. A fresh
+process then has to take over the export lock and bring the workbook up to
+date with the last writes, and the workbook must load and match.
+--sync-export runs the same load with EXPORT_ASYNC=0, where every process
+exports after each write, taking turns on the export lock.
+
+Then measures read throughput with 1, 2 and 4 processes.
+
+    python -m benchmarks.stress_multiprocess [--processes 4] [--threads 4] [--seconds 10] [--sync-export] [--skip-scaling]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from benchmarks.common import make_app, seed, print_table
+from app import create_app
+from app.database.db import get_db
+from app.database.rollups import ROLLUPS, verify_rollup
+
+START_KG = 1_000_000.0
+
+
+def mixed_load(config, seconds, threads, seed_no, results):
+    """Runs in each child process."""
+    from app import create_app
+    from app.services import order_service, payment_service
+    from app.services.export_worker import get_export_status
+
+    app = create_app(config)
+    stop_at = time.monotonic() + seconds
+    counts = Counter()
+    lock = threading.Lock()
+
+    def client(n):
+        rng = random.Random(seed_no * 1000 + n)
+        c = app.test_client()
+        local = Counter()
+        while time.monotonic() < stop_at:
+            pick = rng.random()
+            with app.app_context():
+                if pick < 0.3:
+                    result = payment_service.add_payment({'contractor_id': rng.randint(1, 50), 'order_id': None,
+                                                          'amount': 10, 'notes': 'stress'})
+                    local['payments' if result.get('success') else f"payment failed: {result.get('error')}"] += 1
+                    continue
+                if pick < 0.5:
+                    result = order_service.issue_stock_to_order(rng.randint(1, 500), rng.randint(1, 20), 1.25)
+                    local['issues' if result.get('success') else f"issue failed: {result.get('error')}"] += 1
+                    continue
+            r = c.get(f'/api/contractors/{rng.randint(1, 50)}')
+            local['reads' if r.status_code == 200 else f"read failed: {r.status_code}"] += 1
+        with lock:
+            counts.update(local)
+
+    workers = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    worker = app.extensions.get('export_worker')
+    if worker is not None:
+        worker.flush(60)
+    with app.app_context():
+        status = get_export_status()
+    if worker is not None:
+        worker.stop()
+    results.put((seed_no, dict(counts), status))
+
+
+def read_load(config, seconds, threads, seed_no, results):
+    from app import create_app
+    app = create_app(config)
+    stop_at = time.monotonic() + seconds
+    done = []
+
+    def client(n):
+        rng = random.Random(seed_no * 1000 + n)
+        c = app.test_client()
+        reads = 0
+        while time.monotonic() < stop_at:
+            c.get(f'/api/contractors/{rng.randint(1, 300)}')
+            c.get('/api/orders?limit=50')
+            reads += 2
+        done.append(reads)
+
+    workers = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    results.put(sum(done))
+
+
+def run_processes(target, count, *args):
+    """Runs target(*args, n, results) in `count` spawned processes and collects what they put on results."""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=target, args=(*args, n, results)) for n in range(count)]
+    for p in processes:
+        p.start()
+    collected = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+    return collected
+
+
+def stress(args):
+    app = make_app(SQL_INSTRUMENTATION=False)
+    with app.app_context():
+        db = get_db()
+        db.executemany("INSERT INTO Contractors (Name, ContactInfo) VALUES (?, '')", [(f"C{i}",) for i in range(50)])
+        db.executemany(
+            "INSERT INTO StockItems (Type, Quality, ColorShadeNumber, CurrentPricePerKg, QuantityInStockKg) VALUES ('Yarn', 'Q1', ?, 400, ?)",
+            [(f"S{i}", START_KG) for i in range(20)]
+        )
+        db.executemany(
+            "INSERT INTO Orders (ContractorID, DesignNumber, DateIssued, Status) VALUES (?, ?, '2024-01-01', 'Open')",
+            [(i % 50 + 1, f"D-{i}") for i in range(500)]
+        )
+        db.commit()
+    config = {key: app.config[key] for key in ('DB_PATH', 'EXCEL_PATH', 'EXPORT_DIR')}
+    # As run.py --processes configures them: SERVER_PROCESSES > 1 turns on the export lock
+    config.update({'EXPORT_ENABLED': True, 'EXPORT_ASYNC': not args.sync_export, 'SERVER_PROCESSES': args.processes,
+                   'SQL_INSTRUMENTATION': False, 'DB_POOL_SIZE': args.threads,
+                   'EXPORT_DEBOUNCE_SECONDS': 0.5, 'EXPORT_POLL_SECONDS': 0.5})
+
+    started = time.perf_counter()
+    reports = run_processes(mixed_load, args.processes, config, args.seconds, args.threads)
+    elapsed = time.perf_counter() - started
+
+    totals = Counter()
+    rows = []
+    for n, counts, status in sorted(reports):
+        totals.update(counts)
+        rows.append((n, counts.get('payments', 0), counts.get('issues', 0), counts.get('reads', 0),
+                     status.get('exports_completed'), status.get('exports_skipped'), status.get('last_error')))
+    print(f"\n{args.processes} processes x {args.threads} threads for {args.seconds:.0f}s ({elapsed:.1f}s with start-up)\n")
+    print_table(('process', 'payments', 'issues', 'reads', 'exports', 'skipped', 'export error'), rows)
+
+    failures = [f"{count} x {outcome}" for outcome, count in totals.items() if 'failed' in outcome]
+    exporters = [n for n, _, status in reports if status.get('exports_completed')]
+    if not args.sync_export and len(exporters) != 1:
+        failures.append(f"{len(exporters)} processes exported, expected exactly one")
+    failures += [f"process {n}: export error {status['last_error']}" for n, _, status in reports if status.get('last_error')]
+
+    with app.app_context():
+        db = get_db()
+        integrity = db.execute("PRAGMA integrity_check").fetchone()[0]
+        if integrity != 'ok':
+            failures.append(f"integrity_check: {integrity}")
+        for rollup in ROLLUPS:
+            drift = verify_rollup(db, rollup)
+            if drift:
+                failures.append(f"rollup {rollup.name}: {len(drift)} row(s) drifted")
+        payments = db.execute("SELECT COUNT(*) FROM Payments").fetchone()[0]
+        if payments != totals['payments']:
+            failures.append(f"{payments} payment rows, {totals['payments']} reported")
+        issued = db.execute("SELECT COUNT(*) FROM StockTransactions").fetchone()[0]
+        if issued != totals['issues']:
+            failures.append(f"{issued} stock transactions, {totals['issues']} reported")
+        ledger = db.execute(
+            """SELECT COUNT(*) FROM StockItems s
+               WHERE ABS(s.QuantityInStockKg - (? - IFNULL((SELECT SUM(WeightKg) FROM StockTransactions t WHERE t.StockID = s.StockID), 0))) > 1e-6""",
+            (START_KG,)
+        ).fetchone()[0]
+        if ledger:
+            failures.append(f"{ledger} stock item(s) differ from their ledger")
+
+    if not args.sync_export:
+        # The exporter can stop before the others' last writes; whoever holds the lock
+        # next must pick those up from TableVersions. Take over the lock here and check.
+        takeover = create_app({**config, 'EXPORT_POLL_SECONDS': 0.2, 'EXPORT_DEBOUNCE_SECONDS': 0.1})
+        worker = takeover.extensions['export_worker']
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if not worker._has_unexported_changes() and not worker.status()['running']:
+                break
+            time.sleep(0.1)
+        if not worker.status()['leader']:
+            failures.append("the export lock was not taken over after the processes exited")
+        worker.stop()
+
+    try:
+        from openpyxl import load_workbook
+        workbook = load_workbook(config['EXCEL_PATH'], read_only=True)
+        # Streamed sheets carry no dimension, so count the rows
+        exported = sum(1 for _ in workbook['Payments'].iter_rows()) - 1
+        workbook.close()
+        if exported != payments:
+            failures.append(f"workbook has {exported} payments, database {payments}")
+    except Exception as e:
+        failures.append(f"workbook did not load: {e}")
+    return failures
+
+
+def scaling(args):
+    app = make_app(SQL_INSTRUMENTATION=False)
+    with app.app_context():
+        seed(get_db(), orders=5000, transactions=30000, payments=10000, deductions=1000)
+    config = {'DB_PATH': app.config['DB_PATH'], 'EXPORT_ENABLED': False, 'SQL_INSTRUMENTATION': False,
+              'DB_POOL_SIZE': args.threads}
+    rows = []
+    base = None
+    for count in (1, 2, 4):
+        reads = sum(run_processes(read_load, count, config, args.seconds, args.threads))
+        rate = reads / args.seconds
+        base = base or rate
+        rows.append((count, f"{rate:.0f}", f"{rate / base:.2f}x"))
+    print(f"\nRead throughput, {args.threads} threads per process, {os.cpu_count()} CPU(s)\n")
+    print_table(('processes', 'reads/s', 'vs 1 process'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4, help='client threads per process')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--sync-export', action='store_true', help='export synchronously after every write (EXPORT_ASYNC=0)')
+    parser.add_argument('--skip-scaling', action='store_true', help='only run the consistency checks')
+    args = parser.parse_args()
+
+    failures = stress(args)
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK: database, rollups, ledger and workbook are consistent")
+    if not args.skip_scaling:
+        scaling(args)
+
+
+if __name__ == '__main__':
+    main()
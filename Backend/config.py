@@ -15,3 +15,76 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'a_very_secret_key')
     DB_PATH = resource_path("inventory.db")
     EXCEL_PATH = resource_path("inventory_data.xlsx")
+
+    # SQLite connection settings, applied once to every pooled connection.
+    # WAL lets readers keep working while a write is in progress.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+    DB_JOURNAL_MODE = os.environ.get('DB_JOURNAL_MODE', 'WAL')
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')
+    DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+    # Extra attempts (with backoff) at taking the write lock once the busy timeout has expired
+    DB_WRITE_RETRIES = int(os.environ.get('DB_WRITE_RETRIES', 5))
+    DB_WRITE_BACKOFF_MS = float(os.environ.get('DB_WRITE_BACKOFF_MS', 20))
+    # Run all service writes on one writer thread that commits whatever has queued up
+    # (at most WRITE_BATCH_MAX writes, optionally waiting WRITE_BATCH_WAIT_MS for more) in one transaction
+    WRITE_EXECUTOR_ENABLED = os.environ.get('WRITE_EXECUTOR_ENABLED', '0') == '1'
+    WRITE_BATCH_MAX = int(os.environ.get('WRITE_BATCH_MAX', 64))
+    WRITE_BATCH_WAIT_MS = float(os.environ.get('WRITE_BATCH_WAIT_MS', 0))
+    DB_CACHE_SIZE = int(os.environ.get('DB_CACHE_SIZE', -16000))  # Negative means KiB
+    DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_TEMP_STORE = os.environ.get('DB_TEMP_STORE', 'MEMORY')
+    DB_FOREIGN_KEYS = os.environ.get('DB_FOREIGN_KEYS', '1') != '0'
+    # Per-request query counting (X-DB-Query-Count / X-DB-Time-Ms headers) and a
+    # slow-query log with query plans. SQL_INSTRUMENTATION=0 uses plain connections.
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') != '0'
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100.0))
+    # Apply pending schema migrations when the app starts (else run `flask migrate-db`)
+    DB_MIGRATE_ON_STARTUP = os.environ.get('DB_MIGRATE_ON_STARTUP', '1') != '0'
+
+    # Set EXPORT_ENABLED=0 to stop keeping an export of the database at all
+    EXPORT_ENABLED = os.environ.get('EXPORT_ENABLED', '1') != '0'
+    # Excel export runs on a background worker; a burst of writes within the
+    # debounce window is coalesced into a single export.
+    EXPORT_ASYNC = os.environ.get('EXPORT_ASYNC', '1') != '0'
+    EXPORT_DEBOUNCE_SECONDS = float(os.environ.get('EXPORT_DEBOUNCE_SECONDS', 2.0))
+    EXPORT_MAX_DELAY_SECONDS = float(os.environ.get('EXPORT_MAX_DELAY_SECONDS', 30.0))
+    # 'incremental' skips the export when no table changed and appends new rows to csv/ndjson
+    # files; xlsx workbooks are streamed out whole when anything changed. 'full' always rewrites
+    EXPORT_MODE = os.environ.get('EXPORT_MODE', 'incremental')
+    # 'xlsx' writes EXCEL_PATH; 'csv' and 'ndjson' write one file per table into EXPORT_DIR
+    EXPORT_FORMAT = os.environ.get('EXPORT_FORMAT', 'xlsx')
+    EXPORT_DIR = resource_path("export")
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 5000))
+    # Several processes on one database (on by itself when SERVER_PROCESSES > 1): only the
+    # process holding the export lock file (EXPORT_LOCK_PATH, default next to the export)
+    # writes it, and it polls for the other processes' changes every EXPORT_POLL_SECONDS
+    EXPORT_LEADER_ELECTION = os.environ.get('EXPORT_LEADER_ELECTION', '0') != '0'
+    EXPORT_LOCK_PATH = os.environ.get('EXPORT_LOCK_PATH')
+    EXPORT_POLL_SECONDS = float(os.environ.get('EXPORT_POLL_SECONDS', 5.0))
+
+    # Default number of results for GET /api/orders?q=...
+    ORDER_SEARCH_LIMIT = int(os.environ.get('ORDER_SEARCH_LIMIT', 50))
+
+    # Page size for list endpoints given ?cursor= without ?limit=, and the largest ?limit= allowed
+    PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', 100))
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', 1000))
+
+    # In-process cache for the contractor book and stock reports. Entries are
+    # dropped as soon as a table they read from changes, or after the TTL.
+    READ_CACHE_ENABLED = os.environ.get('READ_CACHE_ENABLED', '1') != '0'
+    READ_CACHE_SIZE = int(os.environ.get('READ_CACHE_SIZE', 256))
+    READ_CACHE_TTL_SECONDS = float(os.environ.get('READ_CACHE_TTL_SECONDS', 60.0))
+
+    # Rows read from an uploaded stock sheet per batch of upserts (POST /api/stock_items/import, `flask import-stock`)
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 1000))
+
+    # How run.py serves the app: 'production' (waitress, multi-threaded) or 'dev' (Flask
+    # development server). The packaged executable defaults to production.
+    SERVER_MODE = os.environ.get('SERVER_MODE', 'production' if getattr(sys, 'frozen', False) else 'dev')
+    SERVER_PORT = int(os.environ.get('SERVER_PORT', 55000))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))  # Keep DB_POOL_SIZE at least this large
+    SERVER_BACKLOG = int(os.environ.get('SERVER_BACKLOG', 1024))
+    SERVER_KEEPALIVE_SECONDS = int(os.environ.get('SERVER_KEEPALIVE_SECONDS', 120))
+    # Production mode can serve from several processes sharing the port and the database;
+    # one of them (elected through the export lock) keeps the export up to date
+    SERVER_PROCESSES = int(os.environ.get('SERVER_PROCESSES', 1))
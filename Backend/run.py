@@ -1,7 +1,9 @@
 # /run.py
 
 from app import create_app
-import sys, os, socket
+from app.server import serve, SERVER_MODES, listening_socket, start_processes, exit_on_sigterm
+from app.services.export_worker import enable_leader_election
+import sys, os, socket, argparse, multiprocessing
 from flask import Flask
 
 
@@ -32,7 +34,50 @@ def find_free_port(preferred_port=55000):
     return port
 
 
+# NEW: Server options; defaults come from the config (SERVER_* environment variables)
+def parse_args(argv=None):
+    config = app.config
+    parser = argparse.ArgumentParser(description="Carpet Management backend")
+    parser.add_argument('--server', choices=SERVER_MODES, default=config['SERVER_MODE'],
+                        help="'production' serves with waitress, 'dev' with the Flask development server")
+    parser.add_argument('--port', type=int, default=config['SERVER_PORT'], help='preferred port (a free one is used if taken)')
+    parser.add_argument('--threads', type=int, default=config['SERVER_THREADS'])
+    parser.add_argument('--backlog', type=int, default=config['SERVER_BACKLOG'])
+    parser.add_argument('--keep-alive', type=int, default=config['SERVER_KEEPALIVE_SECONDS'])
+    parser.add_argument('--processes', type=int, default=config['SERVER_PROCESSES'],
+                        help='server processes sharing the port (production mode only)')
+    return parser.parse_args(argv)
+
+
+# NEW: Entry point of the extra server processes. They are spawned, so this module
+# is imported afresh in each of them and `app` above is that process's own app.
+def serve_child(sock, args):
+    serve(app, 'production', threads=args.threads, backlog=args.backlog, keep_alive=args.keep_alive, sock=sock)
+
+
 if __name__ == "__main__":
-    port = find_free_port()
+    multiprocessing.freeze_support()  # Spawned server processes in the PyInstaller binary
+    args = parse_args()
+    port = find_free_port(args.port)
     print(f"Running on http://127.0.0.1:{port}")
-    app.run(host="0.0.0.0", port=port)
+
+    exit_on_sigterm()
+    sock = None
+    children = None
+    if args.processes > 1:
+        if args.server != 'production':
+            print("Several processes need --server production; running a single process.")
+        else:
+            # Spawned processes read SERVER_PROCESSES from the environment; this one is already set up
+            os.environ['SERVER_PROCESSES'] = str(args.processes)
+            enable_leader_election(app)
+            sock = listening_socket("0.0.0.0", port, args.backlog)
+            children = start_processes(serve_child, args.processes - 1, sock, args)
+            print(f"Serving from {args.processes} processes")
+    try:
+        serve(app, args.server, host="0.0.0.0", port=port,
+              threads=args.threads, backlog=args.backlog, keep_alive=args.keep_alive, sock=sock)
+    finally:
+        # The other processes flush their exports on the way out
+        if children is not None:
+            children.stop()
@@ -52,6 +52,13 @@ export const getStockItems = (params = {}) => {
 };
 export const addStockItem = (data) => fetchApi('/stock_items', { method: 'POST', body: JSON.stringify(data) });
 export const updateStockItem = (stockId, data) => fetchApi(`/stock_items/${stockId}`, { method: 'PUT', body: JSON.stringify(data) });
+// NEW: Imports a .csv/.xlsx stock sheet; returns { inserted, updated, rejected, rejected_rows }
+export const importStockItems = (file, dryRun = false) => {
+  const form = new FormData();
+  form.append('file', file);
+  // No JSON Content-Type here, the browser sets the multipart boundary itself
+  return fetchApi(`/stock_items/import${dryRun ? '?dry_run=1' : ''}`, { method: 'POST', body: form, headers: {} });
+};
 
 // Order APIs
 export const getOrders = (status, designNumber = '', shadeCard = '', quality = '') => {
@@ -63,11 +70,28 @@ export const getOrders = (status, designNumber = '', shadeCard = '', quality = '
   });
   return fetchApi(`/orders?${params.toString()}`);
 };
+// NEW: One page of orders ({ items, next_cursor }); pass next_cursor back as `cursor` for the next page
+// and `fields` (e.g. 'OrderID,DesignNumber,Status') to fetch only the columns a view renders.
+export const getOrdersPage = ({ limit = 100, cursor, fields, ...filters } = {}) => {
+  const params = new URLSearchParams({ limit, ...filters });
+  if (cursor) params.set('cursor', cursor);
+  if (fields) params.set('fields', fields);
+  return fetchApi(`/orders?${params.toString()}`);
+};
+// NEW: Ranked search across design number, shade card, quality, contractor name and notes
+export const searchOrders = (q, params = {}) => {
+  const query = new URLSearchParams({ q, ...params });
+  return fetchApi(`/orders?${query.toString()}`);
+};
 export const getOrderById = (orderId) => fetchApi(`/orders/${orderId}`);
 export const createOrder = (data) => fetchApi('/orders', { method: 'POST', body: JSON.stringify(data) });
+// NEW: Creates many orders in one transaction; allOrNothing=false keeps the valid ones and reports the rest
+export const createOrdersBulk = (orders, allOrNothing = true) => fetchApi('/orders/bulk', { method: 'POST', body: JSON.stringify({ orders, all_or_nothing: allOrNothing }) });
 export const completeOrder = (orderId, data) => fetchApi(`/orders/${orderId}/complete`, { method: 'POST', body: JSON.stringify(data) });
 export const getOrderTransactions = (orderId) => fetchApi(`/orders/${orderId}/transactions`);
 export const getOrderFinancials = (orderId) => fetchApi(`/orders/${orderId}/financials`);
+// NEW: Financials for many orders in one request, keyed by OrderID
+export const getOrdersFinancials = (orderIds) => fetchApi('/orders/financials', { method: 'POST', body: JSON.stringify({ order_ids: orderIds }) });
 export const getOrderPayments = (orderId) => fetchApi(`/orders/${orderId}/payments`);
 export const returnStockForOrder = (orderId, stock_id, weight) => fetchApi(`/orders/${orderId}/return-stock`, {
     method: 'POST',
@@ -79,6 +103,7 @@ export const reassignOrder = (orderId, data) => fetchApi(`/orders/${orderId}/rea
     body: JSON.stringify(data)
 });
 // NEW: API call for issuing more stock to an order
+// data is { stock_id, weight, transaction_date } or { lines: [{ stock_id, weight, transaction_date }, ...] }
 export const issueStockToOrder = (orderId, data) => fetchApi(`/orders/${orderId}/issue-stock`, {
     method: 'POST',
     body: JSON.stringify(data)
@@ -93,6 +118,17 @@ export const addPaymentToOrder = (data) => fetchApi('/payments', { method: 'POST
 export const updatePayment = (paymentId, data) => fetchApi(`/payments/${paymentId}`, { method: 'PUT', body: JSON.stringify(data) });
 export const deletePayment = (paymentId) => fetchApi(`/payments/${paymentId}`, { method: 'DELETE' });
 
+// NEW: Payroll. Preview first, then run with expected_total set to the previewed total
+// so nothing is paid if balances changed in between (the run answers 409).
+export const previewPayroll = (options = {}) => fetchApi('/payroll/preview', { method: 'POST', body: JSON.stringify(options) });
+export const runPayroll = (options = {}) => fetchApi('/payroll/run', { method: 'POST', body: JSON.stringify(options) });
+// NEW: Imports a .csv/.xlsx sheet of payments (ContractorID, Amount, OrderID, PaymentDate, Notes)
+export const importPayments = (file, dryRun = false) => {
+  const form = new FormData();
+  form.append('file', file);
+  return fetchApi(`/payments/import${dryRun ? '?dry_run=1' : ''}`, { method: 'POST', body: form, headers: {} });
+};
+
 // ADDED: API calls for stock transaction CRUD
 export const updateStockTransaction = (transactionId, data) => fetchApi(`/stock-transactions/${transactionId}`, { method: 'PUT', body: JSON.stringify(data) });
 export const deleteStockTransaction = (transactionId) => fetchApi(`/stock-transactions/${transactionId}`, { method: 'DELETE' });
\ No newline at end of file